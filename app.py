@@ -70,12 +70,7 @@ def serialize_game_state(game: AvalonGame) -> Dict:
     # 获取当前任务配置
     mission_config = None
     if state.current_round <= len(state.mission_configs):
-        config = state.mission_configs[state.current_round - 1]
-        mission_config = {
-            "round_number": config.round_number,
-            "team_size": config.team_size,
-            "fails_needed": config.fails_needed
-        }
+        mission_config = state.mission_configs[state.current_round - 1]._asdict()
     
     # 获取提议队伍的名称
     proposed_team_names = []
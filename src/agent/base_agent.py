@@ -20,13 +20,19 @@ class BaseAgent:
     
     def __init__(self, player_id: int, name: str, personality: Optional[Personality] = None,
                  use_llm: bool = False, llm_api_key: Optional[str] = None, 
-                 llm_model: str = "gpt-4o-mini", llm_api_provider: str = "openai"):
+                 llm_model: str = "gpt-4o-mini", llm_api_provider: str = "openai",
+                 llm_batch_mode: bool = False, llm_small_model: Optional[str] = None,
+                 llm_attempt_timeout: Optional[float] = None, llm_use_batch_api: bool = False):
         self.player_id = player_id
         self.name = name
         self.use_llm = use_llm
         self.llm_api_key = llm_api_key
         self.llm_model = llm_model
         self.llm_api_provider = llm_api_provider  # "openai" 或 "deepseek"
+        self.llm_batch_mode = llm_batch_mode  # 是否允许批量合并同类LLM决策
+        self.llm_small_model = llm_small_model  # 低信息量决策使用的小模型（None表示始终使用llm_model）
+        self.llm_attempt_timeout = llm_attempt_timeout  # 单次LLM请求的总时长上限（秒），超时立即重试
+        self.llm_use_batch_api = llm_use_batch_api  # 批量发言是否提交到提供商的Batch API
         
         # 角色信息（在游戏初始化时设置）
         self.role_type: Optional[RoleType] = None
@@ -85,8 +91,13 @@ class BaseAgent:
                 personality=self.personality,
                 api_key=self.llm_api_key,
                 model=self.llm_model,
-                api_provider=self.llm_api_provider
+                api_provider=self.llm_api_provider,
+                batch_mode=self.llm_batch_mode,
+                model_small=self.llm_small_model,
+                attempt_timeout=self.llm_attempt_timeout,
+                use_batch_api=self.llm_use_batch_api
             )
+            self.llm_strategy_engine.set_roster(all_players)
             # 根据提供商显示正确的名称
             if self.llm_api_provider == "deepseek":
                 provider_name = "DeepSeek"
@@ -164,6 +175,17 @@ class BaseAgent:
         if not self.belief_system:
             return True  # 默认同意
         
+        return self.llm_strategy_engine.decide_vote(**self._team_vote_kwargs(game_state, proposed_team))
+    
+    async def avote_on_team(self, game_state: Dict, proposed_team: List[int]) -> bool:
+        """vote_on_team的异步版本（用于多名玩家并发投票）"""
+        if not self.belief_system:
+            return True  # 默认同意
+        
+        return await self.llm_strategy_engine.adecide_vote(**self._team_vote_kwargs(game_state, proposed_team))
+    
+    def _team_vote_kwargs(self, game_state: Dict, proposed_team: List[int]) -> Dict:
+        """构建队伍投票决策的参数"""
         context = DecisionContext(
             game_phase=GamePhase[game_state.get("current_phase", "VOTING")],
             current_round=game_state.get("current_round", 1),
@@ -184,7 +206,7 @@ class BaseAgent:
         if not self.llm_strategy_engine:
             raise RuntimeError("LLM策略引擎未初始化")
         
-        return self.llm_strategy_engine.decide_vote(
+        return dict(
             context=context,
             belief_system=self.belief_system,
             all_players=all_players,
@@ -192,6 +214,48 @@ class BaseAgent:
             mission_history=mission_history
         )
     
+    @staticmethod
+    def batch_vote_on_team(agents: List["BaseAgent"], game_state: Dict,
+                           proposed_team: List[int]) -> Dict[int, bool]:
+        """
+        批量对提议的队伍投票（一次LLM调用完成多名玩家的投票）
+        返回: 玩家ID -> True=同意, False=拒绝
+        """
+        votes: Dict[int, bool] = {}
+        llm_agents = []
+        for agent in agents:
+            if not agent.belief_system:
+                votes[agent.player_id] = True  # 默认同意
+            elif not agent.llm_strategy_engine:
+                raise RuntimeError("LLM策略引擎未初始化")
+            else:
+                llm_agents.append(agent)
+        
+        if not llm_agents:
+            return votes
+        
+        context = DecisionContext(
+            game_phase=GamePhase[game_state.get("current_phase", "VOTING")],
+            current_round=game_state.get("current_round", 1),
+            successful_missions=game_state.get("successful_missions", 0),
+            failed_missions=game_state.get("failed_missions", 0),
+            current_leader=game_state.get("current_leader", 0),
+            proposed_team=proposed_team,
+            vote_round=game_state.get("vote_round", 0),
+            mission_config=game_state.get("mission_config", {})
+        )
+        
+        from agent.llm_strategy import LLMStrategyEngine
+        votes.update(LLMStrategyEngine.batch_decide_vote(
+            engines=[a.llm_strategy_engine for a in llm_agents],
+            context=context,
+            belief_systems=[a.belief_system for a in llm_agents],
+            all_players=llm_agents[0].private_info.get("all_players", []) if llm_agents[0].private_info else [],
+            proposed_team=proposed_team,
+            mission_history=game_state.get("mission_history", [])
+        ))
+        return votes
+    
     def vote_on_mission(self, game_state: Dict, mission_team: List[int]) -> bool:
         """
         任务投票（成功/失败）
@@ -201,6 +265,60 @@ class BaseAgent:
             # 好人默认成功，坏人默认失败
             return self.team == Team.GOOD
         
+        return self.llm_strategy_engine.decide_mission_vote(**self._mission_vote_kwargs(game_state, mission_team))
+    
+    async def avote_on_mission(self, game_state: Dict, mission_team: List[int]) -> bool:
+        """vote_on_mission的异步版本（用于任务队员并发投票）"""
+        if not self.belief_system:
+            # 好人默认成功，坏人默认失败
+            return self.team == Team.GOOD
+        
+        return await self.llm_strategy_engine.adecide_mission_vote(**self._mission_vote_kwargs(game_state, mission_team))
+    
+    @staticmethod
+    def batch_vote_on_mission(agents: List["BaseAgent"], game_state: Dict,
+                              mission_team: List[int]) -> Dict[int, bool]:
+        """
+        批量任务投票（队伍中多名坏人的投票合并为一次LLM调用）
+        返回: 玩家ID -> True=成功, False=失败
+        """
+        votes: Dict[int, bool] = {}
+        llm_agents = []
+        for agent in agents:
+            if not agent.belief_system:
+                votes[agent.player_id] = agent.team == Team.GOOD  # 好人默认成功，坏人默认失败
+            elif not agent.llm_strategy_engine:
+                raise RuntimeError("LLM策略引擎未初始化")
+            else:
+                llm_agents.append(agent)
+        
+        if not llm_agents:
+            return votes
+        
+        context = DecisionContext(
+            game_phase=GamePhase[game_state.get("current_phase", "MISSION")],
+            current_round=game_state.get("current_round", 1),
+            successful_missions=game_state.get("successful_missions", 0),
+            failed_missions=game_state.get("failed_missions", 0),
+            current_leader=game_state.get("current_leader", 0),
+            proposed_team=mission_team,
+            vote_round=game_state.get("vote_round", 0),
+            mission_config=game_state.get("mission_config", {})
+        )
+        
+        from agent.llm_strategy import LLMStrategyEngine
+        votes.update(LLMStrategyEngine.batch_decide_mission_vote(
+            engines=[a.llm_strategy_engine for a in llm_agents],
+            context=context,
+            belief_systems=[a.belief_system for a in llm_agents],
+            all_players=llm_agents[0].private_info.get("all_players", []) if llm_agents[0].private_info else [],
+            mission_team=mission_team,
+            mission_history=game_state.get("mission_history", [])
+        ))
+        return votes
+    
+    def _mission_vote_kwargs(self, game_state: Dict, mission_team: List[int]) -> Dict:
+        """构建任务投票决策的参数"""
         context = DecisionContext(
             game_phase=GamePhase[game_state.get("current_phase", "MISSION")],
             current_round=game_state.get("current_round", 1),
@@ -221,7 +339,7 @@ class BaseAgent:
         if not self.llm_strategy_engine:
             raise RuntimeError("LLM策略引擎未初始化")
         
-        return self.llm_strategy_engine.decide_mission_vote(
+        return dict(
             context=context,
             belief_system=self.belief_system,
             all_players=all_players,
@@ -274,6 +392,64 @@ class BaseAgent:
         if not self.belief_system:
             return "让我思考一下..."
         
+        return self.llm_strategy_engine.generate_speech(**self._speech_kwargs(game_state, recent_speeches))
+    
+    async def agenerate_speech(self, game_state: Dict, recent_speeches: List[Dict] = None) -> str:
+        """generate_speech的异步版本（用于多名玩家并发发言）"""
+        if not self.belief_system:
+            return "让我思考一下..."
+        
+        return await self.llm_strategy_engine.agenerate_speech(**self._speech_kwargs(game_state, recent_speeches))
+    
+    @staticmethod
+    def batch_generate_speech(agents: List["BaseAgent"], game_states: List[Dict],
+                              recent_speeches: List[Dict] = None) -> List[str]:
+        """
+        批量生成多名玩家的发言（所有请求一次提交，彼此看不到本批次的发言）
+        game_states与agents一一对应；返回按agents顺序排列的发言
+        """
+        speeches, llm_indices, batch_kwargs = BaseAgent._speech_batch(agents, game_states, recent_speeches)
+        if llm_indices:
+            from agent.llm_strategy import LLMStrategyEngine
+            results = LLMStrategyEngine.batch_generate_speech(**batch_kwargs)
+            for i, speech in zip(llm_indices, results):
+                speeches[i] = speech
+        return speeches
+    
+    @staticmethod
+    async def abatch_generate_speech(agents: List["BaseAgent"], game_states: List[Dict],
+                                     recent_speeches: List[Dict] = None) -> List[str]:
+        """batch_generate_speech的异步版本：请求在当前事件循环中发出，复用该事件循环上的连接池"""
+        speeches, llm_indices, batch_kwargs = BaseAgent._speech_batch(agents, game_states, recent_speeches)
+        if llm_indices:
+            from agent.llm_strategy import LLMStrategyEngine
+            results = await LLMStrategyEngine.abatch_generate_speech(**batch_kwargs)
+            for i, speech in zip(llm_indices, results):
+                speeches[i] = speech
+        return speeches
+    
+    @staticmethod
+    def _speech_batch(agents: List["BaseAgent"], game_states: List[Dict],
+                      recent_speeches: Optional[List[Dict]]) -> Tuple[List[Optional[str]], List[int], Dict]:
+        """
+        批量发言的准备：返回 (发言列表（未初始化信念系统的玩家已填入默认发言）,
+        需要LLM生成的下标, LLMStrategyEngine.batch_generate_speech的参数)
+        """
+        speeches: List[Optional[str]] = [None] * len(agents)
+        llm_indices = []
+        for i, agent in enumerate(agents):
+            if not agent.belief_system:
+                speeches[i] = "让我思考一下..."
+            else:
+                llm_indices.append(i)
+        batch_kwargs = dict(
+            engines=[agents[i].llm_strategy_engine for i in llm_indices],
+            requests=[agents[i]._speech_kwargs(game_states[i], recent_speeches) for i in llm_indices]
+        )
+        return speeches, llm_indices, batch_kwargs
+    
+    def _speech_kwargs(self, game_state: Dict, recent_speeches: Optional[List[Dict]]) -> Dict:
+        """构建发言生成的参数"""
         if recent_speeches is None:
             recent_speeches = []
         
@@ -298,7 +474,7 @@ class BaseAgent:
         
         # 获取任务历史
         mission_history = game_state.get("mission_history", [])
-        return self.llm_strategy_engine.generate_speech(
+        return dict(
             context=decision_context,
             belief_system=self.belief_system,
             all_players=all_players,
@@ -2,7 +2,7 @@
 动态信念系统
 基于贝叶斯推理更新对其他玩家身份的信念
 """
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 import numpy as np
 from dataclasses import dataclass, field
 
@@ -48,6 +48,26 @@ class BeliefSystem:
         # 初始化信念
         self.beliefs: Dict[int, PlayerBelief] = {}
         self._initialize_beliefs()
+        
+        # 玩家ID（不含自己），整局不变，补位选人时直接遍历
+        self.other_player_ids = tuple(pid for pid in self.beliefs if pid != self.my_player_id)
+        
+        # 排序用的数组（结构化数组布局，与beliefs同步更新），避免每次排序都遍历信念对象
+        self._ids = np.fromiter(self.beliefs.keys(), dtype=np.int64, count=len(self.beliefs))
+        self._index = {player_id: i for i, player_id in enumerate(self.beliefs)}
+        self._trust = np.array([b.trust_score for b in self.beliefs.values()], dtype=np.float64)
+        self._evil = np.array([b.team_probabilities[Team.EVIL] for b in self.beliefs.values()], dtype=np.float64)
+    
+    def _sync_scores(self, belief: PlayerBelief):
+        """把单个玩家的信任度/坏人概率写回排序数组"""
+        i = self._index[belief.player_id]
+        self._trust[i] = belief.trust_score
+        self._evil[i] = belief.team_probabilities[Team.EVIL]
+    
+    def _top_players(self, scores: np.ndarray, count: int) -> List[int]:
+        """按分数降序取前count名（稳定排序：分数相同时保持玩家顺序），排除自己"""
+        order = np.argsort(-scores, kind="stable")[:count]
+        return [pid for pid in self._ids[order].tolist() if pid != self.my_player_id]
     
     def _initialize_beliefs(self):
         """初始化信念"""
@@ -159,6 +179,7 @@ class BeliefSystem:
             belief.trust_score = min(1.0, belief.trust_score + 0.1)
         elif belief.team_probabilities[Team.EVIL] > 0.7:
             belief.trust_score = max(0.0, belief.trust_score - 0.1)
+        self._sync_scores(belief)
     
     def update_belief_from_mission(self, player_id: int, mission_success: bool,
                                    mission_team: List[int], mission_result: bool):
@@ -168,40 +189,55 @@ class BeliefSystem:
         mission_team: 任务队伍
         mission_result: 任务最终结果（成功/失败）
         """
-        if player_id not in self.beliefs:
-            return
-        
-        belief = self.beliefs[player_id]
-        
-        if player_id not in mission_team:
-            return  # 不在任务中，无法推断
+        self.update_beliefs_from_mission({player_id: mission_success}, mission_team, mission_result)
+    
+    def update_beliefs_from_mission(self, mission_votes: Dict[int, bool],
+                                    mission_team: List[int], mission_result: bool):
+        """
+        根据一次任务的全部投票批量更新信念（与逐个调用update_belief_from_mission等价）
+        mission_votes: 玩家ID -> 该玩家在任务中投的是成功还是失败
+        """
+        # 更新系数只取决于投票和任务结果，整批只计算一次
+        factors = {vote: self._mission_factors(vote, mission_result) for vote in (True, False)}
+        team = set(mission_team)
         
+        for player_id, mission_success in mission_votes.items():
+            belief = self.beliefs.get(player_id)
+            if belief is None or player_id not in team:
+                continue  # 不在任务中，无法推断
+            
+            good_factor, evil_factor = factors[mission_success]
+            probabilities = belief.team_probabilities
+            probabilities[Team.GOOD] *= good_factor
+            probabilities[Team.EVIL] *= evil_factor
+            
+            # 归一化概率
+            total = probabilities[Team.GOOD] + probabilities[Team.EVIL]
+            probabilities[Team.GOOD] /= total
+            probabilities[Team.EVIL] /= total
+            self._sync_scores(belief)
+    
+    def _mission_factors(self, mission_success: bool, mission_result: bool) -> Tuple[float, float]:
+        """任务投票对 (好人概率, 坏人概率) 的更新系数"""
         if self.my_team == Team.GOOD:
             # 好人视角
             if not mission_result:
                 # 任务失败，说明队伍中有坏人
                 if mission_success:
                     # 投了成功，可能是好人
-                    belief.team_probabilities[Team.GOOD] *= 1.2
-                else:
-                    # 投了失败，很可能是坏人
-                    belief.team_probabilities[Team.EVIL] *= 1.5
-            else:
-                # 任务成功，队伍中可能都是好人
-                if mission_success:
-                    belief.team_probabilities[Team.GOOD] *= 1.1
-        else:
-            # 坏人视角（知道队友身份）
-            if not mission_result:
-                # 任务失败
-                if not mission_success:
-                    # 投了失败，可能是坏人队友
-                    belief.team_probabilities[Team.EVIL] *= 1.2
+                    return 1.2, 1.0
+                # 投了失败，很可能是坏人
+                return 1.0, 1.5
+            # 任务成功，队伍中可能都是好人
+            if mission_success:
+                return 1.1, 1.0
+            return 1.0, 1.0
         
-        # 归一化概率
-        total = belief.team_probabilities[Team.GOOD] + belief.team_probabilities[Team.EVIL]
-        belief.team_probabilities[Team.GOOD] /= total
-        belief.team_probabilities[Team.EVIL] /= total
+        # 坏人视角（知道队友身份）
+        if not mission_result and not mission_success:
+            # 任务失败且投了失败，可能是坏人队友
+            return 1.0, 1.2
+        return 1.0, 1.0
     
     def update_belief_from_speech(self, player_id: int, speech_content: str, 
                                   speech_analysis: Dict):
@@ -226,21 +262,22 @@ class BeliefSystem:
     
     def get_most_trusted_players(self, count: int = 3) -> List[int]:
         """获取最信任的玩家"""
-        sorted_players = sorted(
-            self.beliefs.items(),
-            key=lambda x: x[1].trust_score,
-            reverse=True
-        )
-        return [pid for pid, _ in sorted_players[:count] if pid != self.my_player_id]
+        return self._top_players(self._trust, count)
     
     def get_most_suspicious_players(self, count: int = 3) -> List[int]:
         """获取最可疑的玩家"""
-        sorted_players = sorted(
-            self.beliefs.items(),
-            key=lambda x: x[1].team_probabilities[Team.EVIL],
-            reverse=True
-        )
-        return [pid for pid, _ in sorted_players[:count] if pid != self.my_player_id]
+        return self._top_players(self._evil, count)
+    
+    def get_top_trusted_player(self) -> Optional[int]:
+        """获取信任度最高的玩家（包括自己；并列时取玩家顺序靠前者），没有信念时返回None"""
+        if not len(self._ids):
+            return None
+        return int(self._ids[self._trust.argmax()])
+    
+    def has_likely_evil(self, player_ids: List[int], threshold: float = 0.8) -> bool:
+        """给定玩家中是否有坏人概率超过阈值的（未知玩家忽略）"""
+        indices = [self._index[pid] for pid in player_ids if pid in self._index]
+        return bool(indices) and bool((self._evil[indices] > threshold).any())
     
     def get_belief_summary(self) -> Dict:
         """获取信念摘要"""
@@ -0,0 +1,103 @@
+"""
+事件循环
+安装uvloop时使用基于libuv的事件循环（大量LLM请求并发时任务调度和socket I/O更快），否则使用asyncio默认循环
+"""
+from typing import Awaitable, Callable, List, Optional
+import asyncio
+
+try:
+    import uvloop
+    UVLOOP_AVAILABLE = True
+except ImportError:
+    UVLOOP_AVAILABLE = False
+
+
+def new_event_loop() -> asyncio.AbstractEventLoop:
+    """新建事件循环（优先使用uvloop）"""
+    if UVLOOP_AVAILABLE:
+        return uvloop.new_event_loop()
+    return asyncio.new_event_loop()
+
+
+# 事件循环关闭前需要释放的资源（如绑定在该事件循环上的异步HTTP连接池），由各模块注册
+_SHUTDOWN_HOOKS: List[Callable[[], Awaitable]] = []
+
+
+def add_shutdown_hook(hook: Callable[[], Awaitable]):
+    """注册事件循环关闭前调用的协程函数（在即将关闭的事件循环中执行）"""
+    _SHUTDOWN_HOOKS.append(hook)
+
+
+async def release_loop_resources():
+    """
+    释放当前事件循环上已注册的资源；close_loop/run会自动调用，
+    自行管理事件循环时（如asyncio.run）在所有对局结束后、事件循环关闭前await它
+    """
+    for hook in _SHUTDOWN_HOOKS:
+        await hook()
+
+
+def close_loop(loop: asyncio.AbstractEventLoop):
+    """释放事件循环上的资源并关闭它（同时结束其中的异步生成器）"""
+    try:
+        loop.run_until_complete(release_loop_resources())
+        loop.run_until_complete(loop.shutdown_asyncgens())
+    finally:
+        loop.close()
+
+
+def run(coroutine):
+    """在新建的事件循环中运行协程直到完成（asyncio.run的替代，优先使用uvloop）"""
+    loop = new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        close_loop(loop)
+
+
+async def gather_limited(coroutines: List[Awaitable], max_concurrency: int) -> List:
+    """并发执行协程（信号量限制同时进行的数量），按输入顺序返回结果；异常作为结果返回，不中断其他协程"""
+    semaphore = asyncio.Semaphore(max_concurrency)
+    
+    async def limited(coroutine):
+        async with semaphore:
+            return await coroutine
+    
+    return await asyncio.gather(*(limited(c) for c in coroutines), return_exceptions=True)
+
+
+async def gather_or_raise(coroutines: List[Awaitable], max_concurrency: int) -> List:
+    """同gather_limited，但所有协程结束后如有异常则抛出第一个（与串行执行时的失败行为一致）"""
+    results = await gather_limited(coroutines, max_concurrency)
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    return results
+
+
+class LoopRunner:
+    """
+    持有一个可复用的事件循环（首次使用时创建）：同一对局/引擎的多次并发调用共享它，
+    从而复用绑定在该事件循环上的异步连接池；用完后调用close关闭
+    """
+    
+    def __init__(self, max_concurrency: int):
+        """max_concurrency: gather中同时进行的协程上限"""
+        self.max_concurrency = max_concurrency
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+    
+    def run(self, coroutine):
+        """在持有的事件循环中运行协程直到完成"""
+        if self._loop is None:
+            self._loop = new_event_loop()
+        return self._loop.run_until_complete(coroutine)
+    
+    def gather(self, coroutines: List[Awaitable]) -> List:
+        """在持有的事件循环中并发执行协程（见gather_or_raise），按输入顺序返回结果"""
+        return self.run(gather_or_raise(coroutines, self.max_concurrency))
+    
+    def close(self):
+        """关闭事件循环（之后再次使用时重新创建）"""
+        if self._loop is not None:
+            loop, self._loop = self._loop, None
+            close_loop(loop)
@@ -0,0 +1,148 @@
+"""
+LLM响应缓存
+精确匹配的LRU缓存 + 基于句向量的语义缓存（相似Prompt直接复用响应，省去网络往返）
+"""
+from typing import Dict, List, Optional, Tuple
+from collections import OrderedDict
+from functools import lru_cache
+import threading
+import time
+import numpy as np
+
+try:
+    import faiss
+    FAISS_AVAILABLE = True
+except ImportError:
+    FAISS_AVAILABLE = False
+
+try:
+    from sentence_transformers import SentenceTransformer
+    EMBEDDING_AVAILABLE = True
+except ImportError:
+    EMBEDDING_AVAILABLE = False
+
+
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"  # 384维，CPU上编码一条Prompt只需几毫秒
+EMBEDDING_DIM = 384
+
+
+class LRUEmbeddingCache:
+    """线程安全的LRU缓存（带过期时间），按Prompt哈希精确匹配"""
+
+    def __init__(self, capacity: int = 1024, ttl: float = 3600):
+        """
+        capacity: 最多缓存的条目数，超出时淘汰最久未使用的条目
+        ttl: 条目有效期（秒）
+        """
+        self.capacity = capacity
+        self.ttl = ttl
+        self._data: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: str, value: str):
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.capacity:
+                self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict:
+        """命中统计"""
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0
+        }
+
+
+@lru_cache(maxsize=1)
+def _get_embedding_model():
+    """加载句向量模型（整个进程只加载一次）"""
+    return SentenceTransformer(EMBEDDING_MODEL)
+
+
+def embed_text(text: str) -> np.ndarray:
+    """把文本编码为单位长度的句向量（内积即余弦相似度）"""
+    vector = _get_embedding_model().encode([text], normalize_embeddings=True)
+    return np.asarray(vector, dtype=np.float32).reshape(1, -1)
+
+
+class FastSemanticIndex:
+    """
+    语义缓存：对User Prompt做向量检索，余弦相似度超过阈值时复用已有响应
+    安装faiss时使用IndexFlatIP，否则回退到numpy矩阵乘法（缓存规模较小时同样很快）
+    """
+
+    def __init__(self, threshold: float = 0.97, capacity: int = 1024, dim: int = EMBEDDING_DIM):
+        self.threshold = threshold
+        self.capacity = capacity
+        self.dim = dim
+        self._responses: List[str] = []
+        self._vectors = np.empty((0, dim), dtype=np.float32)
+        self._index = faiss.IndexFlatIP(dim) if FAISS_AVAILABLE else None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def search(self, embedding: np.ndarray) -> Optional[str]:
+        """查找最相似的已缓存Prompt，相似度达到阈值时返回其响应"""
+        with self._lock:
+            if not self._responses:
+                self.misses += 1
+                return None
+            if self._index is not None:
+                scores, ids = self._index.search(embedding, 1)
+                best_score, best_id = float(scores[0][0]), int(ids[0][0])
+            else:
+                scores = self._vectors @ embedding[0]
+                best_id = int(np.argmax(scores))
+                best_score = float(scores[best_id])
+            if best_id < 0 or best_score < self.threshold:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return self._responses[best_id]
+
+    def add(self, embedding: np.ndarray, response: str):
+        """加入一条 (Prompt向量, 响应)；达到容量后不再加入（扁平索引不支持高效删除）"""
+        with self._lock:
+            if len(self._responses) >= self.capacity:
+                return
+            self._responses.append(response)
+            if self._index is not None:
+                self._index.add(embedding)
+            else:
+                self._vectors = np.vstack([self._vectors, embedding])
+
+    def __len__(self) -> int:
+        return len(self._responses)
+
+    def stats(self) -> Dict:
+        """命中统计"""
+        total = self.hits + self.misses
+        return {
+            "size": len(self._responses),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "backend": "faiss" if self._index is not None else "numpy"
+        }
@@ -2,9 +2,16 @@
 基于LLM的策略决策引擎
 使用大语言模型进行智能决策
 """
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Deque, ClassVar, Tuple
+from collections import deque
+from itertools import islice
+from functools import lru_cache
+import asyncio
+import hashlib
 import json
 import os
+import random
+import time
 from dotenv import load_dotenv
 
 import sys
@@ -14,63 +21,458 @@ from game.rules import Team, GamePhase
 from game.roles import RoleType
 from agent.belief_system import BeliefSystem
 from agent.strategy import DecisionContext, Personality
+from agent.llm_cache import LRUEmbeddingCache, FastSemanticIndex, EMBEDDING_AVAILABLE, embed_text
+from agent import event_loop
 
-# 加载环境变量
+# 加载环境变量，并在导入时做一次快照（创建引擎时不再重复读取环境变量）
 load_dotenv()
+_ENV: Dict[str, str] = dict(os.environ)
 
 try:
-    from openai import OpenAI
+    from openai import OpenAI, AsyncOpenAI, APIStatusError, APITimeoutError
+    import httpx
     LLM_AVAILABLE = True
 except ImportError:
     LLM_AVAILABLE = False
     print("警告: OpenAI库未安装，LLM功能将不可用")
 
+try:
+    import h2  # noqa: F401  httpx启用HTTP/2需要h2包
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+try:
+    import diskcache
+    DISKCACHE_AVAILABLE = True
+except ImportError:
+    DISKCACHE_AVAILABLE = False
+
+
+def _dumps_compact(obj) -> str:
+    """紧凑JSON序列化（不缩进），用于发给模型的数据：更快，且占用更少token"""
+    if ORJSON_AVAILABLE:
+        try:
+            return orjson.dumps(obj).decode("utf-8")
+        except TypeError:
+            pass  # orjson不支持的类型，回退到标准库
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+# 进程内共享的LLM响应缓存：键包含提供商、模型、完整Prompt和采样参数，
+# 多局对局（评估/调参）中相同输入的可复现请求只发出一次
+_SHARED_RESPONSE_CACHE = LRUEmbeddingCache(capacity=4096, ttl=3600)
+
+# 跨进程/跨局持久化的LLM响应缓存（需要diskcache，按需创建）
+PERSIST_CACHE_DIR = os.path.expanduser("~/.avalon_llm_cache")
+PERSIST_CACHE_EXPIRE = 7 * 86400  # 缓存有效期（秒）
+_PERSIST = None
+
+
+def _get_persist_cache():
+    """获取共享的磁盘缓存"""
+    global _PERSIST
+    if _PERSIST is None:
+        _PERSIST = diskcache.Cache(PERSIST_CACHE_DIR)
+    return _PERSIST
+
+
+@lru_cache(maxsize=16)
+def _get_token_encoder(model: str):
+    """获取模型对应的tiktoken编码器（非OpenAI模型使用通用编码近似估计）"""
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+@lru_cache(maxsize=8)
+def _prompt_templates_signature(prompts_dir: str) -> str:
+    """所有Prompt模板文件的修改时间签名，模板修改后持久化缓存自动失效"""
+    entries = []
+    for root, _, files in os.walk(prompts_dir):
+        for name in sorted(files):
+            if name.endswith(".md"):
+                path = os.path.join(root, name)
+                entries.append(f"{os.path.relpath(path, prompts_dir)}:{os.path.getmtime(path)}")
+    return hashlib.sha256("\n".join(sorted(entries)).encode("utf-8")).hexdigest()
+
+
+@lru_cache(maxsize=64)
+def _read_prompt_template(prompts_dir: str, role_name: str, action_name: str) -> Optional[str]:
+    """读取角色+行为Prompt模板（运行期间模板不变，按路径缓存，避免每次决策都读磁盘）"""
+    role_file = os.path.join(prompts_dir, "roles", f"{role_name}.md")
+    action_file = os.path.join(prompts_dir, "actions", f"{action_name}.md")
+    
+    role_prompt = ""
+    action_prompt = ""
+    
+    # 加载角色Prompt
+    if os.path.exists(role_file):
+        try:
+            with open(role_file, "r", encoding="utf-8") as f:
+                role_prompt = f.read()
+        except Exception as e:
+            print(f"警告: 无法加载角色Prompt {role_file}: {e}")
+    
+    # 加载行为Prompt
+    if os.path.exists(action_file):
+        try:
+            with open(action_file, "r", encoding="utf-8") as f:
+                action_prompt = f.read()
+        except Exception as e:
+            print(f"警告: 无法加载行为Prompt {action_file}: {e}")
+    
+    if role_prompt or action_prompt:
+        return f"{role_prompt}\n\n{action_prompt}" if role_prompt and action_prompt else (role_prompt or action_prompt)
+    
+    return None
+
+
+# 按base_url共享的HTTP客户端：同一局中所有智能体复用连接池（keep-alive），
+# 避免每个引擎各自重复DNS解析与TLS握手；安装h2时启用HTTP/2多路复用
+_SHARED_HTTP: Dict[str, "httpx.Client"] = {}
+
+
+def _get_shared_http_client(base_url: Optional[str]) -> "httpx.Client":
+    """获取（或创建）指定base_url对应的共享httpx.Client"""
+    key = base_url or "default"
+    client = _SHARED_HTTP.get(key)
+    if client is None:
+        client = httpx.Client(
+            http2=HTTP2_AVAILABLE,
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=32)
+        )
+        _SHARED_HTTP[key] = client
+    return client
+
+
+@lru_cache(maxsize=None)
+def _get_client(api_key: Optional[str], base_url: Optional[str],
+                connect_timeout: float, request_timeout: float) -> "OpenAI":
+    """按配置共享OpenAI客户端：指向同一提供商的多个智能体复用同一个客户端实例"""
+    return OpenAI(api_key=api_key, base_url=base_url,
+                  timeout=httpx.Timeout(connect=connect_timeout, read=request_timeout,
+                                        write=request_timeout, pool=None),
+                  http_client=_get_shared_http_client(base_url))
+
+
+# 异步HTTP客户端绑定在创建它的事件循环上，因此按事件循环分别共享；
+# 连接池引用着事件循环，不能用弱引用字典自动释放，事件循环关闭前由_aclose_shared_async_clients关闭并移除
+_SHARED_ASYNC_HTTP: Dict[asyncio.AbstractEventLoop, Dict[str, "httpx.AsyncClient"]] = {}
+
+
+def _get_shared_async_http_client(base_url: Optional[str]) -> "httpx.AsyncClient":
+    """获取（或创建）当前事件循环中指定base_url对应的共享httpx.AsyncClient"""
+    _drop_closed_loops()
+    clients = _SHARED_ASYNC_HTTP.setdefault(asyncio.get_running_loop(), {})
+    key = base_url or "default"
+    client = clients.get(key)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=32)
+        )
+        clients[key] = client
+    return client
+
+
+# 异步OpenAI客户端同样按事件循环共享：同一事件循环中指向同一提供商的所有智能体复用同一个客户端实例
+_SHARED_ASYNC_CLIENTS: Dict[asyncio.AbstractEventLoop, Dict[Tuple, "AsyncOpenAI"]] = {}
+
+
+def _get_shared_async_client(api_key: Optional[str], base_url: Optional[str],
+                             connect_timeout: float, request_timeout: float) -> "AsyncOpenAI":
+    """获取（或创建）当前事件循环中按配置共享的AsyncOpenAI客户端"""
+    _drop_closed_loops()
+    clients = _SHARED_ASYNC_CLIENTS.setdefault(asyncio.get_running_loop(), {})
+    key = (api_key, base_url, connect_timeout, request_timeout)
+    client = clients.get(key)
+    if client is None:
+        client = AsyncOpenAI(api_key=api_key, base_url=base_url,
+                             timeout=httpx.Timeout(connect=connect_timeout, read=request_timeout,
+                                                   write=request_timeout, pool=None),
+                             http_client=_get_shared_async_http_client(base_url))
+        clients[key] = client
+    return client
+
+
+def _drop_closed_loops():
+    """移除已关闭（且未经release_loop_resources释放）的事件循环上的共享客户端，使其连接随对象回收释放"""
+    for registry in (_SHARED_ASYNC_HTTP, _SHARED_ASYNC_CLIENTS):
+        for loop in [loop for loop in registry if loop.is_closed()]:
+            del registry[loop]
+
+
+async def _aclose_shared_async_clients():
+    """关闭并移除当前事件循环上的共享异步客户端（事件循环关闭前由event_loop.release_loop_resources调用）"""
+    loop = asyncio.get_running_loop()
+    _SHARED_ASYNC_CLIENTS.pop(loop, None)
+    for client in _SHARED_ASYNC_HTTP.pop(loop, {}).values():
+        await client.aclose()
+
+
+event_loop.add_shutdown_hook(_aclose_shared_async_clients)
+
+
+def _paragraph_cut(text: str, stop_after_chars: Optional[int]) -> Optional[int]:
+    """已超过stop_after_chars个字符时，返回其后第一个段落分隔（空行）的位置，否则返回None"""
+    if stop_after_chars is None or len(text) <= stop_after_chars:
+        return None
+    cut = text.find("\n\n", stop_after_chars - 1)
+    return cut if cut != -1 else None
+
+
+class _JsonObjectTracker:
+    """流式接收时跟踪第一个JSON对象的括号深度，对象闭合后即可提前结束接收"""
+    
+    def __init__(self):
+        self.start = -1  # 第一个'{'的位置
+        self.end = -1  # 与之匹配的'}'的位置
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+    
+    def feed(self, text: str) -> bool:
+        """扫描新追加的文本（text为完整缓冲区），返回JSON对象是否已闭合"""
+        for i in range(self._pos, len(text)):
+            ch = text[i]
+            if self.start < 0:
+                if ch == "{":
+                    self.start = i
+                    self._depth = 1
+                continue
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "{":
+                self._depth += 1
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    self.end = i
+                    self._pos = i + 1
+                    return True
+        self._pos = len(text)
+        return False
+
+
+class _PlayerNames(dict):
+    """玩家ID -> 名称映射；未知ID时返回"玩家{ID}"，仅在需要时才构造回退字符串"""
+    
+    def __missing__(self, player_id) -> str:
+        return f"玩家{player_id}"
+    
+    @classmethod
+    def from_players(cls, all_players: List[Dict]) -> "_PlayerNames":
+        return cls((p["player_id"], p["name"]) for p in all_players)
+
+
+def _extract_json(text: str) -> Dict:
+    """从模型输出中提取第一个完整的JSON对象并解析（兼容```json代码块和前后多余文字）"""
+    tracker = _JsonObjectTracker()
+    if tracker.feed(text):
+        text = text[tracker.start:tracker.end + 1]
+    if ORJSON_AVAILABLE:
+        return orjson.loads(text)
+    return json.loads(text)
+
 
 class LLMStrategyEngine:
     """基于LLM的策略决策引擎"""
     
+    # 可重试的HTTP状态码（超时、限流、服务端错误）；其余4xx错误直接抛出
+    RETRYABLE_STATUS_CODES = frozenset({408, 429, 500, 502, 503, 504})
+    RETRY_BACKOFF_BASE = 0.5  # 退避基数（秒）
+    RETRY_BACKOFF_CAP = 8.0  # 单次退避上限（秒）
+    BATCH_POLL_INTERVAL = 5.0  # Batch API任务状态轮询间隔（秒）
+    BATCH_MAX_WAIT = 3600.0  # Batch API任务最长等待时间（秒），超时后取消并逐条调用
+    
+    FACTS_JSON_CACHE_SIZE: ClassVar[int] = 32  # 事实核查JSON缓存条目上限（超出时整体清空）
+    
+    # 回退发言（LLM不可用时使用）：(阵营, 局势) -> 发言
+    FALLBACK_SPEECHES: ClassVar[Dict[Tuple[Team, str], str]] = {
+        (Team.GOOD, "winning"): "我们已经成功完成了两个任务，继续保持。",
+        (Team.GOOD, "losing"): "任务失败了，我们需要重新分析局势。",
+        (Team.GOOD, "start"): "我们需要谨慎选择任务队伍，确保都是好人。",
+        (Team.EVIL, "winning"): "我觉得我们需要重新考虑策略。",
+        (Team.EVIL, "normal"): "让我观察一下局势。",
+    }
+    
+    # 各行为的输出token上限：解码耗时与费用随输出长度增长，按需设置
+    # （JSON决策需为thinking_process的多步分析留出空间，过小会截断JSON导致解析失败）
+    ACTION_MAX_TOKENS: ClassVar[Dict[str, int]] = {
+        "team_proposal": 350,
+        "vote": 300,
+        "mission_vote": 250,
+        "assassination": 300,
+        "speech": 256
+    }
+    # 发言超过该字符数后遇到空行即停止接收（模板要求发言不超过50字，更长的输出多为冗余段落）
+    SPEECH_STOP_CHARS = 200
+    
+    # 支持JSON模式（response_format=json_object）的提供商
+    JSON_MODE_PROVIDERS = frozenset({"openai", "deepseek"})
+    
+    # 需要Prompt模板的行为
+    PROMPT_ACTIONS: ClassVar[Tuple[str, ...]] = ("team_proposal", "vote", "mission_vote", "assassination", "speech")
+    
+    # 角色 -> Prompt模板文件名
+    _ROLE_NAME_MAP: ClassVar[Dict[RoleType, str]] = {
+        RoleType.MERLIN: "merlin",
+        RoleType.ASSASSIN: "assassin",
+        RoleType.PERCIVAL: "percival",
+        RoleType.MORGANA: "morgana",
+        RoleType.SERVANT: "servant",
+        RoleType.MORDRED: "mordred"
+    }
+    
     def __init__(self, my_role: RoleType, my_team: Team, my_player_id: int, 
                  my_name: str, personality: Personality = Personality.ANALYTICAL,
                  api_key: Optional[str] = None, model: str = "gpt-4o-mini",
-                 api_provider: str = "openai"):
+                 api_provider: str = "openai", batch_mode: bool = False,
+                 temperature: float = 0.7, deterministic_seed: Optional[int] = None,
+                 cache_enabled: bool = True, request_timeout: float = 60.0,
+                 connect_timeout: float = 10.0, stream_idle_timeout: Optional[float] = None,
+                 cache_persist: bool = False, cache_tag: str = "", model_small: Optional[str] = None,
+                 mission_history_limit: int = 4, prompt_token_budget: Optional[int] = None,
+                 semantic_cache: bool = False, semantic_threshold: float = 0.97,
+                 attempt_timeout: Optional[float] = None, use_batch_api: bool = False):
         """
         api_provider: "openai" 或 "deepseek"
+        batch_mode: 是否允许把多个玩家的同类决策合并为一次LLM调用（批量Prompt）
+        temperature: 采样温度
+        deterministic_seed: 固定采样种子（设置后即使temperature>0也视为可复现，允许缓存）
+        cache_enabled: 是否缓存相同Prompt的LLM响应（仅在输出可复现时生效）
+        request_timeout: 读/写超时（秒），本地模型可能需要更长时间
+        connect_timeout: 建立连接的超时（秒）
+        stream_idle_timeout: 流式响应两个分块之间允许的最长空闲时间（秒），
+                             默认托管API为15秒，本地Qwen与request_timeout相同（本地预填充可能较慢）
+        cache_persist: 是否把可复现的LLM响应持久化到磁盘，跨进程/跨局复用（需要diskcache）
+        cache_tag: 持久化缓存的版本标签，修改后旧缓存全部失效
+        model_small: 低信息量决策使用的小模型（同一提供商/端点，如本地量化Qwen），默认与model相同
+        mission_history_limit: 事实核查数据中保留的最近任务轮数（更早的轮次省略）
+        prompt_token_budget: Prompt的token预算，超出时打印警告（需要tiktoken）
+        semantic_cache: 是否启用语义缓存：与已缓存的发言Prompt足够相似时直接复用响应（仅用于发言，与精确缓存
+                        一样需要cache_enabled且输出可复现；需要sentence-transformers）
+        semantic_threshold: 语义缓存命中所需的余弦相似度
+        attempt_timeout: 单次请求（含读完流式响应）的总时长上限（秒），建议略高于提供商的P50延迟；
+                         超时后立即重试一次，None表示不限制（只受连接/空闲超时约束）
+        use_batch_api: batch_call是否提交到OpenAI Batch API（费用减半，但要轮询等待结果，适合离线批量对局）；
+                       关闭或提供商不支持时，batch_call改为并发发出普通请求
         """
         self.my_role = my_role
+        self._role_name_str = self._ROLE_NAME_MAP.get(my_role, "servant")  # 角色对应的模板文件名（角色整局不变）
         self.my_team = my_team
         self.my_player_id = my_player_id
         self.my_name = my_name
         self.personality = personality
         self.model = model
+        self.model_small = model_small or model
         self.api_provider = api_provider.lower()
+        self.batch_mode = batch_mode
+        self.use_batch_api = use_batch_api
+        self.temperature = temperature
+        self.deterministic_seed = deterministic_seed
+        self.cache_enabled = cache_enabled
+        self.request_timeout = request_timeout
+        self.connect_timeout = connect_timeout
+        if stream_idle_timeout is None:
+            stream_idle_timeout = request_timeout if self.api_provider == "qwen" else 15.0
+        self.stream_idle_timeout = stream_idle_timeout
+        self.attempt_timeout = attempt_timeout
+        self.mission_history_limit = mission_history_limit
+        if prompt_token_budget is not None and not TIKTOKEN_AVAILABLE:
+            print("警告: tiktoken未安装，Prompt token预算检查将不可用")
+            prompt_token_budget = None
+        self.prompt_token_budget = prompt_token_budget
+        
+        # LLM响应缓存：相同输入直接返回，避免重复的网络往返（进程内所有引擎共享）
+        self._llm_cache = _SHARED_RESPONSE_CACHE
+        if semantic_cache and not EMBEDDING_AVAILABLE:
+            print("警告: sentence-transformers未安装，语义缓存将不可用")
+            semantic_cache = False
+        self.semantic_cache = semantic_cache
+        self.semantic_threshold = semantic_threshold
+        self._facts_json_cache: Dict[Tuple, str] = {}  # 局面 -> 事实核查数据JSON
+        self._player_names: Dict[int, str] = _PlayerNames()  # 玩家ID -> 名称（整局不变，见set_roster）
+        # 本阵营的回退发言表（阵营整局不变，回退时只需按局势查表）
+        fallback_team = Team.GOOD if my_team == Team.GOOD else Team.EVIL
+        self._fallback_table: Dict[str, str] = {situation: speech for (team, situation), speech
+                                                in self.FALLBACK_SPEECHES.items() if team == fallback_team}
+        self._semantic_indexes: Dict[str, FastSemanticIndex] = {}  # 按 (模型, System Prompt) 分别建索引
+        if cache_persist and not DISKCACHE_AVAILABLE:
+            print("警告: diskcache未安装，LLM响应持久化缓存将不可用")
+            cache_persist = False
+        self.cache_persist = cache_persist
+        self.cache_tag = cache_tag
         
         # 记忆系统：存储对话历史和关键事件
-        self.memory: List[str] = []
         self.max_memory_size = 20  # 限制记忆长度，防止Context窗口溢出
+        self.memory: Deque[str] = deque(maxlen=self.max_memory_size)  # 超出长度时自动淘汰最旧的记忆
         
         # Prompt模板路径
         self.prompts_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "prompts")
         
-        # 初始化LLM客户端
+        # 本角色各行为的Prompt模板（初始化时一次性加载，之后的决策不再访问文件系统）
+        self._templates: Dict[str, Optional[str]] = {
+            action: self._load_prompt_template("assassin" if action == "assassination" else self._role_name_str, action)
+            for action in self.PROMPT_ACTIONS
+        }
+        
+        # 静态System Prompt（整局游戏不变，便于服务端Prompt前缀缓存命中）
+        # 所有随局势变化的内容（事实、记忆、局势描述）都放在User Prompt中
+        self._static_system_prompts: Dict[str, str] = {
+            action: self._build_static_system_prompt(action)
+            for action in self.PROMPT_ACTIONS
+        }
+        self._prompt_cache_keys: Dict[str, str] = {
+            action: hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:16]
+            for action, prompt in self._static_system_prompts.items()
+        }
+        
+        # 初始化LLM客户端（异步客户端在首次异步调用时按事件循环创建）
+        self._client_config: Optional[Tuple[Optional[str], Optional[str]]] = None
+        self._async_client = None
+        self._async_client_loop = None
         if LLM_AVAILABLE:
             # 根据提供商选择API密钥和base_url
             if self.api_provider == "deepseek":
-                api_key = api_key or os.getenv("DEEPSEEK_API_KEY") or os.getenv("OPENAI_API_KEY")
+                api_key = api_key or _ENV.get("DEEPSEEK_API_KEY") or _ENV.get("OPENAI_API_KEY")
                 base_url = "https://api.deepseek.com"
             elif self.api_provider == "qwen":
                 # 本地Qwen模型（通过OpenAI兼容API）
-                api_key = api_key or os.getenv("QWEN_API_KEY", "not-needed")  # 本地部署通常不需要真实key
-                base_url = os.getenv("QWEN_BASE_URL", "http://localhost:8000/v1")  # 默认本地地址
+                api_key = api_key or _ENV.get("QWEN_API_KEY", "not-needed")  # 本地部署通常不需要真实key
+                base_url = _ENV.get("QWEN_BASE_URL", "http://localhost:8000/v1")  # 默认本地地址
                 # 对于qwen，base_url是必需的，如果未设置则使用默认值
                 if not base_url:
                     base_url = "http://localhost:8000/v1"
             elif self.api_provider == "openai":
-                api_key = api_key or os.getenv("OPENAI_API_KEY")
+                api_key = api_key or _ENV.get("OPENAI_API_KEY")
                 base_url = None  # 使用OpenAI默认URL
             else:
                 # 自定义API提供商
-                api_key = api_key or os.getenv(f"{self.api_provider.upper()}_API_KEY") or os.getenv("OPENAI_API_KEY")
-                base_url = os.getenv(f"{self.api_provider.upper()}_BASE_URL")
+                api_key = api_key or _ENV.get(f"{self.api_provider.upper()}_API_KEY") or _ENV.get("OPENAI_API_KEY")
+                base_url = _ENV.get(f"{self.api_provider.upper()}_BASE_URL")
             
             # 判断是否能够初始化客户端
             can_init = False
@@ -85,12 +487,9 @@ class LLMStrategyEngine:
                 can_init = bool(api_key or base_url)
             
             if can_init:
-                if base_url:
-                    # 需要指定base_url（DeepSeek、Qwen或自定义）
-                    self.client = OpenAI(api_key=api_key, base_url=base_url)
-                else:
-                    # OpenAI使用默认配置
-                    self.client = OpenAI(api_key=api_key)
+                self._client_config = (api_key, base_url)  # 用于按事件循环创建异步客户端
+                # base_url为None时使用OpenAI默认URL；DeepSeek、Qwen或自定义提供商需要指定base_url
+                self.client = _get_client(api_key, base_url, self.connect_timeout, self.request_timeout)
             else:
                 self.client = None
                 provider_name = self.api_provider.upper()
@@ -99,52 +498,120 @@ class LLMStrategyEngine:
             self.client = None
     
     def add_to_memory(self, event: str):
-        """添加事件到记忆"""
+        """添加事件到记忆（deque自动只保留最近的N条）"""
         self.memory.append(event)
-        # 限制记忆长度，只保留最近的N条
-        if len(self.memory) > self.max_memory_size:
-            self.memory = self.memory[-self.max_memory_size:]
     
     def get_memory_summary(self) -> str:
         """获取记忆摘要"""
         if not self.memory:
             return "暂无记忆。"
-        return "\n".join([f"- {event}" for event in self.memory[-10:]])  # 只返回最近10条
+        recent = islice(self.memory, max(0, len(self.memory) - 10), None)  # 只返回最近10条
+        return "\n".join(f"- {event}" for event in recent)
     
     def _load_prompt_template(self, role_name: str, action_name: str) -> Optional[str]:
-        """加载Prompt模板"""
-        role_file = os.path.join(self.prompts_dir, "roles", f"{role_name}.md")
-        action_file = os.path.join(self.prompts_dir, "actions", f"{action_name}.md")
-        
-        role_prompt = ""
-        action_prompt = ""
-        
-        # 加载角色Prompt
-        if os.path.exists(role_file):
-            try:
-                with open(role_file, "r", encoding="utf-8") as f:
-                    role_prompt = f.read()
-            except Exception as e:
-                print(f"警告: 无法加载角色Prompt {role_file}: {e}")
-        
-        # 加载行为Prompt
-        if os.path.exists(action_file):
-            try:
-                with open(action_file, "r", encoding="utf-8") as f:
-                    action_prompt = f.read()
-            except Exception as e:
-                print(f"警告: 无法加载行为Prompt {action_file}: {e}")
+        """加载Prompt模板（带缓存）"""
+        return _read_prompt_template(self.prompts_dir, role_name, action_name)
+    
+    def _build_static_system_prompt(self, action_name: str) -> str:
+        """构建某个行为的静态System Prompt（角色模板+身份，不含任何随局势变化的内容）"""
+        template = self._templates.get(action_name)
         
-        if role_prompt or action_prompt:
-            return f"{role_prompt}\n\n{action_prompt}" if role_prompt and action_prompt else (role_prompt or action_prompt)
+        if template:
+            if action_name in ("mission_vote", "assassination"):
+                return f"""{template}
+
+你的名字是{self.my_name}。"""
+            return f"""{template}
+
+你的名字是{self.my_name}。
+你的人格特质是{self.personality.value}。"""
         
-        return None
+        # 回退到默认Prompt
+        if action_name == "team_proposal":
+            return f"""你是一个阿瓦隆游戏中的玩家。
+你是{self.my_role.value}（{self.my_team.value}阵营）
+你的名字是{self.my_name}。
+你的人格特质是{self.personality.value}。
+
+请按照思维链（Chain-of-Thought）进行推理，展示你的思考过程。"""
+        if action_name == "vote":
+            return f"""你是一个阿瓦隆游戏中的玩家。
+你的名字是{self.my_name}。
+你的人格特质是{self.personality.value}。
+
+请按照思维链（Chain-of-Thought）进行推理。"""
+        if action_name == "mission_vote":
+            return f"""你是一个阿瓦隆游戏中的{self.my_role.value}（{self.my_team.value}阵营）。
+你的名字是{self.my_name}。
+
+作为坏人，你需要决定是否破坏任务（投失败票）。
+
+请按照思维链（Chain-of-Thought）进行推理。"""
+        if action_name == "assassination":
+            return """你是一个阿瓦隆游戏中的刺客（坏人阵营）。
+好人已经完成了3个任务，现在你可以刺杀梅林。
+如果成功刺杀梅林，坏人阵营获胜；如果刺杀错误，好人阵营获胜。
+
+请按照思维链（Chain-of-Thought）进行推理。"""
+        return f"""你是一个阿瓦隆游戏中的{self.my_role.value}（{self.my_team.value}阵营）。
+你的名字是{self.my_name}。
+你的人格特质是{self.personality.value}。
+
+请生成一段自然的发言。
+请按照思维链（Chain-of-Thought）思考发言目的和内容。"""
+    
+    def _pick_model(self, action_name: str, context: DecisionContext) -> str:
+        """
+        按决策的信息量选择模型：第1轮的投票/发言（尚无任何历史）和前两轮坏人的任务投票
+        交给小模型，队伍提议、刺杀以及中后期决策使用主模型
+        """
+        if self.model_small == self.model:
+            return self.model
+        if action_name in ("vote", "speech") and context.current_round == 1:
+            return self.model_small
+        if action_name == "mission_vote" and context.current_round <= 2:
+            return self.model_small
+        return self.model
+    
+    def set_roster(self, all_players: List[Dict]):
+        """记录本局玩家名单（开局时调用一次），之后所有Prompt共用同一份 玩家ID -> 名称 映射"""
+        self._player_names = _PlayerNames.from_players(all_players)
+    
+    def share_facts_cache(self, cache: Dict[Tuple, str]):
+        """
+        与同一局的其他玩家共享事实核查JSON缓存（开局时调用一次）
+        事实数据不含私有信息，同一局面下所有玩家完全相同：每个局面只序列化一次，各玩家Prompt中的事实部分逐字节一致
+        """
+        self._facts_json_cache = cache
+    
+    def _roster(self, all_players: List[Dict]) -> Dict[int, str]:
+        """本局的 玩家ID -> 名称 映射；未调用set_roster时按首次传入的玩家列表建立"""
+        if not self._player_names:
+            self.set_roster(all_players)
+        return self._player_names
+    
+    def _prompt_cache_key(self, action_name: str) -> str:
+        """Prompt前缀缓存键：静态System Prompt（模板+身份+性格）的哈希，前缀完全相同的请求共享同一个键"""
+        return self._prompt_cache_keys[action_name]
+    
+    def _build_dynamic_preamble(self, facts_json: str, memory_summary: str,
+                                fact_label: str = "回答") -> str:
+        """构建User Prompt开头的动态部分（事实核查JSON+记忆）"""
+        return f"""**重要：事实核查**
+你的{fact_label}必须基于以下提供的游戏事实（JSON格式），不得编造信息：
+{facts_json}
+
+**记忆（之前的决策和行为）**：
+{memory_summary}
+"""
     
     def _build_fact_check_context(self, context: DecisionContext, 
                                   all_players: List[Dict],
-                                  mission_history: Optional[List[Dict]] = None) -> Dict:
+                                  mission_history: Optional[List[Dict]] = None,
+                                  player_names: Optional[Dict[int, str]] = None) -> Dict:
         """构建事实核查上下文（结构化数据）"""
-        player_names = {p["player_id"]: p["name"] for p in all_players}
+        if player_names is None:
+            player_names = self._roster(all_players)
         
         facts = {
             "current_round": context.current_round,
@@ -155,7 +622,7 @@ class LLMStrategyEngine:
             "vote_round": context.vote_round,
             "current_leader": {
                 "player_id": context.current_leader,
-                "name": player_names.get(context.current_leader, f"玩家{context.current_leader}")
+                "name": player_names[context.current_leader]
             },
             "mission_config": context.mission_config,
             "players": [
@@ -170,6 +637,10 @@ class LLMStrategyEngine:
         # 明确标注是否有历史信息
         if mission_history and len(mission_history) > 0:
             facts["has_mission_history"] = True
+            # 只保留最近几轮，控制Prompt长度（预填充耗时与token数成正比）
+            if len(mission_history) > self.mission_history_limit:
+                facts["omitted_earlier_rounds"] = len(mission_history) - self.mission_history_limit
+                mission_history = mission_history[-self.mission_history_limit:]
             facts["mission_history"] = [
                 {
                     "round": m["round"],
@@ -191,122 +662,461 @@ class LLMStrategyEngine:
         
         return facts
     
-    def _call_llm(self, prompt: str, system_prompt: str = None, max_retries: int = 3) -> str:
-        """调用LLM，带重试机制和更好的错误处理"""
+    def _facts_json(self, context: DecisionContext, all_players: List[Dict],
+                    mission_history: Optional[List[Dict]], player_names: Dict[int, str],
+                    **extra: List[int]) -> str:
+        """
+        事实核查数据的JSON字符串；同一局面（轮次、比分、投票轮次、队长、任务历史长度等）下
+        重复构建时直接复用上次的序列化结果（任务历史只追加，玩家列表整局不变）
+        extra: 追加到事实数据末尾的字段（如proposed_team）
+        """
+        mission_config = context.mission_config or {}
+        key = (context.current_round, context.game_phase, context.successful_missions,
+               context.failed_missions, context.vote_round, context.current_leader,
+               tuple(mission_config.items()), len(all_players), len(mission_history or ()),
+               self.mission_history_limit, tuple((name, tuple(value)) for name, value in extra.items()))
+        facts_json = self._facts_json_cache.get(key)
+        if facts_json is None:
+            facts = self._build_fact_check_context(context, all_players, mission_history, player_names=player_names)
+            facts.update(extra)
+            facts_json = _dumps_compact(facts)
+            if len(self._facts_json_cache) >= self.FACTS_JSON_CACHE_SIZE:
+                self._facts_json_cache.clear()
+            self._facts_json_cache[key] = facts_json
+        return facts_json
+    
+    def _call_llm(self, prompt: str, system_prompt: str = None, max_retries: int = 3,
+                  max_tokens: int = 500, cache_key: Optional[str] = None,
+                  expect_json: bool = False, model: Optional[str] = None,
+                  stop_after_chars: Optional[int] = None) -> str:
+        """
+        调用LLM，带重试机制和更好的错误处理
+        cache_key: Prompt前缀缓存键（OpenAI的prompt_cache_key），相同静态前缀的请求使用相同的键
+        expect_json: 响应是JSON对象时，流式接收到对象闭合即停止，并只返回该JSON对象；
+                     支持的提供商同时开启JSON模式，保证输出可解析
+        model: 本次调用使用的模型，默认self.model
+        stop_after_chars: 纯文本响应超过该字符数后，遇到空行即停止接收并丢弃其后内容
+        """
         if not self.client:
             raise RuntimeError("LLM客户端未初始化")
         
+        request_kwargs, response_key, cached, semantic = self._prepare_request(prompt, system_prompt, max_tokens,
+                                                                               cache_key, expect_json, model)
+        if cached is not None:
+            return cached
+        
+        for attempt in range(max_retries + 1):
+            try:
+                deadline = time.monotonic() + self.attempt_timeout if self.attempt_timeout else None
+                stream = self.client.chat.completions.create(**request_kwargs)
+                result = self._consume_stream(stream, expect_json, deadline, stop_after_chars)
+                self._store_response(response_key, result, semantic)
+                return result
+            except Exception as e:
+                time.sleep(self._retry_wait(e, attempt, max_retries))
+    
+    async def _acall_llm(self, prompt: str, system_prompt: str = None, max_retries: int = 3,
+                         max_tokens: int = 500, cache_key: Optional[str] = None,
+                         expect_json: bool = False, model: Optional[str] = None,
+                         stop_after_chars: Optional[int] = None) -> str:
+        """_call_llm的异步版本：等待响应期间不阻塞事件循环，可与其他LLM调用并发"""
+        if not self.client:
+            raise RuntimeError("LLM客户端未初始化")
+        
+        request_kwargs, response_key, cached, semantic = self._prepare_request(prompt, system_prompt, max_tokens,
+                                                                               cache_key, expect_json, model)
+        if cached is not None:
+            return cached
+        
+        client = self._get_async_client()
+        for attempt in range(max_retries + 1):
+            try:
+                result = await asyncio.wait_for(self._astream_completion(client, request_kwargs, expect_json,
+                                                                         stop_after_chars),
+                                                timeout=self.attempt_timeout)
+                self._store_response(response_key, result, semantic)
+                return result
+            except Exception as e:
+                await asyncio.sleep(self._retry_wait(e, attempt, max_retries))
+    
+    def batch_call(self, prompts: List[Tuple[str, str]], max_tokens: int = 500,
+                   cache_keys: Optional[List[Optional[str]]] = None,
+                   model: Optional[str] = None, stop_after_chars: Optional[int] = None) -> List:
+        """
+        一次处理多条 (System Prompt, User Prompt)，按输入顺序返回响应（失败的条目为异常对象）
+        use_batch_api且提供商为OpenAI时提交到Batch API，否则并发发出普通请求
+        stop_after_chars: 同_call_llm（Batch API不支持流式，收到完整响应后按相同规则截断）
+        """
+        if not self.client:
+            raise RuntimeError("LLM客户端未初始化")
+        if not (self.use_batch_api and self.api_provider == "openai"):
+            # 临时事件循环用完即释放其连接池；已有可复用事件循环的调用方应使用abatch_call
+            return event_loop.run(self.abatch_call(prompts, max_tokens, cache_keys, model, stop_after_chars))
+        if cache_keys is None:
+            cache_keys = [None] * len(prompts)
+        
+        # 先查缓存，只把未命中的请求提交到Batch API
+        results: List = [None] * len(prompts)
+        pending = []  # (下标, 请求参数, 响应缓存键, 语义缓存待写入项)
+        for i, ((system_prompt, prompt), cache_key) in enumerate(zip(prompts, cache_keys)):
+            request_kwargs, response_key, cached, semantic = self._prepare_request(prompt, system_prompt, max_tokens,
+                                                                                   cache_key, False, model)
+            if cached is not None:
+                results[i] = cached
+            else:
+                pending.append((i, request_kwargs, response_key, semantic))
+        if not pending:
+            return results
+        
+        try:
+            responses = self._submit_provider_batch([request_kwargs for _, request_kwargs, _, _ in pending])
+        except Exception as e:
+            print(f"警告: Batch API请求失败，改为逐条调用: {type(e).__name__} - {str(e)[:200]}")
+            responses = [None] * len(pending)
+        
+        for (i, _, response_key, semantic), response in zip(pending, responses):
+            if response is None:
+                # 批量结果中缺失（单条出错或整批失败）的请求逐条重新调用
+                system_prompt, prompt = prompts[i]
+                try:
+                    response = self._call_llm(prompt, system_prompt, max_tokens=max_tokens,
+                                              cache_key=cache_keys[i], model=model,
+                                              stop_after_chars=stop_after_chars)
+                except Exception as e:
+                    response = e
+            else:
+                cut = _paragraph_cut(response, stop_after_chars)
+                response = (response[:cut] if cut is not None else response).strip()
+                self._store_response(response_key, response, semantic)
+            results[i] = response
+        return results
+    
+    async def abatch_call(self, prompts: List[Tuple[str, str]], max_tokens: int = 500,
+                          cache_keys: Optional[List[Optional[str]]] = None,
+                          model: Optional[str] = None, stop_after_chars: Optional[int] = None) -> List:
+        """
+        batch_call的异步版本：并发请求在当前事件循环中发出，复用该事件循环上的连接池
+        提交到Batch API时需要阻塞轮询，在线程中执行
+        """
+        if not self.client:
+            raise RuntimeError("LLM客户端未初始化")
+        if self.use_batch_api and self.api_provider == "openai":
+            return await asyncio.to_thread(self.batch_call, prompts, max_tokens, cache_keys, model, stop_after_chars)
+        if cache_keys is None:
+            cache_keys = [None] * len(prompts)
+        return await asyncio.gather(*(
+            self._acall_llm(prompt, system_prompt, max_tokens=max_tokens, cache_key=cache_key, model=model,
+                            stop_after_chars=stop_after_chars)
+            for (system_prompt, prompt), cache_key in zip(prompts, cache_keys)
+        ), return_exceptions=True)
+    
+    def _submit_provider_batch(self, requests: List[Dict]) -> List[Optional[str]]:
+        """
+        把多条Chat Completions请求作为一个OpenAI Batch任务提交，轮询直到结束
+        返回与requests一一对应的响应内容（出错的条目为None）
+        """
+        lines = []
+        for i, request_kwargs in enumerate(requests):
+            # 流式、超时等只对在线请求有意义；prompt_cache_key等extra_body字段并入请求体
+            body = {k: v for k, v in request_kwargs.items() if k not in ("stream", "timeout", "extra_body")}
+            body.update(request_kwargs.get("extra_body", {}))
+            lines.append(_dumps_compact({"custom_id": str(i), "method": "POST",
+                                         "url": "/v1/chat/completions", "body": body}))
+        
+        batch_file = self.client.files.create(file=("avalon_batch.jsonl", "\n".join(lines).encode("utf-8")),
+                                              purpose="batch")
+        batch = self.client.batches.create(input_file_id=batch_file.id, endpoint="/v1/chat/completions",
+                                           completion_window="24h")
+        deadline = time.monotonic() + self.BATCH_MAX_WAIT
+        while batch.status not in ("completed", "failed", "expired", "cancelled"):
+            if time.monotonic() > deadline:
+                self.client.batches.cancel(batch.id)
+                raise TimeoutError(f"Batch任务 {batch.id} 超过 {self.BATCH_MAX_WAIT} 秒未完成")
+            time.sleep(self.BATCH_POLL_INTERVAL)
+            batch = self.client.batches.retrieve(batch.id)
+        
+        responses: List[Optional[str]] = [None] * len(requests)
+        if batch.output_file_id:
+            for line in self.client.files.content(batch.output_file_id).text.splitlines():
+                if not line.strip():
+                    continue
+                row = json.loads(line)
+                response = row.get("response") or {}
+                if response.get("status_code") == 200:
+                    responses[int(row["custom_id"])] = response["body"]["choices"][0]["message"]["content"] or ""
+        return responses
+    
+    async def _astream_completion(self, client: "AsyncOpenAI", request_kwargs: Dict, expect_json: bool,
+                                  stop_after_chars: Optional[int] = None) -> str:
+        """发出一次异步请求并读完流式响应（整体受attempt_timeout约束）"""
+        stream = await client.chat.completions.create(**request_kwargs)
+        return await self._aconsume_stream(stream, expect_json, stop_after_chars)
+    
+    def _get_async_client(self) -> "AsyncOpenAI":
+        """获取当前事件循环对应的异步客户端（事件循环变化或客户端已随事件循环释放时重新获取）"""
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_client_loop is not loop or self._async_client.is_closed():
+            api_key, base_url = self._client_config
+            self._async_client = _get_shared_async_client(api_key, base_url, self.connect_timeout,
+                                                          self.request_timeout)
+            self._async_client_loop = loop
+        return self._async_client
+    
+    def _prepare_request(self, prompt: str, system_prompt: Optional[str], max_tokens: int,
+                         cache_key: Optional[str], expect_json: bool,
+                         model: Optional[str] = None) -> Tuple[Dict, Optional[str], Optional[str], Optional[Tuple]]:
+        """
+        构建请求参数并查询响应缓存（先精确匹配，再语义匹配）
+        返回 (请求参数, 响应缓存键, 已缓存的响应, 语义缓存待写入项)
+        """
+        model = model or self.model
         messages = []
         if system_prompt:
             messages.append({"role": "system", "content": system_prompt})
         messages.append({"role": "user", "content": prompt})
         
-        last_error = None
-        for attempt in range(max_retries + 1):
-            try:
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=messages,
-                    temperature=0.7,
-                    max_tokens=500,
-                    timeout=60  # 增加到60秒超时
-                )
-                return response.choices[0].message.content.strip()
-            except Exception as e:
-                last_error = e
-                error_str = str(e).lower()
-                
-                # 判断错误类型
-                is_connection_error = any(keyword in error_str for keyword in [
-                    "connection", "connect", "network", "timeout", "timed out", 
-                    "10054", "远程主机", "connection error"
-                ])
-                
-                if attempt < max_retries:
-                    # 重试前等待，连接错误等待更长时间
-                    import time
-                    wait_time = 2.0 if is_connection_error else 0.5 * (attempt + 1)
-                    print(f"LLM调用失败 (尝试 {attempt + 1}/{max_retries + 1})，{wait_time}秒后重试...")
-                    if is_connection_error:
-                        print(f"  错误类型: 连接错误 - {type(e).__name__}")
-                    time.sleep(wait_time)
+        if self.prompt_token_budget is not None:
+            encoder = _get_token_encoder(model)
+            prompt_tokens = sum(len(encoder.encode(m["content"])) for m in messages)
+            if prompt_tokens > self.prompt_token_budget:
+                print(f"警告: Prompt长度 {prompt_tokens} tokens 超出预算 {self.prompt_token_budget}")
+        
+        request_kwargs = {
+            "model": model,
+            "messages": messages,
+            "temperature": self.temperature,
+            "max_tokens": max_tokens,
+            "stream": True,
+            # read超时作用于每次读取，即流式分块之间的空闲超时，服务端卡住时几秒内即可放弃
+            "timeout": self._http_timeout(read=min(self.stream_idle_timeout, self.attempt_timeout or float("inf")))
+        }
+        if self.deterministic_seed is not None:
+            request_kwargs["seed"] = self.deterministic_seed
+        if cache_key and self.api_provider == "openai":
+            # DeepSeek/Qwen等按前缀自动缓存，无需额外参数
+            request_kwargs["extra_body"] = {"prompt_cache_key": cache_key}
+        if expect_json and self.api_provider in self.JSON_MODE_PROVIDERS:
+            request_kwargs["response_format"] = {"type": "json_object"}
+        
+        # 响应缓存：temperature>0时输出不可复现，除非固定了采样种子
+        use_cache = self.cache_enabled and (self.temperature <= 0 or self.deterministic_seed is not None)
+        response_key = None
+        if use_cache:
+            response_key, cached = self._lookup_exact(model, system_prompt, prompt, max_tokens)
+            if cached is not None:
+                return request_kwargs, response_key, cached, None
+        
+        # 语义缓存：只用于自由文本（发言）——投票、组队等JSON决策的Prompt只有轮次、队伍等少量字段不同，
+        # 向量相似度无法区分，复用会把一个局面的决策套到另一个局面上；与精确缓存一样要求输出可复现；
+        # 只在相同模型、相同System Prompt（同一角色的同一行为）内检索
+        semantic = None
+        if self.semantic_cache and use_cache and not expect_json:
+            index_key = f"{model}\0{system_prompt or ''}"
+            index = self._semantic_indexes.get(index_key)
+            if index is None:
+                index = self._semantic_indexes[index_key] = FastSemanticIndex(threshold=self.semantic_threshold)
+            embedding = embed_text(prompt)
+            cached = index.search(embedding)
+            if cached is not None:
+                return request_kwargs, response_key, cached, None
+            semantic = (index, embedding)
+        
+        return request_kwargs, response_key, None, semantic
+    
+    def _lookup_exact(self, model: str, system_prompt: Optional[str], prompt: str,
+                      max_tokens: int) -> Tuple[str, Optional[str]]:
+        """精确匹配缓存查询，返回 (响应缓存键, 已缓存的响应)"""
+        key_parts = [self.api_provider, model, system_prompt or "", prompt, str(self.temperature),
+                     str(self.deterministic_seed), str(max_tokens)]
+        if self.cache_persist:
+            # 持久化缓存跨越多次运行，键中加入版本标签和模板签名
+            key_parts += [self.cache_tag, _prompt_templates_signature(self.prompts_dir)]
+        response_key = hashlib.sha256("\0".join(key_parts).encode("utf-8")).hexdigest()
+        cached = self._llm_cache.get(response_key)
+        if cached is None and self.cache_persist:
+            cached = _get_persist_cache().get(response_key)
+            if cached is not None:
+                self._llm_cache.set(response_key, cached)
+        return response_key, cached
+    
+    def _store_response(self, response_key: Optional[str], result: str, semantic: Optional[Tuple] = None):
+        """把响应写入缓存（response_key为None表示不可精确缓存；semantic为语义缓存待写入项）"""
+        if semantic is not None:
+            index, embedding = semantic
+            index.add(embedding, result)
+        if response_key is None:
+            return
+        self._llm_cache.set(response_key, result)
+        if self.cache_persist:
+            _get_persist_cache().set(response_key, result, expire=PERSIST_CACHE_EXPIRE)
+    
+    def cache_stats(self) -> Dict:
+        """响应缓存命中统计（精确匹配缓存为进程内共享，统计的是所有引擎的总和）"""
+        return {
+            "exact": self._llm_cache.stats(),
+            "semantic": [index.stats() for index in self._semantic_indexes.values()]
+        }
+    
+    def _retry_wait(self, e: Exception, attempt: int, max_retries: int) -> float:
+        """处理一次LLM调用失败：返回重试前的等待时间（秒）；不可重试或已用尽重试次数时抛出异常"""
+        error_str = str(e).lower()
+        
+        # 判断错误类型
+        is_connection_error = any(keyword in error_str for keyword in [
+            "connection", "connect", "network", "timeout", "timed out", 
+            "10054", "远程主机", "connection error"
+        ])
+        
+        # 客户端错误（401/400等）重试也不会成功，直接抛出，避免耗尽重试预算
+        status_code = getattr(e, "status_code", None) if isinstance(e, APIStatusError) else None
+        if status_code is not None and status_code not in self.RETRYABLE_STATUS_CODES:
+            error_msg = f"LLM调用失败 (HTTP {status_code}，不可重试): {type(e).__name__} - {str(e)[:200]}"
+            print(error_msg)
+            raise RuntimeError(error_msg) from e
+        
+        # 超时（卡住的请求）首次立即重试：通常换一个连接就能在P50时间内返回
+        is_timeout = isinstance(e, (TimeoutError, asyncio.TimeoutError, httpx.TimeoutException, APITimeoutError))
+        if is_timeout and attempt == 0 and attempt < max_retries:
+            print(f"LLM调用超时 (尝试 {attempt + 1}/{max_retries + 1})，立即重试...")
+            return 0.0
+        
+        if attempt < max_retries:
+            # 指数退避+完全抖动，避免所有智能体同时重试
+            wait_time = min(self.RETRY_BACKOFF_CAP, self.RETRY_BACKOFF_BASE * 2 ** attempt) * random.random()
+            print(f"LLM调用失败 (尝试 {attempt + 1}/{max_retries + 1})，{wait_time:.1f}秒后重试...")
+            if is_connection_error:
+                print(f"  错误类型: 连接错误 - {type(e).__name__}")
+            return wait_time
+        
+        # 最后一次尝试失败，抛出异常
+        error_msg = f"LLM调用失败 (已重试 {max_retries + 1} 次)"
+        if is_connection_error:
+            error_msg += f": 连接错误 - 请检查网络连接和API服务状态"
+        elif is_timeout or "timeout" in error_str or "timed out" in error_str:
+            error_msg += f": 请求超时 - 请检查网络连接或增加超时时间"
+        else:
+            error_msg += f": {type(e).__name__} - {str(e)[:200]}"
+        print(error_msg)
+        raise RuntimeError(error_msg) from e
+    
+    def _http_timeout(self, read: Optional[float] = None) -> "httpx.Timeout":
+        """构建HTTP超时配置：区分连接超时与读/写超时，连接池等待不设上限"""
+        return httpx.Timeout(connect=self.connect_timeout,
+                             read=read if read is not None else self.request_timeout,
+                             write=self.request_timeout, pool=None)
+    
+    def _consume_stream(self, stream, expect_json: bool, deadline: Optional[float] = None,
+                        stop_after_chars: Optional[int] = None) -> str:
+        """
+        读取流式响应；expect_json时在第一个JSON对象闭合后立即关闭连接
+        deadline: time.monotonic()截止时间，超过后放弃（抛出TimeoutError）
+        stop_after_chars: 纯文本超过该字符数后遇到空行即关闭连接，只返回空行之前的内容
+        """
+        buf = ""
+        tracker = _JsonObjectTracker() if expect_json else None
+        try:
+            for chunk in stream:
+                if deadline is not None and time.monotonic() > deadline:
+                    raise TimeoutError(f"LLM请求超过 {self.attempt_timeout} 秒未完成")
+                if not chunk.choices:
                     continue
-                else:
-                    # 最后一次尝试失败，抛出异常
-                    error_msg = f"LLM调用失败 (已重试 {max_retries + 1} 次)"
-                    if is_connection_error:
-                        error_msg += f": 连接错误 - 请检查网络连接和API服务状态"
-                    elif "timeout" in error_str or "timed out" in error_str:
-                        error_msg += f": 请求超时 - 请检查网络连接或增加超时时间"
-                    else:
-                        error_msg += f": {type(e).__name__} - {str(e)[:200]}"
-                    print(error_msg)
-                    raise RuntimeError(error_msg) from e
+                buf += chunk.choices[0].delta.content or ""
+                if tracker is not None and tracker.feed(buf):
+                    return buf[tracker.start:tracker.end + 1]
+                cut = _paragraph_cut(buf, stop_after_chars)
+                if cut is not None:
+                    return buf[:cut].strip()
+        finally:
+            stream.close()
+        return buf.strip()
+    
+    async def _aconsume_stream(self, stream, expect_json: bool, stop_after_chars: Optional[int] = None) -> str:
+        """_consume_stream的异步版本"""
+        buf = ""
+        tracker = _JsonObjectTracker() if expect_json else None
+        try:
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                buf += chunk.choices[0].delta.content or ""
+                if tracker is not None and tracker.feed(buf):
+                    return buf[tracker.start:tracker.end + 1]
+                cut = _paragraph_cut(buf, stop_after_chars)
+                if cut is not None:
+                    return buf[:cut].strip()
+        finally:
+            await stream.close()
+        return buf.strip()
     
     def _build_game_context_description(self, context: DecisionContext, 
                                         belief_system: BeliefSystem,
                                         all_players: List[Dict],
                                         proposed_team: Optional[List[int]] = None,
-                                        mission_history: Optional[List[Dict]] = None) -> str:
+                                        mission_history: Optional[List[Dict]] = None,
+                                        player_names: Optional[Dict[int, str]] = None) -> str:
         """构建游戏上下文描述"""
-        # 获取玩家名称映射
-        player_names = {p["player_id"]: p["name"] for p in all_players}
+        # 获取玩家名称映射（调用方已构建时直接复用）
+        if player_names is None:
+            player_names = self._roster(all_players)
         
+        # 逐段追加到列表，最后一次性拼接（避免反复拼接字符串产生大量中间对象）
         # 构建游戏状态描述
-        game_state_desc = f"""
+        parts = [f"""
 游戏状态：
 - 当前阶段: {context.game_phase.value}
 - 当前轮次: {context.current_round}
 - 成功任务数: {context.successful_missions}
 - 失败任务数: {context.failed_missions}
 - 投票轮次: {context.vote_round} (最多5次，如果5次都未通过则坏人直接获胜)
-- 当前队长: {player_names.get(context.current_leader, f"玩家{context.current_leader}")}
-"""
+- 当前队长: {player_names[context.current_leader]}
+"""]
         
         if proposed_team:
-            team_names = [player_names.get(pid, f"玩家{pid}") for pid in proposed_team]
-            game_state_desc += f"- 提议的队伍: {', '.join(team_names)}\n"
+            parts.append(f"- 提议的队伍: {', '.join(player_names[pid] for pid in proposed_team)}\n")
         
         # 构建任务历史描述（关键信息！）
-        mission_history_desc = ""
-        if mission_history and len(mission_history) > 0:
-            mission_history_desc = "\n任务历史（重要推理依据）：\n"
+        if mission_history:
+            parts.append("\n任务历史（重要推理依据）：\n")
             for mission in mission_history:
                 team_str = ", ".join(mission["team"])
                 result_str = "成功" if mission["success"] else "失败"
-                mission_history_desc += f"- 第{mission['round']}轮: 队伍 [{team_str}] - {result_str}"
+                parts.append(f"- 第{mission['round']}轮: 队伍 [{team_str}] - {result_str}")
                 if not mission["success"]:
-                    mission_history_desc += f" (失败票数: {mission['fail_count']}/{mission['team_size']})"
+                    parts.append(f" (失败票数: {mission['fail_count']}/{mission['team_size']})")
                     # 关键推理提示
                     if mission['fail_count'] == mission['team_size']:
-                        mission_history_desc += f" ⚠️ 关键信息：失败票数等于队伍人数，说明队伍中所有人都是坏人！"
+                        parts.append(" ⚠️ 关键信息：失败票数等于队伍人数，说明队伍中所有人都是坏人！")
                     elif mission['fail_count'] > 0:
-                        mission_history_desc += f" ⚠️ 关键信息：队伍中有{mission['fail_count']}个坏人投了失败票"
-                mission_history_desc += "\n"
+                        parts.append(f" ⚠️ 关键信息：队伍中有{mission['fail_count']}个坏人投了失败票")
+                parts.append("\n")
         else:
             # 第一轮或没有历史时，明确说明
             if context.current_round == 1:
-                mission_history_desc = "\n⚠️ **重要：这是第1轮任务，还没有任何任务历史。不要提及'前几轮'、'之前的表现'等不存在的历史信息！**\n"
+                parts.append("\n⚠️ **重要：这是第1轮任务，还没有任何任务历史。不要提及'前几轮'、'之前的表现'等不存在的历史信息！**\n")
             else:
-                mission_history_desc = "\n任务历史：暂无\n"
+                parts.append("\n任务历史：暂无\n")
         
-        # 构建信念系统描述
-        belief_desc = "\n对其他玩家的判断：\n"
+        # 构建信念系统描述（好坏概率接近的玩家信息量低，合并为一行）
+        parts.append("\n对其他玩家的判断：\n")
+        uncertain_names = []
         for player_id, belief in belief_system.beliefs.items():
             if player_id == self.my_player_id:
                 continue
-            player_name = player_names.get(player_id, f"玩家{player_id}")
             good_prob = belief.team_probabilities.get(Team.GOOD, 0.5)
             evil_prob = belief.team_probabilities.get(Team.EVIL, 0.5)
+            if abs(good_prob - evil_prob) < 0.1:
+                uncertain_names.append(player_names[player_id])
+                continue
             trust = belief.trust_score
-            belief_desc += f"- {player_name}: 好人概率 {good_prob:.2f}, 坏人概率 {evil_prob:.2f}, 信任度 {trust:.2f}\n"
+            parts.append(f"- {player_names[player_id]}: 好人概率 {good_prob:.2f}, 坏人概率 {evil_prob:.2f}, 信任度 {trust:.2f}\n")
+        if uncertain_names:
+            parts.append(f"- 暂无法判断（好人/坏人概率接近）: {', '.join(uncertain_names)}\n")
         
         # 构建任务配置
-        mission_desc = ""
         if context.mission_config:
-            mission_desc = f"\n当前任务配置：\n- 队伍人数: {context.mission_config.get('team_size', 2)}\n- 需要失败票数: {context.mission_config.get('fails_needed', 1)}\n"
+            parts.append(f"\n当前任务配置：\n- 队伍人数: {context.mission_config.get('team_size', 2)}\n- 需要失败票数: {context.mission_config.get('fails_needed', 1)}\n")
         
-        return game_state_desc + mission_history_desc + belief_desc + mission_desc
+        return "".join(parts)
     
     def decide_team_proposal(self, context: DecisionContext, belief_system: BeliefSystem,
                             all_players: List[Dict], mission_history: Optional[List[Dict]] = None) -> List[int]:
@@ -314,26 +1124,23 @@ class LLMStrategyEngine:
         if not self.client:
             raise RuntimeError("LLM客户端未初始化，无法进行决策。请检查API配置。")
         
-        # 1. 加载Prompt模板
-        role_name_map = {
-            RoleType.MERLIN: "merlin",
-            RoleType.ASSASSIN: "assassin",
-            RoleType.PERCIVAL: "percival",
-            RoleType.MORGANA: "morgana",
-            RoleType.SERVANT: "servant",
-            RoleType.MORDRED: "mordred"
-        }
-        role_name = role_name_map.get(self.my_role, "servant")
-        template = self._load_prompt_template(role_name, "team_proposal")
+        # 队伍需要所有玩家时没有选择余地，无需调用LLM
+        if context.mission_config.get("team_size", 2) == len(all_players):
+            team = [p["player_id"] for p in all_players]
+            self.add_to_memory(f"第{context.current_round}轮：我提议了队伍 {', '.join(p['name'] for p in all_players)} (IDs: {team})")
+            return team
+        
+        # 1. 静态System Prompt（角色模板，整局不变）
+        system_prompt = self._static_system_prompts["team_proposal"]
         
         # 2. 构建事实核查上下文（结构化数据）
-        facts = self._build_fact_check_context(context, all_players, mission_history)
-        facts_json = json.dumps(facts, ensure_ascii=False, indent=2)
+        player_names = self._roster(all_players)
+        facts_json = self._facts_json(context, all_players, mission_history, player_names)
         
         # 3. 构建游戏上下文描述
         game_context = self._build_game_context_description(context, belief_system, all_players, 
-                                                          mission_history=mission_history)
-        player_names = {p["player_id"]: p["name"] for p in all_players}
+                                                          mission_history=mission_history,
+                                                          player_names=player_names)
         
         # 4. 获取记忆
         memory_summary = self.get_memory_summary()
@@ -352,44 +1159,14 @@ class LLMStrategyEngine:
                         elif p.get("team"):
                             visible_info_desc += f"- {p['name']} (ID:{p['player_id']}): {p['team']}阵营\n"
         
-        # 6. 构建System Prompt（使用模板或默认）
-        if template:
-            system_prompt = f"""{template}
-
-你的名字是{self.my_name}。
-你的人格特质是{self.personality.value}。
-
-**重要：事实核查**
-你的回答必须基于以下提供的游戏事实（JSON格式），不得编造信息：
-{facts_json}
-
-**记忆（之前的决策和行为）**：
-{memory_summary}
-"""
-        else:
-            # 回退到默认Prompt
-            role_info = f"你是{self.my_role.value}（{self.my_team.value}阵营）"
-            system_prompt = f"""你是一个阿瓦隆游戏中的玩家。
-{role_info}
-你的名字是{self.my_name}。
-你的人格特质是{self.personality.value}。
-
-**重要：事实核查**
-你的回答必须基于以下提供的游戏事实（JSON格式），不得编造信息：
-{facts_json}
-
-**记忆（之前的决策和行为）**：
-{memory_summary}
-
-请按照思维链（Chain-of-Thought）进行推理，展示你的思考过程。"""
-        
-        # 7. 构建User Prompt（包含CoT要求）
+        # 6. 构建User Prompt（动态内容：事实、记忆、局势，包含CoT要求）
         # 第一轮特殊提示
         first_round_warning = ""
         if context.current_round == 1:
             first_round_warning = "\n⚠️ **关键提醒：这是第1轮任务，游戏刚刚开始，还没有任何任务历史。在分析时不要假设存在历史信息！**\n"
         
-        user_prompt = f"""{game_context}
+        user_prompt = f"""{self._build_dynamic_preamble(facts_json, memory_summary)}
+{game_context}
 {first_round_warning}
 {visible_info_desc}
 
@@ -406,32 +1183,16 @@ class LLMStrategyEngine:
 4. 考虑角色目标
 5. 做出最终决策
 
-请以JSON格式返回你的决策，格式如下：
-{{
-    "thinking_process": {{
-        "step1_game_state": "你的分析...",
-        "step2_mission_history": "你的分析...",
-        "step3_player_evaluation": "你的分析...",
-        "step4_role_objectives": "你的分析...",
-        "step5_decision": "你的最终决策理由..."
-    }},
-    "team": [玩家ID列表，例如 [0, 1, 2]]
-}}
+请以JSON格式返回你的决策（单行紧凑JSON，不要缩进或换行），格式如下：
+{{"thinking_process":{{"step1_game_state":"你的分析...","step2_mission_history":"你的分析...","step3_player_evaluation":"你的分析...","step4_role_objectives":"你的分析...","step5_decision":"你的最终决策理由..."}},"team":[玩家ID列表，例如 [0, 1, 2]]}}
 
 只返回JSON，不要其他内容。"""
         
         try:
-            response = self._call_llm(user_prompt, system_prompt)
+            response = self._call_llm(user_prompt, system_prompt, cache_key=self._prompt_cache_key("team_proposal"),
+                                      max_tokens=self.ACTION_MAX_TOKENS["team_proposal"], expect_json=True)
             # 解析JSON
-            response = response.strip()
-            if response.startswith("```"):
-                lines = response.split("\n")
-                response = "\n".join(lines[1:-1])
-            if response.startswith("```json"):
-                lines = response.split("\n")
-                response = "\n".join(lines[1:-1])
-            
-            decision = json.loads(response)
+            decision = _extract_json(response)
             team = decision.get("team", [])
             
             # 事实核查：验证队伍大小
@@ -445,7 +1206,7 @@ class LLMStrategyEngine:
                 raise RuntimeError(f"LLM返回的队伍包含无效的玩家ID")
             
             # 记录决策到记忆
-            team_names = [player_names.get(pid, f"玩家{pid}") for pid in team]
+            team_names = [player_names[pid] for pid in team]
             self.add_to_memory(f"第{context.current_round}轮：我提议了队伍 {', '.join(team_names)} (IDs: {team})")
             
             return team
@@ -459,76 +1220,79 @@ class LLMStrategyEngine:
         if not self.client:
             raise RuntimeError("LLM客户端未初始化，无法进行决策。请检查API配置。")
         
-        # 1. 加载Prompt模板
-        role_name_map = {
-            RoleType.MERLIN: "merlin",
-            RoleType.ASSASSIN: "assassin",
-            RoleType.PERCIVAL: "percival",
-            RoleType.MORGANA: "morgana",
-            RoleType.SERVANT: "servant",
-            RoleType.MORDRED: "mordred"
-        }
-        role_name = role_name_map.get(self.my_role, "servant")
-        template = self._load_prompt_template(role_name, "vote")
+        # 规则强制同意时（队长必须同意自己的队伍；第5次投票必须同意，否则流局）直接返回，无需调用LLM
+        if self._is_vote_forced(context):
+            return self._record_vote(context, True, all_players, proposed_team)
+        
+        system_prompt, user_prompt = self._build_vote_prompts(context, belief_system, all_players,
+                                                              proposed_team, mission_history)
+        try:
+            response = self._call_llm(user_prompt, system_prompt, cache_key=self._prompt_cache_key("vote"),
+                                      max_tokens=self.ACTION_MAX_TOKENS["vote"], expect_json=True,
+                                      model=self._pick_model("vote", context))
+            vote = _extract_json(response).get("vote", True)
+            return self._record_vote(context, vote, all_players, proposed_team)
+        except Exception as e:
+            raise RuntimeError(f"LLM投票决策失败: {e}")
+    
+    async def adecide_vote(self, context: DecisionContext, belief_system: BeliefSystem,
+                           all_players: List[Dict], proposed_team: List[int],
+                           mission_history: Optional[List[Dict]] = None) -> bool:
+        """decide_vote的异步版本"""
+        if not self.client:
+            raise RuntimeError("LLM客户端未初始化，无法进行决策。请检查API配置。")
+        
+        if self._is_vote_forced(context):
+            return self._record_vote(context, True, all_players, proposed_team)
+        
+        system_prompt, user_prompt = self._build_vote_prompts(context, belief_system, all_players,
+                                                              proposed_team, mission_history)
+        try:
+            response = await self._acall_llm(user_prompt, system_prompt, cache_key=self._prompt_cache_key("vote"),
+                                             max_tokens=self.ACTION_MAX_TOKENS["vote"], expect_json=True,
+                                             model=self._pick_model("vote", context))
+            vote = _extract_json(response).get("vote", True)
+            return self._record_vote(context, vote, all_players, proposed_team)
+        except Exception as e:
+            raise RuntimeError(f"LLM投票决策失败: {e}")
+    
+    def _record_vote(self, context: DecisionContext, vote, all_players: List[Dict],
+                     proposed_team: List[int]) -> bool:
+        """记录投票决策到记忆并返回投票结果"""
+        player_names = self._roster(all_players)
+        vote_text = "同意" if vote else "拒绝"
+        self.add_to_memory(f"第{context.current_round}轮投票：我对队伍 {', '.join(player_names[pid] for pid in proposed_team)} 投了{vote_text}票")
+        return bool(vote)
+    
+    def _build_vote_prompts(self, context: DecisionContext, belief_system: BeliefSystem,
+                            all_players: List[Dict], proposed_team: List[int],
+                            mission_history: Optional[List[Dict]] = None) -> Tuple[str, str]:
+        """构建投票决策的 (System Prompt, User Prompt)"""
+        # 1. 静态System Prompt（角色模板，整局不变）
+        system_prompt = self._static_system_prompts["vote"]
         
         # 2. 构建事实核查上下文
-        facts = self._build_fact_check_context(context, all_players, mission_history)
-        facts["proposed_team"] = proposed_team
-        facts_json = json.dumps(facts, ensure_ascii=False, indent=2)
+        player_names = self._roster(all_players)
+        facts_json = self._facts_json(context, all_players, mission_history, player_names, proposed_team=proposed_team)
         
         # 3. 构建游戏上下文
         game_context = self._build_game_context_description(context, belief_system, all_players, 
                                                           proposed_team=proposed_team,
-                                                          mission_history=mission_history)
-        player_names = {p["player_id"]: p["name"] for p in all_players}
-        team_names = [player_names.get(pid, f"玩家{pid}") for pid in proposed_team]
+                                                          mission_history=mission_history,
+                                                          player_names=player_names)
+        team_names = [player_names[pid] for pid in proposed_team]
         
         # 4. 获取记忆
         memory_summary = self.get_memory_summary()
         
-        # 5. 检查是否是队长
-        is_leader = context.current_leader == self.my_player_id
-        
-        # 6. 构建System Prompt
-        if template:
-            system_prompt = f"""{template}
-
-你的名字是{self.my_name}。
-你的人格特质是{self.personality.value}。
-
-**重要：事实核查**
-你的回答必须基于以下提供的游戏事实（JSON格式），不得编造信息：
-{facts_json}
-
-**记忆（之前的决策和行为）**：
-{memory_summary}
-"""
-            if is_leader:
-                system_prompt += "\n重要：你是队长，你提议了这个队伍，所以你必须投票同意。"
-        else:
-            # 回退到默认Prompt
-            system_prompt = f"""你是一个阿瓦隆游戏中的玩家。
-你的名字是{self.my_name}。
-你的人格特质是{self.personality.value}。
-
-**重要：事实核查**
-你的回答必须基于以下提供的游戏事实（JSON格式），不得编造信息：
-{facts_json}
-
-**记忆（之前的决策和行为）**：
-{memory_summary}
-
-请按照思维链（Chain-of-Thought）进行推理。"""
-            if is_leader:
-                system_prompt += "\n重要：你是队长，你提议了这个队伍，所以你必须投票同意。"
-        
-        # 7. 构建User Prompt（包含CoT要求）
+        # 5. 构建User Prompt（动态内容：事实、记忆、局势，包含CoT要求）
         # 第一轮特殊提示
         first_round_warning = ""
         if context.current_round == 1:
             first_round_warning = "\n⚠️ **关键提醒：这是第1轮任务，游戏刚刚开始，还没有任何任务历史。在分析时不要假设存在历史信息！**\n"
         
-        user_prompt = f"""{game_context}
+        user_prompt = f"""{self._build_dynamic_preamble(facts_json, memory_summary)}
+{game_context}
 {first_round_warning}
 
 当前提议的队伍是：{', '.join(team_names)}
@@ -540,48 +1304,203 @@ class LLMStrategyEngine:
 4. 考虑角色目标
 5. 做出最终决策
 
-请以JSON格式返回你的决策，格式如下：
-{{
-    "thinking_process": {{
-        "step1_rejection_risk": "你的分析...",
-        "step2_team_analysis": "你的分析...",
-        "step3_mission_history": "你的分析...",
-        "step4_role_objectives": "你的分析...",
-        "step5_decision": "你的最终决策理由..."
-    }},
-    "vote": true 或 false
-}}
+请以JSON格式返回你的决策（单行紧凑JSON，不要缩进或换行），格式如下：
+{{"thinking_process":{{"step1_rejection_risk":"你的分析...","step2_team_analysis":"你的分析...","step3_mission_history":"你的分析...","step4_role_objectives":"你的分析...","step5_decision":"你的最终决策理由..."}},"vote":true 或 false}}
 
 只返回JSON，不要其他内容。"""
+        return system_prompt, user_prompt
+    
+    def _is_vote_forced(self, context: DecisionContext) -> bool:
+        """投票结果是否由规则决定：队长同意自己的队伍；第5次投票（vote_round >= 4）必须同意"""
+        return context.current_leader == self.my_player_id or context.vote_round >= 4
+    
+    def _build_role_hidden_context(self, belief_system: BeliefSystem) -> str:
+        """构建该玩家的隐藏身份描述（角色、阵营及可见信息），用于批量决策"""
+        lines = [f"角色: {self.my_role.value}（{self.my_team.value}阵营）"]
+        for p in belief_system.visible_players:
+            if p.get("is_self"):
+                continue
+            if p.get("possible_merlin"):
+                lines.append(f"可见: {p['name']} (ID:{p['player_id']}) 可能是梅林")
+            elif p.get("team"):
+                lines.append(f"可见: {p['name']} (ID:{p['player_id']}) {p['team']}阵营")
+        return "；".join(lines)
+    
+    @classmethod
+    def batch_decide_vote(cls, engines: List["LLMStrategyEngine"], context: DecisionContext,
+                          belief_systems: List[BeliefSystem], all_players: List[Dict],
+                          proposed_team: List[int],
+                          mission_history: Optional[List[Dict]] = None) -> Dict[int, bool]:
+        """
+        批量投票决策：把多个玩家的投票合并为一次LLM调用
+        engines与belief_systems一一对应；返回 玩家ID -> 是否同意
+        未开启batch_mode或批量结果缺失的玩家回退到逐个调用decide_vote
+        """
+        votes: Dict[int, bool] = {}
+        if not engines:
+            return votes
         
-        try:
-            response = self._call_llm(user_prompt, system_prompt)
-            response = response.strip()
-            if response.startswith("```"):
-                lines = response.split("\n")
-                response = "\n".join(lines[1:-1])
-            if response.startswith("```json"):
-                lines = response.split("\n")
-                response = "\n".join(lines[1:-1])
+        # 规则强制同意的玩家不参与批量调用（decide_vote会直接返回）
+        batch_engines = [e for e in engines if e.batch_mode and e.client and not e._is_vote_forced(context)]
+        if len(batch_engines) < 2:
+            batch_engines = []
+        
+        if batch_engines:
+            lead = batch_engines[0]
+            player_names = lead._roster(all_players)
+            team_names = [player_names[pid] for pid in proposed_team]
+            facts_json = lead._facts_json(context, all_players, mission_history, player_names,
+                                          proposed_team=proposed_team)
+            
+            system_prompt = f"""你将同时扮演阿瓦隆游戏中的多名玩家，分别为每名玩家独立做出投票决策。
+每名玩家只能基于游戏事实和自己的隐藏身份信息做判断，不得使用其他玩家的隐藏信息。
+
+**重要：事实核查**
+你的回答必须基于以下提供的游戏事实（JSON格式），不得编造信息：
+{facts_json}
+
+当前提议的队伍是：{', '.join(team_names)}
+投票规则：第5次投票（vote_round >= 4）时好人必须同意，否则流局坏人直接获胜。"""
             
-            decision = json.loads(response)
-            vote = decision.get("vote", True)
+            belief_by_engine = dict(zip(map(id, engines), belief_systems))
+            player_blocks = []
+            for engine in batch_engines:
+                player_blocks.append({
+                    "player_id": engine.my_player_id,
+                    "name": engine.my_name,
+                    "role_hidden_context": engine._build_role_hidden_context(belief_by_engine[id(engine)]),
+                    "personality": engine.personality.value,
+                    "memory_summary": engine.get_memory_summary()
+                })
+            player_ids = [b["player_id"] for b in player_blocks]
             
-            # 事实核查：第5次投票必须同意（流局保护）
-            if context.vote_round >= 4:
-                vote = True
+            user_prompt = f"""请为以下玩家 {player_ids} 分别做出投票决策：
+{_dumps_compact(player_blocks)}
+
+请以JSON格式返回所有玩家的决策（单行紧凑JSON，不要缩进或换行），格式如下：
+{{"votes":[{{"player_id":玩家ID,"vote":true 或 false,"thinking":"该玩家的简要决策理由..."}}]}}
+
+只返回JSON，不要其他内容。"""
             
-            # 事实核查：队长必须同意自己提议的队伍
-            if is_leader:
-                vote = True
+            try:
+                response = lead._call_llm(user_prompt, system_prompt,
+                                          max_tokens=cls.ACTION_MAX_TOKENS["vote"] * len(batch_engines),
+                                          expect_json=True, model=lead._pick_model("vote", context))
+                decision = _extract_json(response)
+                valid_ids = set(player_ids)
+                for item in decision.get("votes", []):
+                    pid = item.get("player_id")
+                    if pid is not None and int(pid) in valid_ids:
+                        votes[int(pid)] = bool(item.get("vote", True))
+            except Exception as e:
+                print(f"警告: 批量投票决策失败，回退到逐个决策: {e}")
+                votes = {}
             
-            # 记录决策到记忆
-            vote_text = "同意" if vote else "拒绝"
-            self.add_to_memory(f"第{context.current_round}轮投票：我对队伍 {', '.join(team_names)} 投了{vote_text}票")
+            for engine in batch_engines:
+                pid = engine.my_player_id
+                if pid not in votes:
+                    continue
+                vote_text = "同意" if votes[pid] else "拒绝"
+                engine.add_to_memory(f"第{context.current_round}轮投票：我对队伍 {', '.join(team_names)} 投了{vote_text}票")
+        
+        # 未参与批量或批量结果缺失的玩家逐个决策
+        for engine, belief_system in zip(engines, belief_systems):
+            if engine.my_player_id not in votes:
+                votes[engine.my_player_id] = engine.decide_vote(
+                    context=context,
+                    belief_system=belief_system,
+                    all_players=belief_system.all_players or all_players,
+                    proposed_team=proposed_team,
+                    mission_history=mission_history
+                )
+        
+        return votes
+    
+    @classmethod
+    def batch_decide_mission_vote(cls, engines: List["LLMStrategyEngine"], context: DecisionContext,
+                                  belief_systems: List[BeliefSystem], all_players: List[Dict],
+                                  mission_team: List[int],
+                                  mission_history: Optional[List[Dict]] = None) -> Dict[int, bool]:
+        """
+        批量任务投票决策：把队伍中多名坏人的任务投票合并为一次LLM调用（好人必然投成功，不需要LLM）
+        engines与belief_systems一一对应；返回 玩家ID -> 是否成功
+        未开启batch_mode或批量结果缺失的玩家回退到逐个调用decide_mission_vote
+        """
+        votes: Dict[int, bool] = {}
+        if not engines:
+            return votes
+        
+        batch_engines = [e for e in engines if e.batch_mode and e.client and e.my_team == Team.EVIL]
+        if len(batch_engines) < 2:
+            batch_engines = []
+        
+        if batch_engines:
+            lead = batch_engines[0]
+            player_names = lead._roster(all_players)
+            team_names = [player_names[pid] for pid in mission_team]
+            facts_json = lead._facts_json(context, all_players, mission_history, player_names,
+                                          mission_team=mission_team)
             
-            return bool(vote)
-        except Exception as e:
-            raise RuntimeError(f"LLM投票决策失败: {e}")
+            system_prompt = f"""你将同时扮演阿瓦隆游戏中同一任务队伍里的多名坏人玩家，分别为每名玩家独立决定任务投票（成功/失败）。
+每名玩家只能基于游戏事实和自己的隐藏身份信息做判断，不得使用其他玩家的隐藏信息。
+
+**重要：事实核查**
+你的回答必须基于以下提供的游戏事实（JSON格式），不得编造信息：
+{facts_json}
+
+当前任务队伍是：{', '.join(team_names)}
+需要 {context.mission_config.get('fails_needed', 1)} 张失败票才能破坏任务。"""
+            
+            belief_by_engine = dict(zip(map(id, engines), belief_systems))
+            player_blocks = []
+            for engine in batch_engines:
+                player_blocks.append({
+                    "player_id": engine.my_player_id,
+                    "name": engine.my_name,
+                    "role_hidden_context": engine._build_role_hidden_context(belief_by_engine[id(engine)]),
+                    "personality": engine.personality.value,
+                    "memory_summary": engine.get_memory_summary()
+                })
+            player_ids = [b["player_id"] for b in player_blocks]
+            
+            user_prompt = f"""请为以下玩家 {player_ids} 分别做出任务投票决策：
+{_dumps_compact(player_blocks)}
+
+请以JSON格式返回所有玩家的决策（单行紧凑JSON，不要缩进或换行），格式如下：
+{{"votes":[{{"player_id":玩家ID,"success":true 或 false,"thinking":"该玩家的简要决策理由..."}}]}}
+
+只返回JSON，不要其他内容。"""
+            
+            try:
+                response = lead._call_llm(user_prompt, system_prompt,
+                                          max_tokens=cls.ACTION_MAX_TOKENS["mission_vote"] * len(batch_engines),
+                                          expect_json=True, model=lead._pick_model("mission_vote", context))
+                decision = _extract_json(response)
+                valid_ids = set(player_ids)
+                for item in decision.get("votes", []):
+                    pid = item.get("player_id")
+                    if pid is not None and int(pid) in valid_ids:
+                        votes[int(pid)] = bool(item.get("success", False))
+            except Exception as e:
+                print(f"警告: 批量任务投票决策失败，回退到逐个决策: {e}")
+                votes = {}
+            
+            for engine in batch_engines:
+                if engine.my_player_id in votes:
+                    engine._record_mission_vote(context, votes[engine.my_player_id])
+        
+        # 好人、未参与批量或批量结果缺失的玩家逐个决策
+        for engine, belief_system in zip(engines, belief_systems):
+            if engine.my_player_id not in votes:
+                votes[engine.my_player_id] = engine.decide_mission_vote(
+                    context=context,
+                    belief_system=belief_system,
+                    all_players=belief_system.all_players or all_players,
+                    mission_team=mission_team,
+                    mission_history=mission_history
+                )
+        
+        return votes
     
     def decide_mission_vote(self, context: DecisionContext, belief_system: BeliefSystem,
                            all_players: List[Dict], mission_team: List[int],
@@ -596,63 +1515,68 @@ class LLMStrategyEngine:
             return True
         
         # 坏人需要决定是否破坏
-        # 1. 加载Prompt模板
-        role_name_map = {
-            RoleType.MERLIN: "merlin",
-            RoleType.ASSASSIN: "assassin",
-            RoleType.PERCIVAL: "percival",
-            RoleType.MORGANA: "morgana",
-            RoleType.SERVANT: "servant",
-            RoleType.MORDRED: "mordred"
-        }
-        role_name = role_name_map.get(self.my_role, "servant")
-        template = self._load_prompt_template(role_name, "mission_vote")
+        system_prompt, user_prompt = self._build_mission_vote_prompts(context, belief_system, all_players,
+                                                                      mission_team, mission_history)
+        try:
+            response = self._call_llm(user_prompt, system_prompt, cache_key=self._prompt_cache_key("mission_vote"),
+                                      max_tokens=self.ACTION_MAX_TOKENS["mission_vote"], expect_json=True,
+                                      model=self._pick_model("mission_vote", context))
+            return self._record_mission_vote(context, _extract_json(response).get("success", False))
+        except Exception as e:
+            raise RuntimeError(f"LLM任务投票决策失败: {e}")
+    
+    async def adecide_mission_vote(self, context: DecisionContext, belief_system: BeliefSystem,
+                                   all_players: List[Dict], mission_team: List[int],
+                                   mission_history: Optional[List[Dict]] = None) -> bool:
+        """decide_mission_vote的异步版本"""
+        if not self.client:
+            raise RuntimeError("LLM客户端未初始化，无法进行决策。请检查API配置。")
+        
+        if self.my_team == Team.GOOD:
+            self.add_to_memory(f"第{context.current_round}轮任务：我投了成功票（好人必须投成功）")
+            return True
+        
+        system_prompt, user_prompt = self._build_mission_vote_prompts(context, belief_system, all_players,
+                                                                      mission_team, mission_history)
+        try:
+            response = await self._acall_llm(user_prompt, system_prompt,
+                                             cache_key=self._prompt_cache_key("mission_vote"),
+                                             max_tokens=self.ACTION_MAX_TOKENS["mission_vote"], expect_json=True,
+                                             model=self._pick_model("mission_vote", context))
+            return self._record_mission_vote(context, _extract_json(response).get("success", False))
+        except Exception as e:
+            raise RuntimeError(f"LLM任务投票决策失败: {e}")
+    
+    def _record_mission_vote(self, context: DecisionContext, success) -> bool:
+        """记录任务投票到记忆并返回结果"""
+        result_text = "成功" if success else "失败"
+        self.add_to_memory(f"第{context.current_round}轮任务：我投了{result_text}票")
+        return bool(success)
+    
+    def _build_mission_vote_prompts(self, context: DecisionContext, belief_system: BeliefSystem,
+                                    all_players: List[Dict], mission_team: List[int],
+                                    mission_history: Optional[List[Dict]] = None) -> Tuple[str, str]:
+        """构建任务投票决策的 (System Prompt, User Prompt)"""
+        # 1. 静态System Prompt（角色模板，整局不变）
+        system_prompt = self._static_system_prompts["mission_vote"]
         
         # 2. 构建事实核查上下文
-        facts = self._build_fact_check_context(context, all_players, mission_history)
-        facts["mission_team"] = mission_team
-        facts_json = json.dumps(facts, ensure_ascii=False, indent=2)
+        player_names = self._roster(all_players)
+        facts_json = self._facts_json(context, all_players, mission_history, player_names, mission_team=mission_team)
         
         # 3. 构建游戏上下文
         game_context = self._build_game_context_description(context, belief_system, all_players, 
                                                           proposed_team=mission_team,
-                                                          mission_history=mission_history)
-        player_names = {p["player_id"]: p["name"] for p in all_players}
-        team_names = [player_names.get(pid, f"玩家{pid}") for pid in mission_team]
+                                                          mission_history=mission_history,
+                                                          player_names=player_names)
+        team_names = [player_names[pid] for pid in mission_team]
         
         # 4. 获取记忆
         memory_summary = self.get_memory_summary()
         
-        # 5. 构建System Prompt
-        if template:
-            system_prompt = f"""{template}
-
-你的名字是{self.my_name}。
-
-**重要：事实核查**
-你的回答必须基于以下提供的游戏事实（JSON格式），不得编造信息：
-{facts_json}
-
-**记忆（之前的决策和行为）**：
-{memory_summary}
-"""
-        else:
-            system_prompt = f"""你是一个阿瓦隆游戏中的{self.my_role.value}（{self.my_team.value}阵营）。
-你的名字是{self.my_name}。
-
-作为坏人，你需要决定是否破坏任务（投失败票）。
-
-**重要：事实核查**
-你的回答必须基于以下提供的游戏事实（JSON格式），不得编造信息：
-{facts_json}
-
-**记忆（之前的决策和行为）**：
-{memory_summary}
-
-请按照思维链（Chain-of-Thought）进行推理。"""
-        
-        # 6. 构建User Prompt（包含CoT要求）
-        user_prompt = f"""{game_context}
+        # 5. 构建User Prompt（动态内容：事实、记忆、局势，包含CoT要求）
+        user_prompt = f"""{self._build_dynamic_preamble(facts_json, memory_summary)}
+{game_context}
 
 当前任务队伍是：{', '.join(team_names)}
 需要 {context.mission_config.get('fails_needed', 1)} 张失败票才能破坏任务。
@@ -664,40 +1588,11 @@ class LLMStrategyEngine:
 4. 考虑隐藏身份
 5. 做出最终决策
 
-请以JSON格式返回你的决策，格式如下：
-{{
-    "thinking_process": {{
-        "step1_team_check": "你的分析...",
-        "step2_current_situation": "你的分析...",
-        "step3_mission_team": "你的分析...",
-        "step4_identity_hiding": "你的分析...",
-        "step5_decision": "你的最终决策理由..."
-    }},
-    "success": true 或 false (true=投成功票, false=投失败票破坏任务)
-}}
+请以JSON格式返回你的决策（单行紧凑JSON，不要缩进或换行），格式如下：
+{{"thinking_process":{{"step1_team_check":"你的分析...","step2_current_situation":"你的分析...","step3_mission_team":"你的分析...","step4_identity_hiding":"你的分析...","step5_decision":"你的最终决策理由..."}},"success":true 或 false (true=投成功票, false=投失败票破坏任务)}}
 
 只返回JSON，不要其他内容。"""
-        
-        try:
-            response = self._call_llm(user_prompt, system_prompt)
-            response = response.strip()
-            if response.startswith("```"):
-                lines = response.split("\n")
-                response = "\n".join(lines[1:-1])
-            if response.startswith("```json"):
-                lines = response.split("\n")
-                response = "\n".join(lines[1:-1])
-            
-            decision = json.loads(response)
-            success = decision.get("success", False)
-            
-            # 记录决策到记忆
-            result_text = "成功" if success else "失败"
-            self.add_to_memory(f"第{context.current_round}轮任务：我投了{result_text}票")
-            
-            return bool(success)
-        except Exception as e:
-            raise RuntimeError(f"LLM任务投票决策失败: {e}")
+        return system_prompt, user_prompt
     
     def decide_assassination(self, context: DecisionContext, belief_system: BeliefSystem,
                             all_players: List[Dict], mission_history: Optional[List[Dict]] = None) -> Optional[int]:
@@ -705,51 +1600,33 @@ class LLMStrategyEngine:
         if self.my_role != RoleType.ASSASSIN or not self.client:
             return None
         
-        # 1. 加载Prompt模板
-        template = self._load_prompt_template("assassin", "assassination")
+        # 排除自己和已知的坏人队友后只剩一名候选人时，目标已确定，无需调用LLM
+        candidates = [p for p in all_players
+                      if p["player_id"] != self.my_player_id and p.get("team") != Team.EVIL.value]
+        if len(candidates) == 1:
+            target = candidates[0]["player_id"]
+            self.add_to_memory(f"刺杀阶段：我选择刺杀 {candidates[0]['name']} (ID: {target})")
+            return target
+        
+        # 1. 静态System Prompt（角色模板，整局不变）
+        system_prompt = self._static_system_prompts["assassination"]
         
         # 2. 构建事实核查上下文
-        facts = self._build_fact_check_context(context, all_players, mission_history)
-        facts_json = json.dumps(facts, ensure_ascii=False, indent=2)
+        player_names = self._roster(all_players)
+        facts_json = self._facts_json(context, all_players, mission_history, player_names)
         
         # 3. 构建游戏上下文
         game_context = self._build_game_context_description(context, belief_system, all_players,
-                                                          mission_history=mission_history)
-        player_names = {p["player_id"]: p["name"] for p in all_players}
+                                                          mission_history=mission_history,
+                                                          player_names=player_names)
         all_player_list = [f"{pid}: {name}" for pid, name in player_names.items() if pid != self.my_player_id]
         
         # 4. 获取记忆
         memory_summary = self.get_memory_summary()
         
-        # 5. 构建System Prompt
-        if template:
-            system_prompt = f"""{template}
-
-你的名字是{self.my_name}。
-
-**重要：事实核查**
-你的回答必须基于以下提供的游戏事实（JSON格式），不得编造信息：
-{facts_json}
-
-**记忆（之前的决策和行为）**：
-{memory_summary}
-"""
-        else:
-            system_prompt = f"""你是一个阿瓦隆游戏中的刺客（坏人阵营）。
-好人已经完成了3个任务，现在你可以刺杀梅林。
-如果成功刺杀梅林，坏人阵营获胜；如果刺杀错误，好人阵营获胜。
-
-**重要：事实核查**
-你的回答必须基于以下提供的游戏事实（JSON格式），不得编造信息：
-{facts_json}
-
-**记忆（之前的决策和行为）**：
-{memory_summary}
-
-请按照思维链（Chain-of-Thought）进行推理。"""
-        
-        # 6. 构建User Prompt（包含CoT要求）
-        user_prompt = f"""{game_context}
+        # 5. 构建User Prompt（动态内容：事实、记忆、局势，包含CoT要求）
+        user_prompt = f"""{self._build_dynamic_preamble(facts_json, memory_summary)}
+{game_context}
 
 可选的玩家（不包括你自己）：
 {chr(10).join(all_player_list)}
@@ -761,31 +1638,15 @@ class LLMStrategyEngine:
 4. 评估每个候选人
 5. 做出最终决策
 
-请以JSON格式返回你的决策，格式如下：
-{{
-    "thinking_process": {{
-        "step1_game_history": "你的分析...",
-        "step2_merlin_characteristics": "你的分析...",
-        "step3_exclusion": "你排除了哪些人...",
-        "step4_candidate_evaluation": "你对每个候选人的评估...",
-        "step5_decision": "你的最终决策理由..."
-    }},
-    "target": 玩家ID
-}}
+请以JSON格式返回你的决策（单行紧凑JSON，不要缩进或换行），格式如下：
+{{"thinking_process":{{"step1_game_history":"你的分析...","step2_merlin_characteristics":"你的分析...","step3_exclusion":"你排除了哪些人...","step4_candidate_evaluation":"你对每个候选人的评估...","step5_decision":"你的最终决策理由..."}},"target":玩家ID}}
 
 只返回JSON，不要其他内容。"""
         
         try:
-            response = self._call_llm(user_prompt, system_prompt)
-            response = response.strip()
-            if response.startswith("```"):
-                lines = response.split("\n")
-                response = "\n".join(lines[1:-1])
-            if response.startswith("```json"):
-                lines = response.split("\n")
-                response = "\n".join(lines[1:-1])
-            
-            decision = json.loads(response)
+            response = self._call_llm(user_prompt, system_prompt, cache_key=self._prompt_cache_key("assassination"),
+                                      max_tokens=self.ACTION_MAX_TOKENS["assassination"], expect_json=True)
+            decision = _extract_json(response)
             target = decision.get("target")
             
             # 事实核查：验证目标玩家ID有效性
@@ -796,7 +1657,7 @@ class LLMStrategyEngine:
                     raise RuntimeError(f"LLM返回的刺杀目标无效：{target}")
                 
                 # 记录决策到记忆
-                target_name = player_names.get(target, f"玩家{target}")
+                target_name = player_names[target]
                 self.add_to_memory(f"刺杀阶段：我选择刺杀 {target_name} (ID: {target})")
             
             return target
@@ -810,26 +1671,138 @@ class LLMStrategyEngine:
         if not self.client:
             raise RuntimeError("LLM客户端未初始化，无法生成发言。请检查API配置。")
         
-        # 1. 加载Prompt模板
-        role_name_map = {
-            RoleType.MERLIN: "merlin",
-            RoleType.ASSASSIN: "assassin",
-            RoleType.PERCIVAL: "percival",
-            RoleType.MORGANA: "morgana",
-            RoleType.SERVANT: "servant",
-            RoleType.MORDRED: "mordred"
-        }
-        role_name = role_name_map.get(self.my_role, "servant")
-        template = self._load_prompt_template(role_name, "speech")
+        system_prompt, user_prompt = self._build_speech_prompts(context, belief_system, all_players,
+                                                                recent_speeches, mission_history)
+        try:
+            response = self._call_llm(user_prompt, system_prompt, cache_key=self._prompt_cache_key("speech"),
+                                      max_tokens=self.ACTION_MAX_TOKENS["speech"],
+                                      stop_after_chars=self.SPEECH_STOP_CHARS,
+                                      model=self._pick_model("speech", context))
+            return self._record_speech(context, response)
+        except Exception as e:
+            return self._speech_failure_fallback(e, context, belief_system, all_players)
+    
+    async def agenerate_speech(self, context: DecisionContext, belief_system: BeliefSystem,
+                               all_players: List[Dict], recent_speeches: List[Dict] = None,
+                               mission_history: Optional[List[Dict]] = None) -> str:
+        """generate_speech的异步版本"""
+        if not self.client:
+            raise RuntimeError("LLM客户端未初始化，无法生成发言。请检查API配置。")
+        
+        system_prompt, user_prompt = self._build_speech_prompts(context, belief_system, all_players,
+                                                                recent_speeches, mission_history)
+        try:
+            response = await self._acall_llm(user_prompt, system_prompt, cache_key=self._prompt_cache_key("speech"),
+                                             max_tokens=self.ACTION_MAX_TOKENS["speech"],
+                                             stop_after_chars=self.SPEECH_STOP_CHARS,
+                                             model=self._pick_model("speech", context))
+            return self._record_speech(context, response)
+        except Exception as e:
+            return self._speech_failure_fallback(e, context, belief_system, all_players)
+    
+    @classmethod
+    def batch_generate_speech(cls, engines: List["LLMStrategyEngine"], requests: List[Dict]) -> List[str]:
+        """
+        一次提交多名玩家的发言请求（见batch_call），按输入顺序返回发言
+        requests与engines一一对应，每项为该玩家generate_speech的参数
+        客户端、请求设置或模型不同的请求（如不同对局处于不同轮次）分组提交，每组一次batch_call
+        """
+        responses: List = [None] * len(engines)
+        for indices, prompts, call_kwargs in cls._speech_batch_groups(engines, requests):
+            for i, response in zip(indices, engines[indices[0]].batch_call(prompts, **call_kwargs)):
+                responses[i] = response
+        return cls._finish_speech_batch(engines, requests, responses)
+    
+    @classmethod
+    async def abatch_generate_speech(cls, engines: List["LLMStrategyEngine"], requests: List[Dict]) -> List[str]:
+        """batch_generate_speech的异步版本（请求在当前事件循环中发出，各组并发，见abatch_call）"""
+        groups = cls._speech_batch_groups(engines, requests)
+        group_responses = await asyncio.gather(*(engines[indices[0]].abatch_call(prompts, **call_kwargs)
+                                                 for indices, prompts, call_kwargs in groups))
+        responses: List = [None] * len(engines)
+        for (indices, _, _), results in zip(groups, group_responses):
+            for i, response in zip(indices, results):
+                responses[i] = response
+        return cls._finish_speech_batch(engines, requests, responses)
+    
+    @classmethod
+    def _speech_batch_groups(cls, engines: List["LLMStrategyEngine"],
+                             requests: List[Dict]) -> List[Tuple[List[int], List, Dict]]:
+        """
+        把批量发言按 (客户端及请求设置, 模型) 分组，每组由组内第一个引擎发出
+        返回 [(组内请求在输入中的下标, Prompt列表, batch_call参数)]
+        """
+        prompts = [engine._build_speech_prompts(**kwargs) for engine, kwargs in zip(engines, requests)]
+        models = [engine._pick_model("speech", kwargs["context"]) for engine, kwargs in zip(engines, requests)]
+        groups: Dict[Tuple, List[int]] = {}
+        for i, (engine, model) in enumerate(zip(engines, models)):
+            groups.setdefault(engine._batch_group_key(model), []).append(i)
+        return [(indices,
+                 [prompts[i] for i in indices],
+                 dict(max_tokens=cls.ACTION_MAX_TOKENS["speech"],
+                      stop_after_chars=cls.SPEECH_STOP_CHARS,
+                      cache_keys=[engines[i]._prompt_cache_key("speech") for i in indices],
+                      model=models[indices[0]]))
+                for indices in groups.values()]
+    
+    def _batch_group_key(self, model: str) -> Tuple:
+        """可以合并到同一次batch_call的请求：客户端、模型及所有影响请求和响应缓存的设置都相同"""
+        return (self.client, self.api_provider, model, self.use_batch_api, self.temperature,
+                self.deterministic_seed, self.attempt_timeout, self.stream_idle_timeout, self.cache_enabled,
+                self.cache_persist, self.cache_tag, self.prompts_dir, self.semantic_cache, self.semantic_threshold,
+                self.prompt_token_budget)
+    
+    @staticmethod
+    def _finish_speech_batch(engines: List["LLMStrategyEngine"], requests: List[Dict], responses: List) -> List[str]:
+        """把批量响应记录为各玩家的发言（失败的条目使用回退发言）"""
+        speeches = []
+        for engine, kwargs, response in zip(engines, requests, responses):
+            if isinstance(response, Exception):
+                speeches.append(engine._speech_failure_fallback(response, kwargs["context"],
+                                                                kwargs["belief_system"], kwargs["all_players"]))
+            else:
+                speeches.append(engine._record_speech(kwargs["context"], response))
+        return speeches
+    
+    def _record_speech(self, context: DecisionContext, response: str) -> str:
+        """记录发言到记忆并返回发言内容"""
+        speech = response.strip()
+        self.add_to_memory(f"第{context.current_round}轮讨论：我说了\"{speech[:30]}...\"")
+        return speech
+    
+    def _speech_failure_fallback(self, e: Exception, context: DecisionContext,
+                                 belief_system: BeliefSystem, all_players: List[Dict]) -> str:
+        """发言生成失败时：连接错误使用回退发言，其他错误抛出异常"""
+        error_str = str(e).lower()
+        is_connection_error = any(keyword in error_str for keyword in [
+            "connection", "connect", "network", "timeout"
+        ])
+        
+        if is_connection_error:
+            # 连接错误时，生成简单的回退发言
+            print(f"警告: LLM连接失败，使用回退发言生成")
+            fallback_speech = self._generate_fallback_speech(context, belief_system, all_players)
+            self.add_to_memory(f"第{context.current_round}轮讨论：LLM连接失败，使用了回退发言")
+            return fallback_speech
+        else:
+            # 其他错误，抛出异常
+            raise RuntimeError(f"LLM发言生成失败: {e}")
+    
+    def _build_speech_prompts(self, context: DecisionContext, belief_system: BeliefSystem,
+                              all_players: List[Dict], recent_speeches: List[Dict] = None,
+                              mission_history: Optional[List[Dict]] = None) -> Tuple[str, str]:
+        """构建发言生成的 (System Prompt, User Prompt)"""
+        # 1. 静态System Prompt（角色模板，整局不变）
+        system_prompt = self._static_system_prompts["speech"]
         
         # 2. 构建事实核查上下文
-        facts = self._build_fact_check_context(context, all_players, mission_history)
-        facts_json = json.dumps(facts, ensure_ascii=False, indent=2)
+        player_names = self._roster(all_players)
+        facts_json = self._facts_json(context, all_players, mission_history, player_names)
         
         # 3. 构建游戏上下文
         game_context = self._build_game_context_description(context, belief_system, all_players,
-                                                          mission_history=mission_history)
-        player_names = {p["player_id"]: p["name"] for p in all_players}
+                                                          mission_history=mission_history,
+                                                          player_names=player_names)
         
         # 4. 获取记忆
         memory_summary = self.get_memory_summary()
@@ -840,52 +1813,20 @@ class LLMStrategyEngine:
             recent_speech_text = "\n最近的发言：\n"
             for speech in recent_speeches[-3:]:  # 只显示最近3条
                 speaker_id = speech.get("player_id")
-                speaker_name = player_names.get(speaker_id, f"玩家{speaker_id}")
+                speaker_name = player_names[speaker_id]
                 content = speech.get("speech", speech.get("content", ""))
                 recent_speech_text += f"- {speaker_name}: {content}\n"
         
-        # 6. 构建System Prompt
+        # 6. 构建User Prompt（动态内容：事实、记忆、局势，包含CoT要求）
         # 第一轮特殊提示
         first_round_note = ""
-        if context.current_round == 1:
-            first_round_note = "\n⚠️ **特别重要：这是第1轮任务，游戏刚刚开始。你的发言中绝对不要提及'前几轮'、'之前'、'历史'等不存在的信息！只能基于当前轮次的信息发言。**\n"
-        
-        if template:
-            system_prompt = f"""{template}
-
-你的名字是{self.my_name}。
-你的人格特质是{self.personality.value}。
-{first_round_note}
-**重要：事实核查**
-你的发言必须基于以下提供的游戏事实（JSON格式），不得编造信息：
-{facts_json}
-
-**记忆（之前的决策和行为）**：
-{memory_summary}
-"""
-        else:
-            system_prompt = f"""你是一个阿瓦隆游戏中的{self.my_role.value}（{self.my_team.value}阵营）。
-你的名字是{self.my_name}。
-你的人格特质是{self.personality.value}。
-
-请生成一段自然的发言。
-{first_round_note}
-**重要：事实核查**
-你的发言必须基于以下提供的游戏事实（JSON格式），不得编造信息：
-{facts_json}
-
-**记忆（之前的决策和行为）**：
-{memory_summary}
-
-请按照思维链（Chain-of-Thought）思考发言目的和内容。"""
-        
-        # 7. 构建User Prompt（包含CoT要求）
-        # 第一轮特殊提示
         first_round_warning = ""
         if context.current_round == 1:
+            first_round_note = "\n⚠️ **特别重要：这是第1轮任务，游戏刚刚开始。你的发言中绝对不要提及'前几轮'、'之前'、'历史'等不存在的信息！只能基于当前轮次的信息发言。**\n"
             first_round_warning = "\n⚠️ **关键提醒：这是第1轮任务，游戏刚刚开始，还没有任何任务历史、投票历史或之前的发言记录。你的发言中不要提及'前几轮'、'之前的表现'、'历史记录'等不存在的信息！**\n"
         
-        user_prompt = f"""{game_context}
+        user_prompt = f"""{first_round_note}{self._build_dynamic_preamble(facts_json, memory_summary, fact_label="发言")}
+{game_context}
 {first_round_warning}
 {recent_speech_text}
 
@@ -897,48 +1838,20 @@ class LLMStrategyEngine:
 5. 生成发言（确保发言内容符合当前轮次，不要编造历史）
 
 请生成你的发言（只返回发言内容，不要其他说明）："""
-        
-        try:
-            response = self._call_llm(user_prompt, system_prompt)
-            speech = response.strip()
-            
-            # 记录发言到记忆
-            self.add_to_memory(f"第{context.current_round}轮讨论：我说了\"{speech[:30]}...\"")
-            
-            return speech
-        except Exception as e:
-            # 对于发言生成，如果LLM调用失败，提供回退方案
-            error_str = str(e).lower()
-            is_connection_error = any(keyword in error_str for keyword in [
-                "connection", "connect", "network", "timeout"
-            ])
-            
-            if is_connection_error:
-                # 连接错误时，生成简单的回退发言
-                print(f"警告: LLM连接失败，使用回退发言生成")
-                fallback_speech = self._generate_fallback_speech(context, belief_system, all_players)
-                self.add_to_memory(f"第{context.current_round}轮讨论：LLM连接失败，使用了回退发言")
-                return fallback_speech
-            else:
-                # 其他错误，抛出异常
-                raise RuntimeError(f"LLM发言生成失败: {e}")
+        return system_prompt, user_prompt
     
     def _generate_fallback_speech(self, context: DecisionContext, belief_system: BeliefSystem,
                                   all_players: List[Dict]) -> str:
         """生成回退发言（当LLM不可用时使用）"""
-        player_names = {p["player_id"]: p["name"] for p in all_players}
-        
-        # 根据角色和局势生成简单发言
+        # 根据阵营和局势选择简单发言
         if self.my_team == Team.GOOD:
             if context.successful_missions >= 2:
-                return "我们已经成功完成了两个任务，继续保持。"
+                situation = "winning"
             elif context.failed_missions >= 1:
-                return "任务失败了，我们需要重新分析局势。"
+                situation = "losing"
             else:
-                return "我们需要谨慎选择任务队伍，确保都是好人。"
+                situation = "start"
         else:
-            if context.failed_missions >= 2:
-                return "我觉得我们需要重新考虑策略。"
-            else:
-                return "让我观察一下局势。"
+            situation = "winning" if context.failed_missions >= 2 else "normal"
+        return self._fallback_table[situation]
 
@@ -6,6 +6,7 @@ from typing import List, Dict, Optional, Tuple
 from enum import Enum
 from dataclasses import dataclass
 import random
+import numpy as np
 
 import sys
 import os
@@ -15,6 +16,18 @@ from game.rules import Team, GamePhase
 from game.roles import RoleType
 from agent.belief_system import BeliefSystem
 
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    
+    def njit(*args, **kwargs):
+        """未安装numba时的替代装饰器：原样返回函数（纯Python执行）"""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
 
 class Personality(Enum):
     """人格特质"""
@@ -24,6 +37,78 @@ class Personality(Enum):
     EMOTIONAL = "情感型"  # 感性判断
 
 
+# 编译路径使用的整数常量（numba不支持Enum）
+TEAM_GOOD = 0
+TEAM_EVIL = 1
+PERSONALITY_AGGRESSIVE = 0
+PERSONALITY_CONSERVATIVE = 1
+PERSONALITY_ANALYTICAL = 2
+PERSONALITY_EMOTIONAL = 3
+
+_TEAM_CODES = {Team.GOOD: TEAM_GOOD, Team.EVIL: TEAM_EVIL}
+_PERSONALITY_CODES = {
+    Personality.AGGRESSIVE: PERSONALITY_AGGRESSIVE,
+    Personality.CONSERVATIVE: PERSONALITY_CONSERVATIVE,
+    Personality.ANALYTICAL: PERSONALITY_ANALYTICAL,
+    Personality.EMOTIONAL: PERSONALITY_EMOTIONAL,
+}
+
+
+@njit(cache=True)
+def _decide_vote_core(team_code: int, is_merlin: bool, vote_round: int, failed_missions: int,
+                      has_suspicious: bool, evil_in_team: bool, all_trusted: bool, my_in_team: bool,
+                      personality_code: int) -> float:
+    """
+    队伍投票的决策分支（只含整数/布尔运算，安装numba时编译为本地代码）
+    返回同意的概率：1.0=同意，0.0=拒绝，其余值由调用方掷骰决定
+    """
+    if team_code == TEAM_GOOD:
+        if is_merlin:
+            # 梅林能看到坏人：第5次投票必须同意
+            if vote_round >= 4:
+                return 1.0
+            # 第4次投票：队伍中有确定的坏人时30%概率同意（冒险但避免流局）
+            if vote_round >= 3:
+                return 0.3 if evil_in_team else 1.0
+            # 前3次投票：队伍中有确定的坏人则拒绝
+            return 0.0 if evil_in_team else 1.0
+        
+        # 其他好人：第5次投票必须同意，否则流局坏人直接获胜
+        if vote_round >= 4:
+            return 1.0
+        # 第4次投票：即使有可疑玩家，也有60%概率同意（避免流局）
+        if vote_round >= 3:
+            return 0.6 if has_suspicious else 1.0
+        # 前3次投票：队伍中包含可疑玩家则拒绝，否则同意
+        return 0.0 if has_suspicious else 1.0
+    
+    # 坏人：已经失败2次，或自己在队伍中（可以破坏任务），同意
+    if failed_missions >= 2 or my_in_team:
+        return 1.0
+    # 队伍看起来都是好人，拒绝（阻止任务）
+    if all_trusted:
+        return 0.0
+    # 其他情况，激进型拒绝，其余同意
+    return 0.0 if personality_code == PERSONALITY_AGGRESSIVE else 1.0
+
+
+@njit(cache=True)
+def _decide_mission_vote_core(team_code: int, failed_missions: int, current_round: int,
+                              personality_code: int) -> bool:
+    """任务投票的决策分支（True=成功, False=失败）"""
+    # 好人总是投成功
+    if team_code == TEAM_GOOD:
+        return True
+    # 已经失败2次，可以投成功以隐藏身份
+    if failed_missions >= 2:
+        return True
+    # 前两轮，可以破坏
+    if current_round <= 2:
+        return False
+    # 激进：破坏；保守：投成功以隐藏
+    return personality_code != PERSONALITY_AGGRESSIVE
+
+
 @dataclass
 class DecisionContext:
     """决策上下文"""
@@ -40,10 +125,13 @@ class DecisionContext:
 class StrategyEngine:
     """策略决策引擎"""
     
-    def __init__(self, my_role: RoleType, my_team: Team, personality: Personality = Personality.ANALYTICAL):
+    def __init__(self, my_role: RoleType, my_team: Team, personality: Personality = Personality.ANALYTICAL,
+                 seed: Optional[int] = None):
+        """seed: 随机数种子（用于可复现的批量模拟）；默认从random模块取种子，仍受random.seed控制"""
         self.my_role = my_role
         self.my_team = my_team
         self.personality = personality
+        self._rng = np.random.default_rng(seed if seed is not None else random.getrandbits(64))
     
     def decide_team_proposal(self, context: DecisionContext, belief_system: BeliefSystem,
                             my_player_id: int) -> List[int]:
@@ -52,8 +140,8 @@ class StrategyEngine:
         返回: 提议的队伍成员ID列表
         """
         team_size = context.mission_config.get("team_size", 2)
-        all_player_ids = list(belief_system.beliefs.keys())
-        all_player_ids.remove(my_player_id)  # 排除自己
+        # 除自己以外的玩家（信念系统开局时缓存，仅在需要补位时遍历）
+        all_player_ids = belief_system.other_player_ids
         
         if self.my_team == Team.GOOD:
             # 好人策略：选择最信任的玩家
@@ -106,93 +194,29 @@ class StrategyEngine:
         决定是否投票同意提议的队伍
         返回: True=同意, False=拒绝
         """
+        has_suspicious = evil_in_team = all_trusted = False
         if self.my_team == Team.GOOD:
-            # 好人策略：需要考虑投票轮次，避免流局导致坏人直接获胜
-            suspicious_players = belief_system.get_most_suspicious_players(count=len(proposed_team))
-            
-            # 检查队伍中是否有可疑玩家（基于信念系统）
-            has_suspicious = any(pid in proposed_team for pid in suspicious_players[:2])
-            
-            # 对于梅林：如果能看到坏人，检查队伍中是否有确定的坏人
             if self.my_role == RoleType.MERLIN:
-                # 梅林能看到坏人，检查队伍中是否有确定的坏人
-                evil_in_team = False
-                for pid in proposed_team:
-                    if pid in belief_system.beliefs:
-                        belief = belief_system.beliefs[pid]
-                        # 如果坏人概率很高（>0.8），认为是确定的坏人
-                        if belief.team_probabilities.get(Team.EVIL, 0) > 0.8:
-                            evil_in_team = True
-                            break
-                
-                # 关键：如果已经接近第5次投票（vote_round >= 4），必须同意
-                if context.vote_round >= 4:
-                    return True  # 第5次投票，必须同意
-                
-                # 第4次投票（vote_round >= 3），即使有坏人也要考虑同意
-                if context.vote_round >= 3:
-                    # 如果队伍中有确定的坏人，但已经是第4次投票，倾向于同意（避免流局）
-                    if evil_in_team:
-                        return random.random() < 0.3  # 30%概率同意（冒险但避免流局）
-                    else:
-                        return True  # 没有确定的坏人，同意
-                
-                # 前3次投票：如果队伍中有确定的坏人，拒绝
-                if evil_in_team:
-                    return False
-                else:
-                    return True  # 没有确定的坏人，同意
-            
-            # 其他好人（看不到坏人）的策略
-            # 关键：如果已经接近第5次投票（vote_round >= 4），必须同意，避免流局
-            if context.vote_round >= 4:
-                # 第5次投票，必须同意，否则流局坏人直接获胜
-                return True
-            
-            # 如果已经第4次投票（vote_round >= 3），更倾向于同意
-            if context.vote_round >= 3:
-                # 第4次投票，即使有可疑玩家，也倾向于同意（避免流局）
-                if has_suspicious:
-                    return random.random() < 0.6  # 60%概率同意（避免流局）
-                else:
-                    return True  # 没有可疑玩家，同意
-            
-            # 前3次投票：如果队伍中包含可疑玩家，拒绝
-            if has_suspicious:
-                # 有可疑玩家，拒绝
-                return False
-            
-            # 如果我在队伍中，通常同意
-            if my_player_id in proposed_team:
-                return True
-            
-            # 如果队伍看起来都是好人，同意
-            return True
-        
+                # 梅林能看到坏人：坏人概率很高（>0.8）的视为确定的坏人
+                evil_in_team = belief_system.has_likely_evil(proposed_team, 0.8)
+            else:
+                # 检查队伍中是否有可疑玩家（基于信念系统）
+                suspicious_players = belief_system.get_most_suspicious_players(count=len(proposed_team))
+                has_suspicious = any(pid in proposed_team for pid in suspicious_players[:2])
         else:
-            # 坏人策略：根据局势决定
-            # 如果队伍中有坏人队友，通常同意
-            # 如果任务已经失败2次，可以同意以隐藏身份
-            if context.failed_missions >= 2:
-                # 已经失败2次，可以同意以隐藏身份
-                return True
-            
-            # 如果我在队伍中，通常同意（可以破坏任务）
-            if my_player_id in proposed_team:
-                return True
-            
-            # 如果队伍看起来都是好人，拒绝（阻止任务）
             trusted_players = belief_system.get_most_trusted_players(count=len(proposed_team))
             all_trusted = all(pid in trusted_players for pid in proposed_team)
-            
-            if all_trusted:
-                return False  # 都是好人，拒绝
-            
-            # 其他情况，根据人格决定
-            if self.personality == Personality.AGGRESSIVE:
-                return False  # 激进：拒绝
-            else:
-                return True  # 保守：同意
+        
+        accept_prob = _decide_vote_core(
+            _TEAM_CODES[self.my_team], self.my_role == RoleType.MERLIN, context.vote_round,
+            context.failed_missions, has_suspicious, evil_in_team, all_trusted,
+            my_player_id in proposed_team, _PERSONALITY_CODES[self.personality]
+        )
+        if accept_prob >= 1.0:
+            return True
+        if accept_prob <= 0.0:
+            return False
+        return self._rng.random() < accept_prob
     
     def decide_mission_vote(self, context: DecisionContext, belief_system: BeliefSystem,
                           my_player_id: int, mission_team: List[int]) -> bool:
@@ -200,31 +224,10 @@ class StrategyEngine:
         决定任务投票（成功/失败）
         返回: True=成功, False=失败
         """
-        if self.my_team == Team.GOOD:
-            # 好人总是投成功
-            return True
-        
-        else:
-            # 坏人策略：根据局势决定是否破坏
-            fails_needed = context.mission_config.get("fails_needed", 1)
-            
-            # 如果我已经在之前的任务中投过失败，可能需要隐藏
-            # 这里简化处理：根据任务轮次和失败次数决定
-            
-            if context.failed_missions >= 2:
-                # 已经失败2次，可以投成功以隐藏身份
-                return True
-            
-            if context.current_round <= 2:
-                # 前两轮，可以破坏
-                return False
-            
-            # 根据人格决定
-            if self.personality == Personality.AGGRESSIVE:
-                return False  # 激进：破坏
-            else:
-                # 保守：可能投成功以隐藏
-                return True
+        return bool(_decide_mission_vote_core(
+            _TEAM_CODES[self.my_team], context.failed_missions, context.current_round,
+            _PERSONALITY_CODES[self.personality]
+        ))
     
     def decide_assassination(self, context: DecisionContext, belief_system: BeliefSystem) -> Optional[int]:
         """
@@ -235,20 +238,8 @@ class StrategyEngine:
             return None
         
         # 选择最可能是梅林的玩家
-        # 根据信念系统，选择信任度最高且可能是梅林的玩家
-        beliefs = belief_system.get_belief_summary()
-        
-        # 按信任度排序，选择最信任的（可能是梅林）
-        candidates = sorted(
-            beliefs.items(),
-            key=lambda x: x[1]["trust_score"],
-            reverse=True
-        )
-        
-        if candidates:
-            return candidates[0][0]  # 返回最信任的玩家ID
-        
-        return None
+        # 根据信念系统，选择信任度最高的玩家（可能是梅林）
+        return belief_system.get_top_trusted_player()
     
     def get_strategy_priority(self, context: DecisionContext) -> List[str]:
         """
@@ -0,0 +1,101 @@
+"""
+批量自我对局
+多局游戏按阶段同步推进，同一阶段中所有对局的LLM调用合并发出（用于策略评估/调参）
+"""
+from typing import List, Dict, Optional, TYPE_CHECKING
+from concurrent.futures import ThreadPoolExecutor
+
+from game.rules import GamePhase, Team
+from agent.base_agent import BaseAgent
+from agent.event_loop import LoopRunner
+
+if TYPE_CHECKING:
+    from main import AvalonGame
+
+
+class BatchGameRunner:
+    """
+    批量对局运行器：每一步让所有未结束的对局各推进一个阶段
+    - 讨论阶段：开启llm_use_batch_api或parallel_agents的对局，发言合并为一次batch_call
+      （开启use_batch_api时走提供商Batch API，否则并发调用）；其余对局依次发言，与run_game一致
+    - 投票/任务阶段：未开启llm_batch_mode的对局，投票在同一事件循环中并发发出
+    - 队长提议、刺杀以及未合并的调用由各局在线程池中并行执行
+    所有对局的智能体共享同一进程内的HTTP连接池和LLM响应缓存
+    """
+    
+    def __init__(self, games: List["AvalonGame"], max_concurrency: int = 32, max_steps: Optional[int] = None):
+        """
+        games: 待运行的对局（已初始化）
+        max_concurrency: 同时进行的LLM调用/对局线程上限
+        max_steps: 每局最多推进的阶段数，None表示不限（阶段未能推进的对局会被移出，与AvalonGame.run_game_phases一致）
+        """
+        self.games = games
+        self.max_concurrency = max_concurrency
+        self.max_steps = max_steps
+        self._active = list(games)
+        self._loop_runner = LoopRunner(max_concurrency)  # 所有对局的并发调用共享同一事件循环
+    
+    def run(self, verbose: bool = False) -> List[Optional[Team]]:
+        """运行所有对局直到结束，返回各局的获胜方（未正常结束为None）"""
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+                steps = 0
+                while self._active and (self.max_steps is None or steps < self.max_steps):
+                    self.step(pool, verbose)
+                    steps += 1
+        finally:
+            self._loop_runner.close()
+            for game in self.games:
+                game.close()
+        return [game.engine.state.winner for game in self.games]
+    
+    def step(self, pool: ThreadPoolExecutor, verbose: bool = False):
+        """所有未结束的对局各推进一个阶段"""
+        prepared: Dict[int, object] = {}
+        
+        # 1. 收集各对局本阶段可合并发出的LLM调用（按各局自身的设置，未合并的调用由game.step自行生成）
+        speakers: List[BaseAgent] = []
+        speaker_states: List[Dict] = []
+        speech_slices = []  # (对局, 发言者在speakers中的起止位置)
+        vote_jobs = []  # (对局, 玩家ID, 投票方法, 该玩家视角的游戏状态)
+        for game in self._active:
+            state = game.engine.state
+            if state.game_over:
+                continue  # 已结束，本步由game.step退出
+            
+            if state.current_phase == GamePhase.DISCUSSION:
+                if not (game.llm_use_batch_api or game.parallel_agents):
+                    continue  # 依次发言：每人需要看到前面的发言
+                order = game._speaking_order()
+                public_summary = game.engine.get_public_state_summary()
+                speech_slices.append((game, len(speakers), len(speakers) + len(order)))
+                speakers.extend(order)
+                speaker_states.extend(game._agent_game_state(agent, public_summary) for agent in order)
+            elif state.current_phase in (GamePhase.VOTING, GamePhase.MISSION):
+                if game.llm_batch_mode:
+                    continue  # 合并为一次LLM调用，由game.step处理
+                prepared[id(game)] = {}
+                public_summary = game.engine.get_public_state_summary()
+                if state.current_phase == GamePhase.VOTING:
+                    voters = [(agent, agent.avote_on_team) for agent in game._team_voters()]
+                else:
+                    voters = [(agent, agent.avote_on_mission) for agent in game._mission_members()]
+                vote_jobs.extend((game, agent.player_id, vote, game._agent_game_state(agent, public_summary))
+                                 for agent, vote in voters)
+        
+        # 2. 合并发出（投票协程在发出前才创建，发言批次出错时不会留下未等待的协程）
+        if speakers:
+            speeches = self._loop_runner.run(BaseAgent.abatch_generate_speech(speakers, speaker_states))
+            for game, begin, end in speech_slices:
+                prepared[id(game)] = speeches[begin:end]
+        if vote_jobs:
+            results = self._loop_runner.gather([vote(agent_state, game.engine.state.proposed_team)
+                                                for game, _, vote, agent_state in vote_jobs])
+            for (game, player_id, _, _), result in zip(vote_jobs, results):
+                prepared[id(game)][player_id] = result
+        
+        # 3. 分发结果，各对局推进状态（队长提议、刺杀等单次调用在线程池中并行）
+        progress = [game._phase_progress() for game in self._active]
+        still_running = list(pool.map(lambda game: game.step(verbose, prepared.get(id(game))), self._active))
+        self._active = [game for game, before, running in zip(self._active, progress, still_running)
+                        if running and game._phase_progress() != before]
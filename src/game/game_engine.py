@@ -3,6 +3,7 @@
 负责游戏状态管理、角色分发、信息过滤和胜负判定
 """
 import random
+import numpy as np
 from typing import List, Dict, Optional, Set, Tuple
 from dataclasses import dataclass, field
 from enum import Enum
@@ -18,6 +19,8 @@ class Player:
     name: str
     role_type: RoleType
     role: Role
+    # 私有信息（角色与阵营整局不变，开局计算一次后复用，调用方只读）
+    private_info: Optional[Dict] = field(default=None, repr=False, compare=False)
     
     def __post_init__(self):
         if self.role is None:
@@ -38,11 +41,13 @@ class MissionResult:
 class GameState:
     """游戏状态"""
     players: List[Player] = field(default_factory=list)
+    players_by_id: Dict[int, Player] = field(default_factory=dict)  # 玩家ID -> 玩家（开局后不变）
     current_phase: GamePhase = GamePhase.INITIALIZATION
     current_round: int = 0
     current_leader: int = 0  # 当前队长（玩家ID）
-    mission_configs: List[MissionConfig] = field(default_factory=list)
+    mission_configs: Tuple[MissionConfig, ...] = ()
     mission_results: List[MissionResult] = field(default_factory=list)
+    mission_history: List[Dict] = field(default_factory=list)  # 任务历史摘要（与mission_results同步追加）
     proposed_team: List[int] = field(default_factory=list)  # 当前提议的队伍
     votes: Dict[int, bool] = field(default_factory=dict)  # 玩家ID -> 是否同意
     vote_round: int = 0  # 投票轮次（同一任务最多5次投票）
@@ -57,13 +62,18 @@ class RoleDistributor:
     """角色分发器"""
     
     @staticmethod
-    def distribute_roles(player_count: int, player_names: List[str]) -> List[Tuple[int, str, RoleType]]:
+    def distribute_roles(player_count: int, player_names: List[str],
+                         rng: Optional[np.random.Generator] = None) -> List[Tuple[int, str, RoleType]]:
         """
         随机分配角色
+        rng: 随机数生成器（默认使用random模块）
         返回: [(player_id, name, role_type), ...]
         """
-        roles = get_standard_roles(player_count)
-        random.shuffle(roles)
+        roles = list(get_standard_roles(player_count))
+        if rng is not None:
+            rng.shuffle(roles)
+        else:
+            random.shuffle(roles)
         
         assignments = []
         for i, (name, role_type) in enumerate(zip(player_names, roles)):
@@ -134,12 +144,12 @@ class InformationFilter:
         
         # 构建所有玩家列表（包括不可见的）
         all_players_info = []
-        visible_ids = {p.player_id for p in visible_players}
+        visible_by_id = {p.player_id: p for p in visible_players}
         
         for p in all_players:
-            if p.player_id in visible_ids:
+            visible_player = visible_by_id.get(p.player_id)
+            if visible_player is not None:
                 # 可见玩家，使用详细信息
-                visible_player = next(vp for vp in visible_players if vp.player_id == p.player_id)
                 if visible_player.player_id == player.player_id:
                     all_players_info.append({
                         "player_id": visible_player.player_id,
@@ -193,25 +203,13 @@ class WinConditionChecker:
         检查游戏是否结束
         返回: (是否结束, 获胜方)
         """
-        # 检查任务结果
+        # 已结算（刺杀由GameEngine.assassinate直接判定胜负）
+        if state.game_over:
+            return True, state.winner
+        
+        # 好人完成3个任务：等待刺杀阶段结算
         if state.successful_missions >= 3:
-            # 好人完成3个任务，进入刺杀阶段
-            if state.current_phase == GamePhase.ASSASSINATION:
-                # 刺杀阶段已结束，检查刺杀结果
-                if state.assassination_target is not None:
-                    target_player = next(p for p in state.players if p.player_id == state.assassination_target)
-                    if target_player.role_type == RoleType.MERLIN:
-                        # 成功刺杀梅林，坏人获胜
-                        return True, Team.EVIL
-                    else:
-                        # 刺杀失败，好人获胜
-                        return True, Team.GOOD
-                else:
-                    # 刺杀阶段还未执行
-                    return False, None
-            else:
-                # 还未进入刺杀阶段
-                return False, None
+            return False, None
         
         if state.failed_missions >= 3:
             # 坏人破坏3个任务，坏人获胜
@@ -227,12 +225,17 @@ class WinConditionChecker:
 class GameEngine:
     """中央游戏引擎"""
     
-    def __init__(self, player_count: int, player_names: List[str]):
+    def __init__(self, player_count: int, player_names: List[str], seed: Optional[int] = None):
+        """seed: 本局随机数种子（用于可复现的批量模拟）；默认从random模块取种子，仍受random.seed控制"""
         self.player_count = player_count
+        self.rng = np.random.default_rng(seed if seed is not None else random.getrandbits(64))
         self.state = GameState()
         self.role_distributor = RoleDistributor()
         self.info_filter = InformationFilter()
         self.win_checker = WinConditionChecker()
+        # 公共状态摘要缓存：局面未变化时复用（见get_public_state_summary）
+        self._public_summary: Optional[Dict] = None
+        self._public_summary_key: Optional[Tuple] = None
         
         # 初始化玩家和角色
         self._initialize_players(player_names)
@@ -240,12 +243,17 @@ class GameEngine:
     
     def _initialize_players(self, player_names: List[str]):
         """初始化玩家"""
-        assignments = self.role_distributor.distribute_roles(self.player_count, player_names)
+        assignments = self.role_distributor.distribute_roles(self.player_count, player_names, self.rng)
         
         for player_id, name, role_type in assignments:
             role = get_role(role_type)
             player = Player(player_id=player_id, name=name, role_type=role_type, role=role)
             self.state.players.append(player)
+        self.state.players_by_id = {player.player_id: player for player in self.state.players}
+        
+        # 可见关系只取决于角色分配，开局时为每个玩家预先计算私有信息
+        for player in self.state.players:
+            player.private_info = self.info_filter.get_private_info(player, self.state.players)
     
     def _initialize_game(self):
         """初始化游戏状态"""
@@ -256,9 +264,8 @@ class GameEngine:
         self.state.vote_round = 0
     
     def get_player_info(self, player_id: int) -> Dict:
-        """获取玩家的私有信息"""
-        player = next(p for p in self.state.players if p.player_id == player_id)
-        return self.info_filter.get_private_info(player, self.state.players)
+        """获取玩家的私有信息（开局时预先计算，返回的字典为共享对象，不应修改）"""
+        return self.state.players_by_id[player_id].private_info
     
     def propose_team(self, leader_id: int, team_members: List[int]) -> bool:
         """
@@ -273,8 +280,7 @@ class GameEngine:
             return False
         
         # 检查所有成员是否有效
-        valid_player_ids = {p.player_id for p in self.state.players}
-        if not all(mid in valid_player_ids for mid in team_members):
+        if not all(mid in self.state.players_by_id for mid in team_members):
             return False
         
         self.state.proposed_team = team_members
@@ -367,6 +373,15 @@ class GameEngine:
             fail_count=fail_count
         )
         self.state.mission_results.append(mission_result)
+        # 增量维护状态摘要中的任务历史，避免每次生成摘要都重建
+        self.state.mission_history.append({
+            "round": mission_result.round_number,
+            "team": [self.state.players_by_id[pid].name for pid in mission_result.team_members],
+            "team_ids": mission_result.team_members,
+            "success": mission_result.success,
+            "fail_count": mission_result.fail_count,
+            "team_size": len(mission_result.team_members)
+        })
         
         if success:
             self.state.successful_missions += 1
@@ -416,50 +431,58 @@ class GameEngine:
         if self.state.current_phase != GamePhase.ASSASSINATION:
             return False
         
+        # 刺杀是唯一的结算点：刺中梅林坏人获胜，否则好人获胜
+        target = self.state.players_by_id[target_player_id]
         self.state.assassination_target = target_player_id
-        
-        # 检查游戏结果
-        game_over, winner = self.win_checker.check_game_over(self.state)
-        if game_over:
-            self.state.game_over = True
-            self.state.winner = winner
-            self.state.current_phase = GamePhase.FINISHED
+        self.state.winner = Team.EVIL if target.role_type == RoleType.MERLIN else Team.GOOD
+        self.state.game_over = True
+        self.state.current_phase = GamePhase.FINISHED
         
         return True
     
+    def get_public_state_summary(self) -> Dict:
+        """
+        获取所有玩家共享的公共游戏状态摘要（不含私有信息）
+        局面未变化时返回上次构建的同一字典（共享对象，不应修改）
+        """
+        state = self.state
+        # 摘要字段的快照作为缓存键（状态字段也会被引擎外部直接修改，因此不用版本号）；任务历史只追加，比较长度即可
+        key = (state.current_phase, state.current_round, state.current_leader, state.successful_missions,
+               state.failed_missions, state.vote_round, state.game_over, state.winner, len(state.mission_history))
+        if key != self._public_summary_key:
+            self._public_summary = {
+                "current_phase": state.current_phase.name,  # 使用枚举名称而不是值
+                "current_round": state.current_round,
+                "current_leader": state.current_leader,
+                "successful_missions": state.successful_missions,
+                "failed_missions": state.failed_missions,
+                "vote_round": state.vote_round,
+                "game_over": state.game_over,
+                "winner": state.winner.name if state.winner else None,  # 使用枚举名称
+                "mission_history": list(state.mission_history)  # 添加任务历史（浅拷贝，条目只读）
+            }
+            self._public_summary_key = key
+        return self._public_summary
+    
     def get_game_state_summary(self, player_id: Optional[int] = None) -> Dict:
         """
         获取游戏状态摘要
         如果提供player_id，则返回该玩家视角的信息
         """
-        # 构建任务历史信息
-        mission_history = []
-        for result in self.state.mission_results:
-            team_names = [self.state.players[pid].name for pid in result.team_members]
-            mission_history.append({
-                "round": result.round_number,
-                "team": team_names,
-                "team_ids": result.team_members,
-                "success": result.success,
-                "fail_count": result.fail_count,
-                "team_size": len(result.team_members)
-            })
-        
-        summary = {
-            "current_phase": self.state.current_phase.name,  # 使用枚举名称而不是值
-            "current_round": self.state.current_round,
-            "current_leader": self.state.current_leader,
-            "successful_missions": self.state.successful_missions,
-            "failed_missions": self.state.failed_missions,
-            "vote_round": self.state.vote_round,
-            "game_over": self.state.game_over,
-            "winner": self.state.winner.name if self.state.winner else None,  # 使用枚举名称
-            "mission_history": mission_history  # 添加任务历史
-        }
+        summary = dict(self.get_public_state_summary())
         
         if player_id is not None:
             # 添加玩家私有信息
             summary["private_info"] = self.get_player_info(player_id)
         
         return summary
+    
+    def get_game_state_summaries(self, player_ids: List[int]) -> Dict[int, Dict]:
+        """
+        一次获取多名玩家视角的游戏状态摘要（同一阶段内公共部分只构建一次）
+        返回 玩家ID -> 摘要；各摘要是独立的字典，任务历史列表共享（条目只读）
+        """
+        public_summary = self.get_public_state_summary()
+        return {player_id: {**public_summary, "private_info": self.get_player_info(player_id)}
+                for player_id in player_ids}
 
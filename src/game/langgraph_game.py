@@ -2,12 +2,40 @@
 使用 LangGraph 优化的游戏引擎
 提供更清晰的状态管理和更好的可扩展性
 """
-from typing import Dict, List, Optional, TypedDict, Annotated, Literal
+from typing import Dict, List, Optional, TypedDict, Annotated, Literal, Callable, Tuple, Awaitable
 from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
 
-from game.rules import GamePhase, Team
+from game.rules import GamePhase, Team, get_mission_config_dict
+from game.roles import RoleType
 from game.game_engine import GameEngine
 from agent.base_agent import BaseAgent
+from agent.event_loop import LoopRunner, gather_or_raise, run as run_coroutine
+
+try:
+    from langgraph.graph import END
+except ImportError:
+    END = None  # LangGraph未安装时run回退到传统游戏循环
+
+try:
+    from langgraph.types import Command
+except ImportError:
+    Command = None  # 旧版LangGraph没有Command（投票、任务节点无法直接跳转），同样回退到传统游戏循环
+
+
+# 游戏阶段 -> 状态图节点（其余阶段结束状态图，见_next_node）
+_PHASE_ROUTE = {
+    GamePhase.DISCUSSION: "discussion",
+    GamePhase.VOTING: "voting",
+    GamePhase.MISSION: "mission",
+    GamePhase.ASSASSINATION: "assassination",
+    GamePhase.FINISHED: "finished",
+}
+
+# 状态图最多执行的步数（LangGraph recursion_limit）
+# 正常一局不超过约60步（每轮任务最多5次 讨论→投票 + 任务，共5轮，再加刺杀和结束），超出视为异常并强制结束
+_RECURSION_LIMIT = 200
 
 
 class GameStateGraph(TypedDict):
@@ -15,49 +43,61 @@ class GameStateGraph(TypedDict):
     engine: GameEngine
     agents: List[BaseAgent]
     verbose: bool
-    round_count: int
-    max_rounds: int
 
 
 class LangGraphGameEngine:
     """使用 LangGraph 的游戏引擎"""
     
-    def __init__(self, game_engine: GameEngine, agents: List[BaseAgent], verbose: bool = True):
+    def __init__(self, game_engine: GameEngine, agents: List[BaseAgent], verbose: bool = True,
+                 parallel_agents: bool = False, max_concurrency: int = 8):
+        """
+        parallel_agents: 讨论阶段所有玩家并发生成发言（本轮发言彼此不可见），投票/任务阶段所有玩家的决策
+                         在线程池中同时发出，每个阶段总耗时约为单次LLM调用
+        max_concurrency: 并发模式下同时进行的LLM调用上限
+        """
         self.engine = game_engine
         self.agents = agents
         self.verbose = verbose
+        self._agent_index = {agent.player_id: i for i, agent in enumerate(agents)}  # 玩家ID -> 座位下标
+        # 刺客（角色开局分配后整局不变）
+        self._assassin_agent = next((agent for agent in agents if agent.role_type == RoleType.ASSASSIN), None)
+        self.parallel_agents = parallel_agents
+        self.max_concurrency = max_concurrency
+        self._loop_runner = LoopRunner(max_concurrency)  # 复用同一事件循环，保持异步连接池
         
         # 构建状态图
-        try:
-            from langgraph.graph import StateGraph, END
-            self.graph = self._build_graph()
-            self.use_langgraph = True
-        except ImportError:
+        if END is None:
             print("警告: LangGraph未安装，将使用传统游戏循环")
             self.use_langgraph = False
             self.graph = None
+        elif Command is None:
+            print("警告: LangGraph版本过旧（缺少langgraph.types.Command），将使用传统游戏循环")
+            self.use_langgraph = False
+            self.graph = None
+        else:
+            self.graph = self._build_graph()
+            self.use_langgraph = True
+        self._async_graph = None  # arun首次调用时构建
     
-    def _build_graph(self):
-        """构建游戏状态图"""
-        from langgraph.graph import StateGraph, END
+    def _build_graph(self, async_nodes: bool = False):
+        """
+        构建游戏状态图
+        async_nodes: 需要LLM调用的节点使用异步版本（用于graph.ainvoke，见arun）
+        """
+        from langgraph.graph import StateGraph
         
         workflow = StateGraph(GameStateGraph)
         
-        # 添加节点
-        workflow.add_node("check_win", self._check_win_node)
-        workflow.add_node("discussion", self._discussion_node)
-        workflow.add_node("voting", self._voting_node)
-        workflow.add_node("mission", self._mission_node)
-        workflow.add_node("assassination", self._assassination_node)
+        # 添加节点（投票、任务节点返回Command，结算后直接跳转到下一阶段）
+        workflow.add_node("discussion", self._adiscussion_node if async_nodes else self._discussion_node)
+        workflow.add_node("voting", self._avoting_node if async_nodes else self._voting_node)
+        workflow.add_node("mission", self._amission_node if async_nodes else self._mission_node)
+        workflow.add_node("assassination", self._aassassination_node if async_nodes else self._assassination_node)
         workflow.add_node("finished", self._finished_node)
         
-        # 设置入口点
-        workflow.set_entry_point("check_win")
-        
-        # 添加条件边
-        workflow.add_conditional_edges(
-            "check_win",
-            self._route_after_check,
+        # 设置入口点（按当前游戏阶段进入）
+        workflow.set_conditional_entry_point(
+            self._next_node,
             {
                 "discussion": "discussion",
                 "voting": "voting",
@@ -70,236 +110,291 @@ class LangGraphGameEngine:
         
         # 添加边
         workflow.add_edge("discussion", "voting")
-        workflow.add_edge("voting", "check_win")
-        workflow.add_edge("mission", "check_win")
         workflow.add_edge("assassination", "finished")
         workflow.add_edge("finished", END)
         
         return workflow.compile()
     
-    def _check_win_node(self, state: GameStateGraph) -> GameStateGraph:
-        """检查游戏是否结束"""
-        # 检查是否超过最大轮次
-        if state["round_count"] >= state["max_rounds"]:
-            state["engine"].state.game_over = True
-            state["engine"].state.current_phase = GamePhase.FINISHED
-            return state
-        
-        # 检查游戏结束条件
-        game_over, winner = state["engine"].win_checker.check_game_over(state["engine"].state)
-        if game_over:
-            state["engine"].state.game_over = True
-            state["engine"].state.winner = winner
-            state["engine"].state.current_phase = GamePhase.FINISHED
-        
-        return state
-    
-    def _route_after_check(self, state: GameStateGraph) -> Literal["discussion", "voting", "mission", "assassination", "finished", "end"]:
-        """根据游戏状态路由到下一个节点"""
-        if state["engine"].state.game_over:
+    def _next_node(self, state: GameStateGraph) -> Literal["discussion", "voting", "mission", "assassination", "finished", "end"]:
+        """根据游戏状态返回下一个节点（胜负由引擎在投票结算、任务结算和刺杀时直接判定）"""
+        engine_state = state["engine"].state
+        if engine_state.game_over:
             return "finished"
         
-        phase = state["engine"].state.current_phase
-        if phase == GamePhase.DISCUSSION:
-            return "discussion"
-        elif phase == GamePhase.VOTING:
-            return "voting"
-        elif phase == GamePhase.MISSION:
-            return "mission"
-        elif phase == GamePhase.ASSASSINATION:
-            return "assassination"
-        elif phase == GamePhase.FINISHED:
-            return "finished"
-        else:
-            return "end"
+        return _PHASE_ROUTE.get(engine_state.current_phase, "end")
+    
+    def _goto_next(self, state: GameStateGraph) -> "Command":
+        """阶段结算后跳转到下一个节点"""
+        next_node = self._next_node(state)
+        return Command(goto=END if next_node == "end" else next_node)
     
     def _discussion_node(self, state: GameStateGraph) -> GameStateGraph:
         """讨论阶段节点"""
-        if state["verbose"]:
-            print("\n[讨论阶段]")
+        leader_agent, speaking_order, game_states = self._begin_discussion(state)
+        recent_speeches = []
         
-        leader_id = state["engine"].state.current_leader
+        if speaking_order and self.parallel_agents:
+            # 并发模式：所有玩家同时生成发言，收齐后按发言顺序输出
+            speeches = self._run_concurrently([
+                self._acall_agent(agent, "generate_speech", game_states[agent.player_id], []) for agent in speaking_order
+            ])
+            for agent, speech in zip(speaking_order, speeches):
+                self._announce_speech(agent, speech, recent_speeches)
+        else:
+            for agent in speaking_order:
+                speech = agent.generate_speech(game_states[agent.player_id], recent_speeches)
+                self._announce_speech(agent, speech, recent_speeches)
+        
+        # 队长决定队伍
+        proposed_team = leader_agent.propose_team(game_states[leader_agent.player_id])
+        self._finish_discussion(state, leader_agent, proposed_team)
+        return state
+    
+    async def _adiscussion_node(self, state: GameStateGraph) -> GameStateGraph:
+        """讨论阶段节点（异步版本）"""
+        leader_agent, speaking_order, game_states = self._begin_discussion(state)
         recent_speeches = []
         
-        # 准备游戏状态
-        base_game_state = state["engine"].get_game_state_summary(leader_id)
-        if state["engine"].state.current_round <= len(state["engine"].state.mission_configs):
-            current_config = state["engine"].state.mission_configs[state["engine"].state.current_round - 1]
-            base_game_state["mission_config"] = {
-                "team_size": current_config.team_size,
-                "fails_needed": current_config.fails_needed
-            }
+        if speaking_order and self.parallel_agents:
+            speeches = await gather_or_raise([
+                self._acall_agent(agent, "generate_speech", game_states[agent.player_id], []) for agent in speaking_order
+            ], self.max_concurrency)
+            for agent, speech in zip(speaking_order, speeches):
+                self._announce_speech(agent, speech, recent_speeches)
         else:
-            base_game_state["mission_config"] = {
-                "team_size": 2,
-                "fails_needed": 1
-            }
+            for agent in speaking_order:
+                speech = await self._acall_agent(agent, "generate_speech", game_states[agent.player_id], recent_speeches)
+                self._announce_speech(agent, speech, recent_speeches)
         
+        proposed_team = await self._acall_agent(leader_agent, "propose_team", game_states[leader_agent.player_id])
+        self._finish_discussion(state, leader_agent, proposed_team)
+        return state
+    
+    def _begin_discussion(self, state: GameStateGraph) -> Tuple[BaseAgent, List[BaseAgent], Dict[int, Dict]]:
+        """讨论阶段准备：返回 (队长, 发言顺序, 玩家ID -> 游戏状态)；只有verbose模式会生成发言，否则发言顺序为空"""
+        engine = state["engine"]
+        agents = state["agents"]
         # 找到队长位置
-        leader_index = next(i for i, agent in enumerate(state["agents"]) if agent.player_id == leader_id)
-        leader_agent = state["agents"][leader_index]
-        
-        # 从队长的下一位开始发言
-        for i in range(len(state["agents"])):
-            agent_index = (leader_index + 1 + i) % len(state["agents"])
-            agent = state["agents"][agent_index]
-            
-            game_state = state["engine"].get_game_state_summary(agent.player_id)
-            game_state["mission_config"] = base_game_state["mission_config"]
-            game_state["mission_history"] = base_game_state.get("mission_history", [])
-            
-            if state["verbose"]:
-                speech = agent.generate_speech(game_state, recent_speeches)
-                print(f"{agent.name}: {speech}")
-                recent_speeches.append({"player_id": agent.player_id, "name": agent.name, "speech": speech})
+        leader_index = self._agent_index[engine.state.current_leader]
+        leader_agent = agents[leader_index]
         
-        # 队长决定队伍
-        leader_game_state = state["engine"].get_game_state_summary(leader_id)
-        leader_game_state["mission_config"] = base_game_state["mission_config"]
-        leader_game_state["mission_history"] = base_game_state.get("mission_history", [])
+        if not state["verbose"]:
+            return leader_agent, [], self._phase_game_states(engine, [leader_agent])
         
-        proposed_team = leader_agent.propose_team(leader_game_state)
+        print("\n[讨论阶段]")
         
+        # 从队长的下一位开始发言
+        speaking_order = [agents[(leader_index + 1 + i) % len(agents)] for i in range(len(agents))]
+        return leader_agent, speaking_order, self._phase_game_states(engine, agents)
+    
+    @staticmethod
+    def _announce_speech(agent: BaseAgent, speech: str, recent_speeches: List[Dict]):
+        """输出发言并加入本轮发言记录"""
+        print(f"{agent.name}: {speech}")
+        recent_speeches.append({"player_id": agent.player_id, "name": agent.name, "speech": speech})
+    
+    def _finish_discussion(self, state: GameStateGraph, leader_agent: BaseAgent, proposed_team: List[int]):
+        """提交队长提议的队伍"""
+        engine = state["engine"]
         if state["verbose"]:
-            leader_name = state["engine"].state.players[leader_id].name
-            team_names = [state["engine"].state.players[pid].name for pid in proposed_team]
-            print(f"\n{leader_name} 根据讨论决定队伍: {', '.join(team_names)}")
+            players = engine.state.players
+            team_names = [players[pid].name for pid in proposed_team]
+            print(f"\n{players[leader_agent.player_id].name} 根据讨论决定队伍: {', '.join(team_names)}")
         
-        state["engine"].propose_team(leader_id, proposed_team)
-        return state
+        engine.propose_team(leader_agent.player_id, proposed_team)
+    
+    @staticmethod
+    def _phase_game_states(engine: GameEngine, agents: List[BaseAgent]) -> Dict[int, Dict]:
+        """本阶段各玩家视角的游戏状态：公共摘要和当前任务配置只构建一次，返回 玩家ID -> 游戏状态"""
+        mission_config = get_mission_config_dict(engine.state.mission_configs, engine.state.current_round)
+        game_states = engine.get_game_state_summaries([agent.player_id for agent in agents])
+        for game_state in game_states.values():
+            game_state["mission_config"] = mission_config
+        return game_states
+    
+    @staticmethod
+    async def _acall_agent(agent: BaseAgent, method_name: str, *args):
+        """异步调用智能体方法：优先使用异步版本（a前缀，如agenerate_speech），没有时在线程中运行同步版本"""
+        async_method = getattr(agent, "a" + method_name, None)
+        if async_method is not None:
+            return await async_method(*args)
+        return await asyncio.to_thread(getattr(agent, method_name), *args)
+    
+    def _run_concurrently(self, coroutines: List) -> List:
+        """在引擎的事件循环中并发执行协程，按输入顺序返回结果"""
+        return self._loop_runner.gather(coroutines)
+    
+    def _call_agents(self, calls: Dict[int, Tuple[Callable, tuple]]) -> Dict[int, object]:
+        """
+        执行各玩家的决策调用 玩家ID -> (方法, 参数)，返回 玩家ID -> 结果（顺序与输入一致）
+        并发模式下在线程池中同时执行（决策只读取引擎状态，互不影响）
+        """
+        if not self.parallel_agents or len(calls) < 2:
+            return {player_id: func(*args) for player_id, (func, args) in calls.items()}
+        with ThreadPoolExecutor(max_workers=min(len(calls), self.max_concurrency)) as pool:
+            futures = {player_id: pool.submit(func, *args) for player_id, (func, args) in calls.items()}
+            return {player_id: future.result() for player_id, future in futures.items()}
     
-    def _voting_node(self, state: GameStateGraph) -> GameStateGraph:
+    async def _acall_agents(self, coroutines: Dict[int, Awaitable]) -> Dict[int, object]:
+        """_call_agents的异步版本：玩家ID -> 协程；并发模式下同时等待，否则逐个等待"""
+        if not self.parallel_agents:
+            return {player_id: await coroutine for player_id, coroutine in coroutines.items()}
+        results = await gather_or_raise(list(coroutines.values()), self.max_concurrency)
+        return dict(zip(coroutines.keys(), results))
+    
+    def _voting_node(self, state: GameStateGraph) -> "Command[Literal['discussion', 'mission', 'finished']]":
         """投票阶段节点"""
+        proposed_team, voters, game_states = self._begin_voting(state)
+        decisions = self._call_agents({
+            agent.player_id: (agent.vote_on_team, (game_states[agent.player_id], proposed_team)) for agent in voters
+        })
+        self._finish_voting(state, decisions)
+        return self._goto_next(state)
+    
+    async def _avoting_node(self, state: GameStateGraph) -> "Command[Literal['discussion', 'mission', 'finished']]":
+        """投票阶段节点（异步版本）"""
+        proposed_team, voters, game_states = self._begin_voting(state)
+        decisions = await self._acall_agents({
+            agent.player_id: self._acall_agent(agent, "vote_on_team", game_states[agent.player_id], proposed_team)
+            for agent in voters
+        })
+        self._finish_voting(state, decisions)
+        return self._goto_next(state)
+    
+    def _begin_voting(self, state: GameStateGraph) -> Tuple[List[int], List[BaseAgent], Dict[int, Dict]]:
+        """投票阶段准备：返回 (提议的队伍, 需要决策的玩家, 玩家ID -> 游戏状态)；队长必须同意自己提议的队伍，不需要决策"""
+        engine = state["engine"]
+        engine_state = engine.state
+        proposed_team = engine_state.proposed_team
+        
         if state["verbose"]:
             print("\n[投票阶段]")
+            print(f"对队伍进行投票: {', '.join(engine_state.players[pid].name for pid in proposed_team)}")
         
-        proposed_team = state["engine"].state.proposed_team
-        team_names = [state["engine"].state.players[pid].name for pid in proposed_team]
-        leader_id = state["engine"].state.current_leader
-        
-        if state["verbose"]:
-            print(f"对队伍进行投票: {', '.join(team_names)}")
-        
-        votes = {}
-        for agent in state["agents"]:
-            game_state = state["engine"].get_game_state_summary(agent.player_id)
-            if state["engine"].state.current_round <= len(state["engine"].state.mission_configs):
-                current_config = state["engine"].state.mission_configs[state["engine"].state.current_round - 1]
-                game_state["mission_config"] = {
-                    "team_size": current_config.team_size,
-                    "fails_needed": current_config.fails_needed
-                }
-            else:
-                game_state["mission_config"] = {"team_size": 2, "fails_needed": 1}
-            
-            # 队长必须同意自己提议的队伍
-            if agent.player_id == leader_id:
-                vote = True
-            else:
-                vote = agent.vote_on_team(game_state, proposed_team)
-            
-            votes[agent.player_id] = vote
-            state["engine"].vote_on_team(agent.player_id, vote)
+        # 先收集所有玩家的决策（只读取引擎状态），再按玩家顺序写入引擎
+        leader_id = engine_state.current_leader
+        voters = [agent for agent in state["agents"] if agent.player_id != leader_id]
+        return proposed_team, voters, self._phase_game_states(engine, voters)
+    
+    def _finish_voting(self, state: GameStateGraph, decisions: Dict[int, bool]):
+        """按玩家顺序写入投票并结算"""
+        engine = state["engine"]
+        verbose = state["verbose"]
+        agents = state["agents"]
+        leader_id = engine.state.current_leader
+        approve_count = 0
+        vote_lines = []  # 仅verbose模式收集，最后一次性输出
+        for agent in agents:
+            vote = True if agent.player_id == leader_id else decisions[agent.player_id]
+            approve_count += vote
+            engine.vote_on_team(agent.player_id, vote)
             
-            if state["verbose"]:
+            if verbose:
                 vote_text = "同意" if vote else "拒绝"
-                print(f"{agent.name}: {vote_text}")
+                vote_lines.append(f"{agent.name}: {vote_text}")
+        if verbose:
+            print("\n".join(vote_lines))
         
         # 处理投票结果
-        voting_complete, passed = state["engine"].process_voting_result()
+        voting_complete, passed = engine.process_voting_result()
         
-        if state["verbose"]:
-            approve_count = sum(1 for v in votes.values() if v)
-            reject_count = len(votes) - approve_count
+        if verbose:
+            reject_count = len(agents) - approve_count
             print(f"\n投票结果: {approve_count} 同意, {reject_count} 拒绝")
             print(f"结果: {'通过' if passed else '未通过'}")
-        
-        return state
     
-    def _mission_node(self, state: GameStateGraph) -> GameStateGraph:
+    def _mission_node(self, state: GameStateGraph) -> "Command[Literal['discussion', 'assassination', 'finished']]":
         """任务执行节点"""
+        mission_team, members, game_states = self._begin_mission(state)
+        mission_votes = self._call_agents({
+            agent.player_id: (agent.vote_on_mission, (game_states[agent.player_id], mission_team)) for agent in members
+        })
+        self._finish_mission(state, mission_team, mission_votes)
+        return self._goto_next(state)
+    
+    async def _amission_node(self, state: GameStateGraph) -> "Command[Literal['discussion', 'assassination', 'finished']]":
+        """任务执行节点（异步版本）"""
+        mission_team, members, game_states = self._begin_mission(state)
+        mission_votes = await self._acall_agents({
+            agent.player_id: self._acall_agent(agent, "vote_on_mission", game_states[agent.player_id], mission_team)
+            for agent in members
+        })
+        self._finish_mission(state, mission_team, mission_votes)
+        return self._goto_next(state)
+    
+    def _begin_mission(self, state: GameStateGraph) -> Tuple[List[int], List[BaseAgent], Dict[int, Dict]]:
+        """任务阶段准备：返回 (任务队伍, 执行任务的玩家, 玩家ID -> 游戏状态)"""
+        engine = state["engine"]
+        mission_team = engine.state.proposed_team
+        
         if state["verbose"]:
             print("\n[任务执行阶段]")
+            print(f"执行任务的队伍: {', '.join(engine.state.players[pid].name for pid in mission_team)}")
         
-        mission_team = state["engine"].state.proposed_team
-        team_names = [state["engine"].state.players[pid].name for pid in mission_team]
-        
-        if state["verbose"]:
-            print(f"执行任务的队伍: {', '.join(team_names)}")
-        
-        mission_votes = {}
-        for agent in state["agents"]:
-            if agent.player_id in mission_team:
-                game_state = state["engine"].get_game_state_summary(agent.player_id)
-                if state["engine"].state.current_round <= len(state["engine"].state.mission_configs):
-                    current_config = state["engine"].state.mission_configs[state["engine"].state.current_round - 1]
-                    game_state["mission_config"] = {
-                        "team_size": current_config.team_size,
-                        "fails_needed": current_config.fails_needed
-                    }
-                else:
-                    game_state["mission_config"] = {"team_size": 2, "fails_needed": 1}
-                
-                success = agent.vote_on_mission(game_state, mission_team)
-                mission_votes[agent.player_id] = success
-                
-                if state["verbose"]:
-                    result_text = "成功" if success else "失败"
-                    print(f"{agent.name}: {result_text}")
+        # 通过座位下标直接取出任务队员（保持座位顺序），不扫描所有玩家
+        agents = state["agents"]
+        members = [agents[seat] for seat in sorted(self._agent_index[pid] for pid in mission_team)]
+        return mission_team, members, self._phase_game_states(engine, members)
+    
+    def _finish_mission(self, state: GameStateGraph, mission_team: List[int], mission_votes: Dict[int, bool]):
+        """提交任务结果并更新所有智能体的信念"""
+        engine = state["engine"]
+        agents = state["agents"]
+        verbose = state["verbose"]
+        if verbose:
+            print("\n".join(f"{agent.name}: {'成功' if mission_votes[agent.player_id] else '失败'}"
+                            for agent in agents if agent.player_id in mission_votes))
         
         # 提交任务结果
-        state["engine"].submit_mission_result(mission_votes)
+        engine.submit_mission_result(mission_votes)
         
         # 更新所有智能体的信念系统
-        if state["engine"].state.mission_results:
-            last_result = state["engine"].state.mission_results[-1]
-            for agent in state["agents"]:
-                for player_id, vote_success in mission_votes.items():
-                    agent.belief_system.update_belief_from_mission(
-                        player_id=player_id,
-                        mission_success=vote_success,
-                        mission_team=mission_team,
-                        mission_result=last_result.success
-                    )
+        mission_results = engine.state.mission_results
+        if mission_results:
+            last_result = mission_results[-1]
+            for agent in agents:
+                agent.belief_system.update_beliefs_from_mission(mission_votes, mission_team, last_result.success)
             
-            if state["verbose"]:
+            if verbose:
                 result_text = "成功" if last_result.success else "失败"
                 print(f"\n任务结果: {result_text} (失败票数: {last_result.fail_count})")
-        
-        # 增加轮次计数
-        state["round_count"] += 1
-        
-        return state
     
     def _assassination_node(self, state: GameStateGraph) -> GameStateGraph:
         """刺杀阶段节点"""
+        assassin_agent = self._begin_assassination(state)
+        if assassin_agent:
+            game_state = state["engine"].get_game_state_summary(assassin_agent.player_id)
+            self._finish_assassination(state, assassin_agent, assassin_agent.assassinate(game_state))
+        return state
+    
+    async def _aassassination_node(self, state: GameStateGraph) -> GameStateGraph:
+        """刺杀阶段节点（异步版本）"""
+        assassin_agent = self._begin_assassination(state)
+        if assassin_agent:
+            game_state = state["engine"].get_game_state_summary(assassin_agent.player_id)
+            target_id = await self._acall_agent(assassin_agent, "assassinate", game_state)
+            self._finish_assassination(state, assassin_agent, target_id)
+        return state
+    
+    def _begin_assassination(self, state: GameStateGraph) -> Optional[BaseAgent]:
+        """刺杀阶段准备：返回刺客（没有刺客时为None）"""
         if state["verbose"]:
             print("\n[刺杀阶段]")
             print("坏人阵营可以刺杀梅林...")
         
-        # 找到刺客
-        assassin_agent = None
-        for agent in state["agents"]:
-            from game.roles import RoleType
-            if agent.role_type == RoleType.ASSASSIN:
-                assassin_agent = agent
-                break
-        
-        if assassin_agent:
-            game_state = state["engine"].get_game_state_summary(assassin_agent.player_id)
-            target_id = assassin_agent.assassinate(game_state)
+        return self._assassin_agent
+    
+    def _finish_assassination(self, state: GameStateGraph, assassin_agent: BaseAgent, target_id: Optional[int]):
+        """执行刺杀"""
+        if target_id is not None:
+            engine = state["engine"]
+            if state["verbose"]:
+                print(f"{assassin_agent.name} 选择刺杀: {engine.state.players[target_id].name}")
             
-            if target_id is not None:
-                target_name = state["engine"].state.players[target_id].name
-                if state["verbose"]:
-                    print(f"{assassin_agent.name} 选择刺杀: {target_name}")
-                
-                state["engine"].assassinate(target_id)
-            else:
-                if state["verbose"]:
-                    print(f"{assassin_agent.name} 无法决定刺杀目标")
-        
-        return state
+            engine.assassinate(target_id)
+        else:
+            if state["verbose"]:
+                print(f"{assassin_agent.name} 无法决定刺杀目标")
     
     def _finished_node(self, state: GameStateGraph) -> GameStateGraph:
         """游戏结束节点"""
@@ -314,22 +409,26 @@ class LangGraphGameEngine:
         print("游戏结束！")
         print("=" * 60)
         
-        if state["engine"].state.winner:
-            winner_text = "好人阵营" if state["engine"].state.winner == Team.GOOD else "坏人阵营"
+        engine_state = state["engine"].state
+        players = engine_state.players
+        if engine_state.winner:
+            winner_text = "好人阵营" if engine_state.winner == Team.GOOD else "坏人阵营"
             print(f"获胜方: {winner_text}")
         else:
             print("游戏未正常结束")
         
         print(f"\n最终统计:")
-        print(f"  成功任务: {state['engine'].state.successful_missions}")
-        print(f"  失败任务: {state['engine'].state.failed_missions}")
-        print(f"  总轮次: {len(state['engine'].state.mission_results)}")
+        print(f"  成功任务: {engine_state.successful_missions}")
+        print(f"  失败任务: {engine_state.failed_missions}")
+        print(f"  总轮次: {len(engine_state.mission_results)}")
         
-        print("\n任务历史:")
-        for i, result in enumerate(state["engine"].state.mission_results, 1):
+        # 任务历史整体拼接后一次输出
+        lines = ["\n任务历史:"]
+        for i, result in enumerate(engine_state.mission_results, 1):
             result_text = "成功" if result.success else "失败"
-            team_names = [state["engine"].state.players[pid].name for pid in result.team_members]
-            print(f"  第{i}轮: {result_text} - 队伍: {', '.join(team_names)}")
+            team_names = ", ".join(players[pid].name for pid in result.team_members)
+            lines.append(f"  第{i}轮: {result_text} - 队伍: {team_names}")
+        print("\n".join(lines))
     
     def run(self):
         """运行游戏"""
@@ -339,36 +438,91 @@ class LangGraphGameEngine:
             game = AvalonGame(
                 player_count=len(self.engine.state.players),
                 player_names=[p.name for p in self.engine.state.players],
-                use_llm=True
+                use_llm=True,
+                parallel_agents=self.parallel_agents,
+                max_concurrency=self.max_concurrency
             )
             game.engine = self.engine
             game.agents = self.agents
+            game._index_agents()
             game.run_game(verbose=self.verbose)
             return
         
-        if self.verbose:
-            print("=" * 60)
-            print("游戏开始！")
-            print("=" * 60)
-            self._print_role_assignment()
-            print()
-        
-        initial_state: GameStateGraph = {
-            "engine": self.engine,
-            "agents": self.agents,
-            "verbose": self.verbose,
-            "round_count": 0,
-            "max_rounds": 20
-        }
+        self._print_game_start()
         
-        # 运行状态图
+        # 运行状态图（步数上限由LangGraph的recursion_limit控制）
+        from langgraph.errors import GraphRecursionError
         try:
-            final_state = self.graph.invoke(initial_state)
+            final_state = self.graph.invoke(self._initial_state(), config={"recursion_limit": _RECURSION_LIMIT})
             return final_state
+        except GraphRecursionError:
+            self._stop_at_step_limit()
+            return None
+        except Exception as e:
+            print(f"LangGraph执行错误: {e}")
+            raise
+        finally:
+            self.close()
+    
+    def close(self):
+        """关闭引擎持有的事件循环（run结束时自动调用）"""
+        self._loop_runner.close()
+    
+    async def arun(self):
+        """
+        run的异步版本：使用graph.ainvoke，LLM调用走智能体的异步接口
+        多局游戏可在同一事件循环中并发运行，LLM等待时间在各局之间重叠（见run_games）
+        自行管理事件循环时，所有对局结束后await event_loop.release_loop_resources()关闭共享连接池
+        """
+        if not self.use_langgraph:
+            # 回退到传统游戏循环（在线程中运行，不阻塞事件循环）
+            return await asyncio.to_thread(self.run)
+        
+        if self._async_graph is None:
+            self._async_graph = self._build_graph(async_nodes=True)
+        self._print_game_start()
+        
+        from langgraph.errors import GraphRecursionError
+        try:
+            return await self._async_graph.ainvoke(self._initial_state(), config={"recursion_limit": _RECURSION_LIMIT})
+        except GraphRecursionError:
+            self._stop_at_step_limit()
+            return None
         except Exception as e:
             print(f"LangGraph执行错误: {e}")
             raise
     
+    @staticmethod
+    def run_games(engines: List["LangGraphGameEngine"]) -> List:
+        """并发运行多局游戏（用于自我对局/训练），返回各局的最终状态"""
+        async def run_all():
+            return await asyncio.gather(*(engine.arun() for engine in engines))
+        
+        return run_coroutine(run_all())
+    
+    def _initial_state(self) -> GameStateGraph:
+        """状态图的初始状态"""
+        return {
+            "engine": self.engine,
+            "agents": self.agents,
+            "verbose": self.verbose
+        }
+    
+    def _stop_at_step_limit(self):
+        """状态图超过步数上限：强制结束游戏（无获胜方）"""
+        print(f"警告: 状态图超过{_RECURSION_LIMIT}步仍未结束，强制结束游戏")
+        self.engine.state.game_over = True
+        self.engine.state.current_phase = GamePhase.FINISHED
+    
+    def _print_game_start(self):
+        """输出开局信息"""
+        if self.verbose:
+            print("=" * 60)
+            print("游戏开始！")
+            print("=" * 60)
+            self._print_role_assignment()
+            print()
+    
     def _print_role_assignment(self):
         """打印角色分配（仅用于调试）"""
         print("\n角色分配（调试信息）:")
@@ -2,8 +2,7 @@
 阿瓦隆游戏规则定义
 """
 from enum import Enum
-from typing import List, Dict, Tuple
-from dataclasses import dataclass
+from typing import Dict, Tuple, NamedTuple
 
 
 class Team(Enum):
@@ -22,8 +21,7 @@ class GamePhase(Enum):
     FINISHED = "游戏结束"
 
 
-@dataclass
-class MissionConfig:
+class MissionConfig(NamedTuple):
     """任务配置"""
     round_number: int  # 第几轮
     team_size: int  # 队伍人数
@@ -31,71 +29,97 @@ class MissionConfig:
 
 
 # 5人局配置
-MISSION_CONFIGS_5 = [
+MISSION_CONFIGS_5 = (
     MissionConfig(round_number=1, team_size=2, fails_needed=1),
     MissionConfig(round_number=2, team_size=3, fails_needed=1),
     MissionConfig(round_number=3, team_size=2, fails_needed=1),
     MissionConfig(round_number=4, team_size=3, fails_needed=1),
     MissionConfig(round_number=5, team_size=3, fails_needed=1),
-]
+)
 
 # 6人局配置
-MISSION_CONFIGS_6 = [
+MISSION_CONFIGS_6 = (
     MissionConfig(round_number=1, team_size=2, fails_needed=1),
     MissionConfig(round_number=2, team_size=3, fails_needed=1),
     MissionConfig(round_number=3, team_size=4, fails_needed=1),
     MissionConfig(round_number=4, team_size=3, fails_needed=1),
     MissionConfig(round_number=5, team_size=4, fails_needed=1),
-]
+)
 
 # 7人局配置
-MISSION_CONFIGS_7 = [
+MISSION_CONFIGS_7 = (
     MissionConfig(round_number=1, team_size=2, fails_needed=1),
     MissionConfig(round_number=2, team_size=3, fails_needed=1),
     MissionConfig(round_number=3, team_size=3, fails_needed=1),
     MissionConfig(round_number=4, team_size=4, fails_needed=2),
     MissionConfig(round_number=5, team_size=4, fails_needed=1),
-]
+)
 
 # 8人局配置
-MISSION_CONFIGS_8 = [
+MISSION_CONFIGS_8 = (
     MissionConfig(round_number=1, team_size=3, fails_needed=1),
     MissionConfig(round_number=2, team_size=4, fails_needed=1),
     MissionConfig(round_number=3, team_size=4, fails_needed=1),
     MissionConfig(round_number=4, team_size=5, fails_needed=2),
     MissionConfig(round_number=5, team_size=5, fails_needed=1),
-]
+)
 
 # 9人局配置
-MISSION_CONFIGS_9 = [
+MISSION_CONFIGS_9 = (
     MissionConfig(round_number=1, team_size=3, fails_needed=1),
     MissionConfig(round_number=2, team_size=4, fails_needed=1),
     MissionConfig(round_number=3, team_size=4, fails_needed=1),
     MissionConfig(round_number=4, team_size=5, fails_needed=2),
     MissionConfig(round_number=5, team_size=5, fails_needed=1),
-]
+)
 
 # 10人局配置
-MISSION_CONFIGS_10 = [
+MISSION_CONFIGS_10 = (
     MissionConfig(round_number=1, team_size=3, fails_needed=1),
     MissionConfig(round_number=2, team_size=4, fails_needed=1),
     MissionConfig(round_number=3, team_size=4, fails_needed=1),
     MissionConfig(round_number=4, team_size=5, fails_needed=2),
     MissionConfig(round_number=5, team_size=5, fails_needed=1),
-]
-
-
-def get_mission_configs(player_count: int) -> List[MissionConfig]:
-    """根据玩家数量获取任务配置"""
-    configs = {
-        5: MISSION_CONFIGS_5,
-        6: MISSION_CONFIGS_6,
-        7: MISSION_CONFIGS_7,
-        8: MISSION_CONFIGS_8,
-        9: MISSION_CONFIGS_9,
-        10: MISSION_CONFIGS_10,
-    }
-    return configs.get(player_count, MISSION_CONFIGS_5)
+)
+
+
+# 玩家数量 -> 任务配置
+_CONFIGS_BY_COUNT: Dict[int, Tuple[MissionConfig, ...]] = {
+    5: MISSION_CONFIGS_5,
+    6: MISSION_CONFIGS_6,
+    7: MISSION_CONFIGS_7,
+    8: MISSION_CONFIGS_8,
+    9: MISSION_CONFIGS_9,
+    10: MISSION_CONFIGS_10,
+}
+
+
+# 没有更多任务时使用的默认任务配置
+DEFAULT_MISSION_CONFIG_DICT: Dict[str, int] = {"team_size": 2, "fails_needed": 1}
+
+# 任务配置 -> 智能体决策用的配置字典（预先构建，调用方只读）
+_CONFIG_DICTS: Dict[MissionConfig, Dict[str, int]] = {
+    config: {"team_size": config.team_size, "fails_needed": config.fails_needed}
+    for configs in _CONFIGS_BY_COUNT.values()
+    for config in configs
+}
+
+
+def get_mission_configs(player_count: int) -> Tuple[MissionConfig, ...]:
+    """根据玩家数量获取任务配置（返回共享的只读元组）"""
+    return _CONFIGS_BY_COUNT.get(player_count, MISSION_CONFIGS_5)
+
+
+def get_mission_config_dict(mission_configs: Tuple[MissionConfig, ...], current_round: int) -> Dict[str, int]:
+    """当前轮次的任务配置字典 {"team_size", "fails_needed"}（共享字典，不要修改）；没有更多任务时返回默认配置"""
+    if current_round > len(mission_configs):
+        return DEFAULT_MISSION_CONFIG_DICT
+    config = mission_configs[current_round - 1]
+    mission_config = _CONFIG_DICTS.get(config)
+    if mission_config is None:
+        team_size, fails_needed = config.team_size, config.fails_needed
+        mission_config = {"team_size": team_size, "fails_needed": fails_needed}
+    return mission_config
 
 
 def get_evil_count(player_count: int) -> int:
@@ -1,17 +1,22 @@
 """
 AI阿瓦隆多智能体系统 - 主程序入口
 """
+import asyncio
+import functools
 import random
 import sys
 import os
-from typing import List, Dict, Optional
+from dataclasses import dataclass
+from typing import Iterator, List, Dict, Optional, Tuple
 
 # 添加src目录到路径
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from game.game_engine import GameEngine
+from game.game_engine import GameEngine, GameState
 from agent.base_agent import BaseAgent
-from game.rules import GamePhase, Team
+from agent.event_loop import LoopRunner, gather_or_raise
+from game.rules import GamePhase, Team, get_mission_config_dict
+from game.roles import RoleType
 
 
 class AvalonGame:
@@ -19,7 +24,11 @@ class AvalonGame:
     
     def __init__(self, player_count: int = 5, player_names: List[str] = None,
                  use_llm: bool = False, llm_api_key: Optional[str] = None,
-                 llm_model: str = "gpt-4o-mini", llm_api_provider: str = "openai"):
+                 llm_model: str = "gpt-4o-mini", llm_api_provider: str = "openai",
+                 llm_batch_mode: bool = False, llm_small_model: Optional[str] = None,
+                 parallel_agents: bool = False, max_concurrency: int = 8,
+                 llm_attempt_timeout: Optional[float] = None, llm_use_batch_api: bool = False,
+                 seed: Optional[int] = None):
         if player_names is None:
             player_names = [f"玩家{i+1}" for i in range(player_count)]
         
@@ -32,9 +41,17 @@ class AvalonGame:
         self.llm_api_key = llm_api_key
         self.llm_model = llm_model
         self.llm_api_provider = llm_api_provider
+        self.llm_batch_mode = llm_batch_mode  # 投票阶段（及任务阶段队伍中的多名坏人）是否合并为一次LLM调用
+        self.llm_small_model = llm_small_model  # 低信息量决策（如第1轮投票/发言）使用的小模型
+        self.llm_attempt_timeout = llm_attempt_timeout  # 单次LLM请求的总时长上限（秒），建议略高于提供商P50延迟
+        self.llm_use_batch_api = llm_use_batch_api  # 讨论阶段所有发言一次提交（OpenAI Batch API，其他提供商并发调用）
+        # 并发模式：同一阶段中互不依赖的LLM调用（投票、任务投票、发言）并发发出
+        self.parallel_agents = parallel_agents
+        self.max_concurrency = max_concurrency  # 同时进行的LLM调用上限（受提供商限流约束）
+        self._loop_runner = LoopRunner(max_concurrency)  # 复用同一事件循环，保持异步连接池
         
         # 初始化游戏引擎
-        self.engine = GameEngine(player_count, player_names)
+        self.engine = GameEngine(player_count, player_names, seed=seed)
         
         # 初始化智能体
         self.agents: List[BaseAgent] = []
@@ -42,6 +59,14 @@ class AvalonGame:
         
         # 游戏历史记录（用于前端展示）
         self.game_history: List[Dict] = []
+        
+        # 阶段 -> 处理函数（游戏结束阶段没有处理函数）
+        self._phase_handlers = {
+            GamePhase.DISCUSSION: self._handle_discussion_phase,
+            GamePhase.VOTING: self._handle_voting_phase,
+            GamePhase.MISSION: self._handle_mission_phase,
+            GamePhase.ASSASSINATION: self._handle_assassination_phase,
+        }
     
     def _initialize_agents(self):
         """初始化智能体"""
@@ -52,7 +77,11 @@ class AvalonGame:
                 use_llm=self.use_llm,
                 llm_api_key=self.llm_api_key,
                 llm_model=self.llm_model,
-                llm_api_provider=self.llm_api_provider
+                llm_api_provider=self.llm_api_provider,
+                llm_batch_mode=self.llm_batch_mode,
+                llm_small_model=self.llm_small_model,
+                llm_attempt_timeout=self.llm_attempt_timeout,
+                llm_use_batch_api=self.llm_use_batch_api
             )
             
             # 获取玩家的私有信息
@@ -62,10 +91,25 @@ class AvalonGame:
             agent.initialize_role(player.role_type, private_info)
             
             self.agents.append(agent)
+        self._index_agents()
+        
+        # 同一局所有玩家的事实核查数据相同：共享缓存，每个局面只序列化一次
+        facts_cache: Dict = {}
+        for agent in self.agents:
+            if agent.llm_strategy_engine:
+                agent.llm_strategy_engine.share_facts_cache(facts_cache)
+    
+    def _index_agents(self):
+        """建立 玩家ID -> 智能体/座位下标、角色 -> 智能体 的索引（替换self.agents后需重新调用）"""
+        self._agents_by_id: Dict[int, BaseAgent] = {agent.player_id: agent for agent in self.agents}
+        self._agent_index: Dict[int, int] = {agent.player_id: i for i, agent in enumerate(self.agents)}
+        self._agents_by_role: Dict[RoleType, List[BaseAgent]] = {}
+        for agent in self.agents:
+            self._agents_by_role.setdefault(agent.role_type, []).append(agent)
     
     def get_agent(self, player_id: int) -> BaseAgent:
         """获取指定玩家的智能体"""
-        return next(agent for agent in self.agents if agent.player_id == player_id)
+        return self._agents_by_id[player_id]
     
     def run_game(self, verbose: bool = True):
         """运行游戏"""
@@ -77,66 +121,174 @@ class AvalonGame:
             print()
         
         # 游戏主循环
-        max_rounds = 20  # 防止无限循环
-        round_count = 0
+        try:
+            for _ in self.run_game_phases(verbose):
+                pass
+        finally:
+            self.close()
         
-        while not self.engine.state.game_over and round_count < max_rounds:
-            round_count += 1
-            
-            # 检查游戏是否结束
-            game_over, winner = self.engine.win_checker.check_game_over(self.engine.state)
-            if game_over:
-                self.engine.state.game_over = True
-                self.engine.state.winner = winner
-                self.engine.state.current_phase = GamePhase.FINISHED
-                break
-            
-            if verbose:
-                print(f"\n--- 第 {self.engine.state.current_round} 轮任务 ---")
-                print(f"当前队长: {self.engine.state.players[self.engine.state.current_leader].name}")
-                print(f"成功任务: {self.engine.state.successful_missions}, "
-                      f"失败任务: {self.engine.state.failed_missions}")
-            
-            # 讨论阶段
-            if self.engine.state.current_phase == GamePhase.DISCUSSION:
-                self._handle_discussion_phase(verbose)
-            
-            # 投票阶段
-            elif self.engine.state.current_phase == GamePhase.VOTING:
-                self._handle_voting_phase(verbose)
-                # 投票后检查是否游戏结束（流局5次）
-                if self.engine.state.game_over:
-                    break
-            
-            # 任务执行阶段
-            elif self.engine.state.current_phase == GamePhase.MISSION:
-                self._handle_mission_phase(verbose)
-                # 任务后检查是否游戏结束
-                game_over, winner = self.engine.win_checker.check_game_over(self.engine.state)
-                if game_over:
-                    self.engine.state.game_over = True
-                    self.engine.state.winner = winner
-                    self.engine.state.current_phase = GamePhase.FINISHED
-                    break
-                if self.engine.state.game_over:
-                    break
-            
-            # 刺杀阶段
-            elif self.engine.state.current_phase == GamePhase.ASSASSINATION:
-                self._handle_assassination_phase(verbose)
-                # 刺杀后游戏必然结束
+        # 显示游戏结果
+        if verbose:
+            self._print_game_result()
+    
+    def close(self):
+        """关闭对局持有的事件循环（run_game结束时自动调用；直接用step推进时由调用方在结束后调用）"""
+        self._loop_runner.close()
+    
+    def run_game_phases(self, verbose: bool = True) -> Iterator[Tuple[GamePhase, GameState]]:
+        """
+        逐阶段推进游戏，每完成一个阶段产出 (该阶段, 推进后的游戏状态)，游戏结束时停止
+        阶段未能推进时（如队长提议的队伍无效）也停止，避免死循环
+        """
+        while not self.engine.state.game_over:
+            phase = self.engine.state.current_phase
+            progress = self._phase_progress()
+            running = self.step(verbose)
+            yield phase, self.engine.state
+            if not running or self._phase_progress() == progress:
                 break
-            
-            # 游戏结束
-            elif self.engine.state.current_phase == GamePhase.FINISHED:
+    
+    def _phase_progress(self) -> Tuple:
+        """游戏进度（阶段、轮次、投票轮次、队长），推进一个阶段后必然变化"""
+        state = self.engine.state
+        return state.current_phase, state.current_round, state.vote_round, state.current_leader
+    
+    async def arun_game(self, verbose: bool = True):
+        """
+        run_game的异步版本：在调用方的事件循环中运行，可与其他协程（如其他对局）并发
+        投票/任务阶段（并发模式下还有讨论阶段）各玩家的LLM调用在当前事件循环中同时发出
+        所有对局结束后由调用方await event_loop.release_loop_resources()关闭该事件循环上的共享连接池
+        """
+        if verbose:
+            print("=" * 60)
+            print("游戏开始！")
+            print("=" * 60)
+            self._print_role_assignment()
+            print()
+        
+        while not self.engine.state.game_over:
+            progress = self._phase_progress()
+            if not await self.astep(verbose) or self._phase_progress() == progress:
                 break
         
-        # 显示游戏结果
         if verbose:
             self._print_game_result()
     
-    def _handle_discussion_phase(self, verbose: bool):
-        """处理讨论阶段"""
+    async def astep(self, verbose: bool = True) -> bool:
+        """
+        step的异步版本：先在当前事件循环中并发生成本阶段各玩家的决策，
+        其余逻辑（依次发言、队长提议、刺杀等）在线程中执行，不阻塞事件循环
+        """
+        prepared = await self._aprepare_phase()
+        return await asyncio.to_thread(self.step, verbose, prepared)
+    
+    async def _aprepare_phase(self) -> Optional[Dict]:
+        """并发生成本阶段各玩家互不依赖的LLM决策（格式同step的prepared），无需预先生成时返回None"""
+        state = self.engine.state
+        if state.game_over:
+            return None
+        
+        public_summary = self.engine.get_public_state_summary()
+        if state.current_phase == GamePhase.DISCUSSION:
+            if self.llm_use_batch_api:
+                order = self._speaking_order()
+                return await BaseAgent.abatch_generate_speech(
+                    order, [self._agent_game_state(agent, public_summary) for agent in order]
+                )
+            # 依次发言时每人需要看到前面的发言
+            if not self.parallel_agents:
+                return None
+            return await gather_or_raise([agent.agenerate_speech(self._agent_game_state(agent, public_summary), [])
+                                          for agent in self._speaking_order()], self.max_concurrency)
+        if state.current_phase == GamePhase.VOTING:
+            if self.llm_batch_mode:
+                return None  # 合并为一次LLM调用，由step处理
+            voters = self._team_voters()
+            votes = await gather_or_raise([agent.avote_on_team(self._agent_game_state(agent, public_summary),
+                                                               state.proposed_team) for agent in voters],
+                                          self.max_concurrency)
+            return {agent.player_id: vote for agent, vote in zip(voters, votes)}
+        if state.current_phase == GamePhase.MISSION:
+            if self.llm_batch_mode:
+                return None  # 合并为一次LLM调用，由step处理
+            members = self._mission_members()
+            votes = await gather_or_raise([agent.avote_on_mission(self._agent_game_state(agent, public_summary),
+                                                                  state.proposed_team) for agent in members],
+                                          self.max_concurrency)
+            return {agent.player_id: success for agent, success in zip(members, votes)}
+        return None
+    
+    def step(self, verbose: bool = True, prepared: Optional[Dict] = None) -> bool:
+        """
+        推进一个阶段
+        prepared: 外部（如BatchGameRunner）已生成的本阶段LLM结果——讨论阶段为按发言顺序排列的发言列表，
+                  投票/任务阶段为 玩家ID -> 投票；None表示由本局自行生成
+        返回: 游戏是否还需要继续
+        """
+        # 胜负由引擎在投票结算、任务结算和刺杀时直接判定（设置game_over），这里不再轮询
+        if self.engine.state.game_over:
+            return False
+        
+        if verbose:
+            print(f"\n--- 第 {self.engine.state.current_round} 轮任务 ---")
+            print(f"当前队长: {self.engine.state.players[self.engine.state.current_leader].name}")
+            print(f"成功任务: {self.engine.state.successful_missions}, "
+                  f"失败任务: {self.engine.state.failed_missions}")
+        
+        phase = self.engine.state.current_phase
+        handler = self._phase_handlers.get(phase)
+        if handler is None:
+            return False  # 游戏结束
+        
+        if prepared is None:
+            handler(verbose)
+        else:
+            handler(verbose, prepared)
+        
+        # 投票（流局5次）、任务（破坏3个任务或任务用完）后可能结束；刺杀后游戏必然结束
+        return phase != GamePhase.ASSASSINATION and not self.engine.state.game_over
+    
+    def _current_mission_config(self) -> Dict:
+        """当前任务配置（没有更多任务时使用默认配置）"""
+        return get_mission_config_dict(self.engine.state.mission_configs, self.engine.state.current_round)
+    
+    def _agent_game_state(self, agent: BaseAgent, public_summary: Optional[Dict] = None) -> Dict:
+        """
+        获取该玩家视角的游戏状态（包含私有信息和当前任务配置）
+        public_summary: 本阶段的公共状态摘要（同一阶段内各玩家共享，只构建一次）
+        """
+        if public_summary is None:
+            public_summary = self.engine.get_public_state_summary()
+        return {
+            **public_summary,
+            "private_info": self.engine.get_player_info(agent.player_id),
+            "mission_config": self._current_mission_config()
+        }
+    
+    def _speaking_order(self) -> List[BaseAgent]:
+        """讨论阶段的发言顺序：从队长的下一位开始，队长最后发言"""
+        leader_id = self.engine.state.current_leader
+        leader_index = self._agent_index[leader_id]
+        return [self.agents[(leader_index + 1 + i) % len(self.agents)] for i in range(len(self.agents))]
+    
+    def _team_voters(self) -> List[BaseAgent]:
+        """需要对提议队伍做决策的玩家（队长必然同意，不需要决策）"""
+        return [agent for agent in self.agents if agent.player_id != self.engine.state.current_leader]
+    
+    def _mission_members(self) -> List[BaseAgent]:
+        """执行当前任务的玩家"""
+        seats = sorted(self._agent_index[pid] for pid in self.engine.state.proposed_team)
+        return [self.agents[seat] for seat in seats]
+    
+    def _run_concurrently(self, coroutines: List) -> List:
+        """在游戏的事件循环中并发执行协程（信号量限制并发数），按输入顺序返回结果"""
+        return self._loop_runner.gather(coroutines)
+    
+    def _handle_discussion_phase(self, verbose: bool, speeches: Optional[List[str]] = None):
+        """
+        处理讨论阶段
+        speeches: 已生成的发言（按发言顺序），None表示在此生成
+        """
         if verbose:
             print("\n[讨论阶段]")
         
@@ -144,38 +296,29 @@ class AvalonGame:
         leader_id = self.engine.state.current_leader
         recent_speeches = []
         
-        # 准备游戏状态（所有玩家共享相同的基础信息）
-        base_game_state = self.engine.get_game_state_summary(leader_id)
-        if self.engine.state.current_round <= len(self.engine.state.mission_configs):
-            current_config = self.engine.state.mission_configs[self.engine.state.current_round - 1]
-            base_game_state["mission_config"] = {
-                "team_size": current_config.team_size,
-                "fails_needed": current_config.fails_needed
-            }
-        else:
-            base_game_state["mission_config"] = {
-                "team_size": 2,
-                "fails_needed": 1
-            }
-        
         # 第一阶段：所有玩家依次发言讨论（从队长的下一位开始，队长最后发言）
-        # 找到队长在agents列表中的位置
-        leader_index = next(i for i, agent in enumerate(self.agents) if agent.player_id == leader_id)
-        leader_agent = self.agents[leader_index]  # 先获取队长智能体
+        speaking_order = self._speaking_order()
+        leader_agent = speaking_order[-1]
+        public_summary = self.engine.get_public_state_summary()  # 讨论阶段公共状态不变，只构建一次
+        
+        # 批量/并发模式：所有玩家同时生成发言（本轮发言彼此不可见），结果仍按发言顺序记录
+        parallel_speeches = speeches
+        if parallel_speeches is None and self.llm_use_batch_api:
+            parallel_speeches = self._loop_runner.run(BaseAgent.abatch_generate_speech(
+                speaking_order, [self._agent_game_state(agent, public_summary) for agent in speaking_order]
+            ))
+        elif parallel_speeches is None and self.parallel_agents:
+            parallel_speeches = self._run_concurrently([
+                agent.agenerate_speech(self._agent_game_state(agent, public_summary), []) for agent in speaking_order
+            ])
         
         # 从队长的下一位开始发言
-        for i in range(len(self.agents)):
-            agent_index = (leader_index + 1 + i) % len(self.agents)
-            agent = self.agents[agent_index]
-            
-            # 获取该玩家的游戏状态（包含私有信息）
-            game_state = self.engine.get_game_state_summary(agent.player_id)
-            # 合并基础信息
-            game_state["mission_config"] = base_game_state["mission_config"]
-            game_state["mission_history"] = base_game_state.get("mission_history", [])
-            
+        for i, agent in enumerate(speaking_order):
             # 生成发言（无论verbose与否都生成，用于前端展示）
-            speech = agent.generate_speech(game_state, recent_speeches)
+            if parallel_speeches is not None:
+                speech = parallel_speeches[i]
+            else:
+                speech = agent.generate_speech(self._agent_game_state(agent, public_summary), recent_speeches)
             recent_speeches.append({"player_id": agent.player_id, "name": agent.name, "speech": speech})
             
             # 记录到游戏历史
@@ -193,9 +336,7 @@ class AvalonGame:
                 print(f"{agent.name}: {speech}")
         
         # 第二阶段：讨论结束后，队长根据讨论内容决定队伍
-        leader_game_state = self.engine.get_game_state_summary(leader_id)
-        leader_game_state["mission_config"] = base_game_state["mission_config"]
-        leader_game_state["mission_history"] = base_game_state.get("mission_history", [])
+        leader_game_state = self._agent_game_state(leader_agent, public_summary)
         
         # 队长根据讨论内容决定队伍
         proposed_team = leader_agent.propose_team(leader_game_state)
@@ -222,42 +363,49 @@ class AvalonGame:
         # 提交提议
         self.engine.propose_team(leader_id, proposed_team)
     
-    def _handle_voting_phase(self, verbose: bool):
-        """处理投票阶段"""
+    def _handle_voting_phase(self, verbose: bool, prepared_votes: Optional[Dict[int, bool]] = None):
+        """
+        处理投票阶段
+        prepared_votes: 已生成的非队长玩家投票（玩家ID -> 是否同意），None表示在此生成
+        """
         if verbose:
             print("\n[投票阶段]")
         
         proposed_team = self.engine.state.proposed_team
-        team_names = [self.engine.state.players[pid].name for pid in proposed_team]
         
         if verbose:
+            team_names = [self.engine.state.players[pid].name for pid in proposed_team]
             print(f"对队伍进行投票: {', '.join(team_names)}")
         
         # 收集所有玩家的投票
         votes = {}
         leader_id = self.engine.state.current_leader
         
+        # 批量模式：所有非队长玩家的投票合并为一次LLM调用
+        batch_votes = dict(prepared_votes) if prepared_votes is not None else {}
+        public_summary = self.engine.get_public_state_summary()
+        if prepared_votes is None and self.llm_batch_mode:
+            batch_state = self._agent_game_state(self.get_agent(leader_id), public_summary)
+            batch_votes = BaseAgent.batch_vote_on_team(self._team_voters(), batch_state, proposed_team)
+        
+        # 并发模式：其余玩家的投票互不依赖，同时发出
+        if prepared_votes is None and self.parallel_agents:
+            pending = [agent for agent in self._team_voters() if agent.player_id not in batch_votes]
+            if pending:
+                results = self._run_concurrently([
+                    agent.avote_on_team(self._agent_game_state(agent, public_summary), proposed_team) for agent in pending
+                ])
+                batch_votes = {**batch_votes, **{agent.player_id: vote for agent, vote in zip(pending, results)}}
+        
+        output_lines = []  # verbose输出：本阶段的投票和结果收集后一次性写出
         for agent in self.agents:
-            game_state = self.engine.get_game_state_summary(agent.player_id)
-            # 检查是否还有任务配置
-            if self.engine.state.current_round <= len(self.engine.state.mission_configs):
-                current_config = self.engine.state.mission_configs[self.engine.state.current_round - 1]
-                game_state["mission_config"] = {
-                    "team_size": current_config.team_size,
-                    "fails_needed": current_config.fails_needed
-                }
-            else:
-                # 没有更多任务了，使用默认配置
-                game_state["mission_config"] = {
-                    "team_size": 2,
-                    "fails_needed": 1
-                }
-            
             # 队长必须同意自己提议的队伍
             if agent.player_id == leader_id:
                 vote = True
+            elif agent.player_id in batch_votes:
+                vote = batch_votes[agent.player_id]
             else:
-                vote = agent.vote_on_team(game_state, proposed_team)
+                vote = agent.vote_on_team(self._agent_game_state(agent, public_summary), proposed_team)
             
             votes[agent.player_id] = vote
             
@@ -275,7 +423,7 @@ class AvalonGame:
             })
             
             if verbose:
-                print(f"{agent.name}: {vote_text}")
+                output_lines.append(f"{agent.name}: {vote_text}")
             
             self.engine.vote_on_team(agent.player_id, vote)
         
@@ -298,40 +446,48 @@ class AvalonGame:
         })
         
         if verbose:
-            print(f"\n投票结果: {approve_count} 同意, {reject_count} 拒绝")
-            print(f"结果: {'通过' if passed else '未通过'}")
+            output_lines.append(f"\n投票结果: {approve_count} 同意, {reject_count} 拒绝")
+            output_lines.append(f"结果: {'通过' if passed else '未通过'}")
+            print("\n".join(output_lines))
     
-    def _handle_mission_phase(self, verbose: bool):
-        """处理任务执行阶段"""
+    def _handle_mission_phase(self, verbose: bool, prepared_votes: Optional[Dict[int, bool]] = None):
+        """
+        处理任务执行阶段
+        prepared_votes: 已生成的任务投票（玩家ID -> 是否成功），None表示在此生成
+        """
         if verbose:
             print("\n[任务执行阶段]")
         
         mission_team = self.engine.state.proposed_team
-        team_names = [self.engine.state.players[pid].name for pid in mission_team]
         
         if verbose:
+            team_names = [self.engine.state.players[pid].name for pid in mission_team]
             print(f"执行任务的队伍: {', '.join(team_names)}")
         
+        # 批量模式：队伍中多名坏人的任务投票合并为一次LLM调用
+        parallel_results = dict(prepared_votes) if prepared_votes is not None else {}
+        public_summary = self.engine.get_public_state_summary()
+        if prepared_votes is None and self.llm_batch_mode:
+            members = self._mission_members()
+            batch_state = self._agent_game_state(members[0], public_summary)
+            parallel_results = BaseAgent.batch_vote_on_mission(members, batch_state, mission_team)
+        
+        # 并发模式：任务队员同时投票
+        elif prepared_votes is None and self.parallel_agents:
+            members = self._mission_members()
+            results = self._run_concurrently([agent.avote_on_mission(self._agent_game_state(agent, public_summary), mission_team)
+                                              for agent in members])
+            parallel_results = {agent.player_id: success for agent, success in zip(members, results)}
+        
         # 收集任务投票
         mission_votes = {}
+        output_lines = []  # verbose输出：本阶段的投票和结果收集后一次性写出
         for agent in self.agents:
             if agent.player_id in mission_team:
-                game_state = self.engine.get_game_state_summary(agent.player_id)
-                # 检查是否还有任务配置
-                if self.engine.state.current_round <= len(self.engine.state.mission_configs):
-                    current_config = self.engine.state.mission_configs[self.engine.state.current_round - 1]
-                    game_state["mission_config"] = {
-                        "team_size": current_config.team_size,
-                        "fails_needed": current_config.fails_needed
-                    }
+                if agent.player_id in parallel_results:
+                    success = parallel_results[agent.player_id]
                 else:
-                    # 没有更多任务了，使用默认配置
-                    game_state["mission_config"] = {
-                        "team_size": 2,
-                        "fails_needed": 1
-                    }
-                
-                success = agent.vote_on_mission(game_state, mission_team)
+                    success = agent.vote_on_mission(self._agent_game_state(agent, public_summary), mission_team)
                 mission_votes[agent.player_id] = success
                 
                 # 记录到游戏历史
@@ -348,7 +504,7 @@ class AvalonGame:
                 })
                 
                 if verbose:
-                    print(f"{agent.name}: {result_text}")
+                    output_lines.append(f"{agent.name}: {result_text}")
         
         # 提交任务结果
         self.engine.submit_mission_result(mission_votes)
@@ -358,17 +514,14 @@ class AvalonGame:
             last_result = self.engine.state.mission_results[-1]
             if verbose:
                 result_text = "成功" if last_result.success else "失败"
-                print(f"\n任务结果: {result_text} (失败票数: {last_result.fail_count})")
+                output_lines.append(f"\n任务结果: {result_text} (失败票数: {last_result.fail_count})")
             
             # 更新所有智能体的信念系统
             for agent in self.agents:
-                for player_id, vote_success in mission_votes.items():
-                    agent.belief_system.update_belief_from_mission(
-                        player_id=player_id,
-                        mission_success=vote_success,
-                        mission_team=mission_team,
-                        mission_result=last_result.success
-                    )
+                agent.belief_system.update_beliefs_from_mission(mission_votes, mission_team, last_result.success)
+        
+        if verbose and output_lines:
+            print("\n".join(output_lines))
     
     def _handle_assassination_phase(self, verbose: bool):
         """处理刺杀阶段"""
@@ -377,12 +530,7 @@ class AvalonGame:
             print("坏人阵营可以刺杀梅林...")
         
         # 找到刺客
-        assassin_agent = None
-        for agent in self.agents:
-            from game.roles import RoleType
-            if agent.role_type == RoleType.ASSASSIN:
-                assassin_agent = agent
-                break
+        assassin_agent = self._agents_by_role.get(RoleType.ASSASSIN, [None])[0]
         
         if assassin_agent:
             game_state = self.engine.get_game_state_summary(assassin_agent.player_id)
@@ -421,51 +569,88 @@ class AvalonGame:
         print(f"  失败任务: {self.engine.state.failed_missions}")
         print(f"  总轮次: {len(self.engine.state.mission_results)}")
         
-        print("\n任务历史:")
+        # 任务历史整体拼接后一次输出
+        players = self.engine.state.players
+        lines = ["\n任务历史:"]
         for i, result in enumerate(self.engine.state.mission_results, 1):
             result_text = "成功" if result.success else "失败"
-            team_names = [self.engine.state.players[pid].name for pid in result.team_members]
-            print(f"  第{i}轮: {result_text} - 队伍: {', '.join(team_names)}")
+            team_names = ", ".join(players[pid].name for pid in result.team_members)
+            lines.append(f"  第{i}轮: {result_text} - 队伍: {team_names}")
+        print("\n".join(lines))
 
 
-def main():
-    """主函数"""
-    import os
+@dataclass(frozen=True)
+class LLMConfig:
+    """从环境变量（及.env文件）读取的LLM配置"""
+    provider: str  # "openai", "deepseek", "qwen"
+    provider_name: str
+    env_var_name: str  # 该提供商的API密钥环境变量名
+    api_key: Optional[str]
+    model: str
+    small_model: Optional[str]  # 可选：低信息量决策使用的小模型
+    base_url: Optional[str]  # 本地Qwen服务地址（其他提供商为None）
+    batch_mode: bool
+    parallel_agents: bool
+    attempt_timeout: Optional[float]  # 可选：单次请求总时长上限（秒）
+    use_batch_api: bool
+    use_langgraph: bool
+
+
+@functools.lru_cache(maxsize=1)
+def load_llm_config() -> LLMConfig:
+    """加载.env并读取LLM配置（整个进程只解析一次，批量创建对局时直接复用）"""
     from dotenv import load_dotenv
     
     # 加载环境变量
     load_dotenv()
     
-    # 系统现在仅支持LLM策略引擎，必须配置LLM
-    use_llm = True  # 强制使用LLM
-    llm_api_provider = os.getenv("LLM_API_PROVIDER", "openai").lower()  # "openai", "deepseek", "qwen"
-    use_langgraph = os.getenv("USE_LANGGRAPH", "false").lower() == "true"
+    provider = os.getenv("LLM_API_PROVIDER", "openai").lower()
+    base_url = None
     
     # 根据提供商选择API密钥和模型
-    if llm_api_provider == "deepseek":
-        llm_api_key = os.getenv("DEEPSEEK_API_KEY") or os.getenv("OPENAI_API_KEY")
+    if provider == "deepseek":
+        api_key = os.getenv("DEEPSEEK_API_KEY") or os.getenv("OPENAI_API_KEY")
         default_model = "deepseek-chat"
         provider_name = "DeepSeek"
         env_var_name = "DEEPSEEK_API_KEY"
-    elif llm_api_provider == "qwen":
-        llm_api_key = os.getenv("QWEN_API_KEY", "not-needed")
+    elif provider == "qwen":
+        api_key = os.getenv("QWEN_API_KEY", "not-needed")
         default_model = os.getenv("QWEN_MODEL", "qwen")
         provider_name = "Qwen (本地)"
         env_var_name = "QWEN_API_KEY"
         base_url = os.getenv("QWEN_BASE_URL", "http://localhost:8000/v1")
-        print(f"使用本地Qwen模型: {base_url}")
     else:
-        llm_api_key = os.getenv("OPENAI_API_KEY")
+        api_key = os.getenv("OPENAI_API_KEY")
         default_model = "gpt-4o-mini"
         provider_name = "OpenAI"
         env_var_name = "OPENAI_API_KEY"
     
-    llm_model = os.getenv("LLM_MODEL", default_model)
+    return LLMConfig(
+        provider=provider,
+        provider_name=provider_name,
+        env_var_name=env_var_name,
+        api_key=api_key,
+        model=os.getenv("LLM_MODEL", default_model),
+        small_model=os.getenv("LLM_SMALL_MODEL") or None,
+        base_url=base_url,
+        batch_mode=os.getenv("LLM_BATCH_MODE", "false").lower() == "true",
+        parallel_agents=os.getenv("LLM_PARALLEL_AGENTS", "false").lower() == "true",
+        attempt_timeout=float(os.getenv("LLM_ATTEMPT_TIMEOUT", "0")) or None,
+        use_batch_api=os.getenv("LLM_USE_BATCH_API", "false").lower() == "true",
+        use_langgraph=os.getenv("USE_LANGGRAPH", "false").lower() == "true"
+    )
+
+
+def main():
+    """主函数"""
+    config = load_llm_config()
+    if config.base_url:
+        print(f"使用本地Qwen模型: {config.base_url}")
     
-    # 检查LLM配置
-    if llm_api_provider != "qwen" and not llm_api_key:
-        print(f"错误: 系统现在仅支持LLM策略引擎，请设置{env_var_name}环境变量")
-        print(f"示例: export {env_var_name}=your_api_key_here")
+    # 系统现在仅支持LLM策略引擎，必须配置LLM
+    if config.provider != "qwen" and not config.api_key:
+        print(f"错误: 系统现在仅支持LLM策略引擎，请设置{config.env_var_name}环境变量")
+        print(f"示例: export {config.env_var_name}=your_api_key_here")
         print("或者在.env文件中设置相应的API密钥")
         sys.exit(1)
     
@@ -474,16 +659,21 @@ def main():
     game = AvalonGame(
         player_count=5, 
         player_names=player_names,
-        use_llm=use_llm,
-        llm_api_key=llm_api_key,
-        llm_model=llm_model,
-        llm_api_provider=llm_api_provider
+        use_llm=True,  # 强制使用LLM
+        llm_api_key=config.api_key,
+        llm_model=config.model,
+        llm_api_provider=config.provider,
+        llm_batch_mode=config.batch_mode,
+        llm_small_model=config.small_model,
+        parallel_agents=config.parallel_agents,
+        llm_attempt_timeout=config.attempt_timeout,
+        llm_use_batch_api=config.use_batch_api
     )
     
-    print(f"使用{provider_name} LLM策略引擎 (模型: {llm_model})")
+    print(f"使用{config.provider_name} LLM策略引擎 (模型: {config.model})")
     
     # 选择运行方式
-    if use_langgraph:
+    if config.use_langgraph:
         try:
             from game.langgraph_game import LangGraphGameEngine
             print("使用LangGraph游戏引擎")